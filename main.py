@@ -1,12 +1,85 @@
 import argparse
+import json
 import time
 import os
+import sys
+import multiprocessing as mp
+from multiprocessing.connection import wait
 import numpy as np
-from src.mpi_comm import Communicator, MPI
-from src.grid import Grid
-from src.wildfire import update_grid
-from src.load_balancer import LoadBalancer
-from src.config import BURNING
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+from src.mpi_comm import Communicator, CartCommunicator, MPI
+from src.wildfire import update_rows_fused, heavy_wait, reset_kernel_rng
+from src.engines import ENGINES, get_engine
+from src.tiled import TiledEngine
+from src.deep_halo import DeepHalo
+from src.load_balancer import LoadBalancer, BlockLoadBalancer, SharedLoadBalancer, LoadMeter
+from src.shm_comm import SharedWorld
+from src.ensemble import Ensemble, EnsembleStats
+from src.rng import CounterRNG
+from src.rules import make_rule
+from src.timing import PhaseTimer, environment
+from src.counters import StepCounters
+from src.checkpoint import Checkpointer, load_meta, restart_bounds, read_cells
+from src.snapshots import SnapshotWriter, DeltaSnapshotWriter
+from src.config import BURNING, BURNT, P_IGNITE, RULES, CHECKPOINT_DIR, SNAPSHOT_INTERVAL, SNAPSHOT_FILE, SNAPSHOT_DELTA_FILE, SNAPSHOT_KEYFRAME_EVERY, ENSEMBLE_FILE, ENSEMBLE_BINS
+
+def split(n, parts, index):
+    # (count, offset) of part index when n items are split as evenly as possible
+    base, remainder = divmod(n, parts)
+    return base + (1 if index < remainder else 0), index * base + min(index, remainder)
+
+# Phases whose time counts as this rank's compute load for --load-metric time
+COMPUTE_PHASES = ('compute', 'interior', 'boundary', 'heavy')
+
+def banded_step(grid, meter, bands, heavy_load=False, rng=None, step=0):
+    # Fused update one row band at a time, timing each band (including its share
+    # of the heavy busy-wait) so the balancer sees where in the strip the cost is
+    edges = np.linspace(0, grid.rows, bands + 1).astype(int)
+    ignited = burnt = 0
+    for start, stop in zip(edges[:-1], edges[1:]):
+        t0 = time.perf_counter()
+        band_ignited, band_burnt = update_rows_fused(grid, start, stop, rng=rng, step=step)
+        if heavy_load:
+            heavy_wait(band_ignited + band_burnt)
+        meter.record(grid, time.perf_counter() - t0, start, stop)
+        ignited, burnt = ignited + band_ignited, burnt + band_burnt
+    grid.swap()
+    return ignited, burnt
+
+def fire_cell(args):
+    # Global (row, col) of the initial fire
+    rows, cols = args.rows, args.cols
+    return {
+        'center': (rows // 2, cols // 2),
+        'top': (0, cols // 2),
+        'bottom': (rows - 1, cols // 2),
+        'left': (rows // 2, 0),
+        'right': (rows // 2, cols - 1),
+        'corner': (0, 0),
+    }[args.fire_pos]
+
+def overlapped_step(comm_obj, grid, timer, heavy_load=False, rng=None, step=0, update_rows=update_rows_fused):
+    # Interior rows don't read the ghost rows, so compute them while the halo
+    # messages are in flight and finish the two boundary rows after Waitall
+    rows = grid.rows
+    with timer.phase('halo_post'):
+        requests = comm_obj.start_ghost_exchange(grid)
+    with timer.phase('interior'):
+        counts = [update_rows(grid, 1, rows - 1, rng=rng, step=step)]
+    with timer.phase('halo_wait'):
+        comm_obj.end_ghost_exchange(grid, requests)
+    with timer.phase('boundary'):
+        counts.append(update_rows_fused(grid, 0, min(1, rows), rng=rng, step=step))
+        counts.append(update_rows_fused(grid, max(1, rows - 1), rows, rng=rng, step=step))
+        grid.swap()
+    ignited, burnt = sum(c[0] for c in counts), sum(c[1] for c in counts)
+    if heavy_load:
+        with timer.phase('heavy'):
+            heavy_wait(ignited + burnt)
+    return ignited, burnt
 
 def main():
 
@@ -15,90 +88,384 @@ def main():
     parser.add_argument('--cols', type=int, default=100, help='Total cols')
     parser.add_argument('--steps', type=int, default=100, help='Simulation steps')
     parser.add_argument('--balance', action='store_true', help='Enable dynamic load balancing')
+    parser.add_argument('--balance-mode', choices=['diffusive', 'global'], default='diffusive', help='Load balancing: move one row between neighbours per call, or repartition all strips from a global prefix sum of row costs')
+    parser.add_argument('--balance-trigger', type=float, default=None, metavar='RATIO', help='Only rebalance when the max/mean rank load exceeds RATIO (checked every --balance-freq steps with a non-blocking reduction); default: rebalance unconditionally')
+    parser.add_argument('--load-metric', choices=['burning', 'time'], default='burning', help='Load used by the balancer: burning-cell count, or measured compute time smoothed over recent balance intervals')
+    parser.add_argument('--load-bands', type=int, default=1, help='Time the fused kernel per row band for --load-metric time (needs --engine fused without --overlap)')
     parser.add_argument('--balance-freq', type=int, default=10, help='Frequency of load balancing (steps)')
-    parser.add_argument('--procs', type=int, default=1, help='Number of processes (ignored, set by mpiexec)')
+    parser.add_argument('--procs', type=int, default=1, help='Number of worker processes for --backend shm (with MPI, set by mpiexec instead)')
+    parser.add_argument('--backend', choices=['mpi', 'shm'], default='mpi', help='Communication: MPI (run under mpiexec), or worker processes on this node sharing one grid in shared memory (no MPI needed)')
     parser.add_argument('--save', action='store_true', help='Save grid snapshots for visualization')
-    parser.add_argument('--fire-pos', choices=['center', 'top', 'bottom', 'left', 'right'], default='center', help='Initial fire position')
+    parser.add_argument('--save-format', choices=['full', 'delta'], default='full', help='Snapshot file: full frames in one .npy, or keyframes plus changed cells with an index for random access')
+    parser.add_argument('--save-every', type=int, default=SNAPSHOT_INTERVAL, help='Steps between snapshots (--save-format delta only; full frames are every %d steps)' % SNAPSHOT_INTERVAL)
+    parser.add_argument('--fire-pos', choices=['center', 'top', 'bottom', 'left', 'right', 'corner'], default='center', help='Initial fire position')
     parser.add_argument('--heavy', action='store_true', help='Simulate heavy computation per active cell')
     parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducibility')
+    parser.add_argument('--rng', choices=['legacy', 'counter'], default='legacy', help='Random source: global NumPy RNG, or Philox keyed by (seed, step, row, col) for results independent of rank count and balancing')
+    parser.add_argument('--engine', choices=list(ENGINES), default='dense', help='Update kernel: ' + '; '.join(f'{e.name}: {e.description}' for e in ENGINES.values()))
+    parser.add_argument('--rule', choices=list(RULES), default='wildfire', help='Model to run, from RULES in src/config.py (anything but wildfire needs --engine lut)')
+    parser.add_argument('--threads', type=int, default=1, help='Threads per rank: split the strip into row tiles updated concurrently (fused engine)')
+    parser.add_argument('--halo-depth', type=int, default=1, metavar='K', help='Exchange K ghost rows every K steps and recompute the borrowed rows locally in between (requires --rng counter)')
+    parser.add_argument('--overlap', action='store_true', help='Overlap the halo exchange with the interior update (fused engine)')
+    parser.add_argument('--decomp', choices=['strips', 'blocks'], default='strips', help='Domain decomposition: 1D row strips or 2D blocks on a Cartesian communicator')
+    parser.add_argument('--dims', type=int, nargs=2, default=None, metavar=('PROW', 'PCOL'), help='Process grid for --decomp blocks (0 lets MPI choose; default: both chosen)')
+    parser.add_argument('--ensemble', type=int, default=0, metavar='MEMBERS', help='Monte Carlo mode: run MEMBERS realizations of the scenario, split across ranks and stepped together in one vectorized kernel, and write burn-probability and arrival-time maps to %s' % ENSEMBLE_FILE)
+    parser.add_argument('--arrival-bins', type=int, default=ENSEMBLE_BINS, help='Arrival-time histogram bins per cell for --ensemble')
+    parser.add_argument('--stop-extinct', action='store_true', help='Stop as soon as no cell is burning (needs spontaneous ignition disabled: P_IGNITE = 0 in src/config.py)')
+    parser.add_argument('--stop-burnt', type=float, default=None, metavar='FRACTION', help='Stop once this fraction of all cells has burnt out')
+    parser.add_argument('--checkpoint-every', type=int, default=0, metavar='N', help='Write a checkpoint to %s/step_XXXXXX every N steps (0: never)' % CHECKPOINT_DIR)
+    parser.add_argument('--restart', default=None, metavar='DIR', help='Resume from a checkpoint directory, on any number of ranks; grid size, seed and RNG come from the checkpoint and --steps is the total')
+    parser.add_argument('--trials', type=int, default=1, help='Timed repetitions of the run in this process')
+    parser.add_argument('--warmup', type=int, default=0, help='Untimed repetitions before --trials')
+    parser.add_argument('--bench-json', default=None, metavar='PATH', help='Write per-trial, per-rank loop and phase times with environment metadata to PATH (see scripts/benchmark.py)')
+    parser.add_argument('--trace', default=None, metavar='PATH', help='Record begin/end times of every phase on every rank and step, and write them as a Chrome/Perfetto trace JSON to PATH (e.g. results/logs/trace.json)')
+    parser.add_argument('--timing', action='store_true', help='Print per-rank time spent in each phase of the main loop')
     args = parser.parse_args()
+    if args.restart:
+        # The checkpoint defines the run being continued
+        meta = load_meta(args.restart)
+        args.rows, args.cols, args.seed, args.rng = meta['rows'], meta['cols'], meta['seed'], meta['rng']
+        args.rule = meta.get('rule', 'wildfire')
+
+    if args.overlap and args.engine != 'fused':
+        parser.error('--overlap requires --engine fused')
+    if args.threads > 1 and (args.engine != 'fused' or args.load_bands > 1):
+        parser.error('--threads requires --engine fused without --load-bands')
+    if args.decomp == 'blocks' and (args.engine == 'packed' or args.overlap):
+        parser.error('--decomp blocks does not support --engine packed or --overlap')
+    if args.load_bands > 1 and (args.engine != 'fused' or args.overlap or args.load_metric != 'time'):
+        parser.error('--load-bands requires --load-metric time and --engine fused without --overlap')
+    if args.save_every != SNAPSHOT_INTERVAL and args.save_format != 'delta':
+        parser.error('--save-every requires --save-format delta')
+    if args.decomp == 'blocks' and args.balance_mode == 'global':
+        parser.error('--balance-mode global requires --decomp strips')
+    
+    if args.halo_depth > 1 and (args.rng != 'counter' or args.decomp != 'strips' or args.backend != 'mpi'
+                                or args.overlap or args.engine == 'packed' or args.load_bands > 1):
+        parser.error('--halo-depth requires --rng counter and MPI strips, without --overlap, --load-bands or --engine packed')
+    if (args.trials > 1 or args.warmup or args.bench_json) and (args.ensemble or args.backend != 'mpi'):
+        parser.error('--trials, --warmup and --bench-json require MPI runs without --ensemble')
+    if args.ensemble and (args.backend == 'shm' or args.balance or args.save or args.decomp != 'strips' or args.trace
+                          or args.stop_extinct or args.stop_burnt is not None):
+        parser.error('--ensemble runs on MPI ranks without --balance, --save, --trace, --stop-* or --decomp blocks')
+    if (args.checkpoint_every or args.restart) and (args.backend != 'mpi' or args.ensemble):
+        parser.error('--checkpoint-every and --restart require MPI runs without --ensemble')
+    if args.stop_extinct and P_IGNITE > 0:
+        # Any fuel cell can still ignite on its own, so the fire is never out for good
+        parser.error('--stop-extinct needs spontaneous ignition disabled (P_IGNITE = 0 in src/config.py)')
+    if args.stop_burnt is not None and not 0 < args.stop_burnt <= 1:
+        parser.error('--stop-burnt must be in (0, 1]')
+    rule = make_rule(args.rule)
+    if args.rule != 'wildfire' and (not ENGINES[args.engine].rules or args.ensemble):
+        parser.error(f'--rule {args.rule} needs --engine lut (the other kernels and --ensemble run the wildfire rule)')
+    # The ghost cells a rule reads follow from its neighbourhood: 2D blocks
+    # exchange one layer without corners, shared-memory strips one row
+    if args.decomp == 'blocks' and (rule.diagonal or rule.radius > 1):
+        parser.error(f'--rule {args.rule} reads diagonal or distant neighbours, which --decomp blocks does not exchange')
+    if args.backend == 'shm' and rule.radius > 1:
+        parser.error(f'--rule {args.rule} reads {rule.radius} rows beyond a strip, and --backend shm shares only one')
+
+    if args.backend == 'shm':
+        if args.decomp != 'strips' or args.save or not ENGINES[args.engine].swaps:
+            parser.error('--backend shm requires --decomp strips, a double-buffered engine (fused or numba) and no --save')
+        if args.balance and (args.balance_mode != 'global' or args.balance_trigger is not None):
+            parser.error('--backend shm balances with --balance-mode global and no --balance-trigger')
     
+    if not ENGINES[args.engine].available:
+        parser.error(f'--engine {args.engine} needs an optional dependency that is not installed')
+
+    if args.ensemble:
+        run_ensemble(args)
+    elif args.backend == 'shm':
+        run_shared(args)
+    else:
+        run_trials(args)
+
+def run_trials(args):
+    # --warmup untimed runs (imports, allocations, JIT and MPI connections all
+    # warm), then --trials timed ones in this same process. With --bench-json,
+    # every rank's loop time and phase totals for each trial go to a JSON file.
+    for _ in range(args.warmup):
+        simulate(args)
+    trials = [simulate(args) for _ in range(args.trials)]
+    if args.bench_json and trials[0] is not None:
+        os.makedirs(os.path.dirname(args.bench_json) or '.', exist_ok=True)
+        with open(args.bench_json, 'w') as f:
+            json.dump({'config': vars(args), 'environment': environment(), 'trials': trials}, f, indent=1)
+
+def run_ensemble(args):
+    # Each rank advances its share of the members over the full grid; only the
+    # per-cell aggregates are combined, once, at the end
+    comm_obj = Communicator()
+    rank = comm_obj.rank
     if args.seed is not None:
         np.random.seed(args.seed)
+    members, first = split(args.ensemble, comm_obj.size, rank)
+    ensemble = Ensemble(members, args.rows, args.cols, first_member=first)
+    ensemble.set_fire(*fire_cell(args))
+    rng = CounterRNG(args.seed or 0) if args.rng == 'counter' else None
+    stats = EnsembleStats(args.rows, args.cols, args.steps, args.arrival_bins)
+    stats.record(ensemble, 0)
+
+    start_time = time.time()
+    for step in range(args.steps):
+        num_burning = ensemble.step(rng=rng, step=step)
+        if args.heavy:
+            heavy_wait(num_burning)
+        stats.record(ensemble, step + 1)
+        if step % 10 == 0:
+            total_burning = comm_obj.comm.reduce(ensemble.count_state(BURNING), op=MPI.SUM, root=0)
+            if rank == 0:
+                print(f"Step {step}: Mean Burning per member = {total_burning / args.ensemble:.1f}")
+    end_time = time.time()
+
+    arrival = np.zeros_like(stats.arrival) if rank == 0 else None
+    comm_obj.comm.Reduce(stats.arrival, arrival, op=MPI.SUM, root=0)
+    if rank == 0:
+        histogram = arrival.reshape(stats.histogram().shape)
+        os.makedirs(os.path.dirname(ENSEMBLE_FILE), exist_ok=True)
+        np.savez(ENSEMBLE_FILE, ignition_probability=histogram.sum(axis=0) / args.ensemble,
+                 arrival_histogram=histogram, bin_edges=stats.bin_edges(), members=args.ensemble)
+        print(f"Ensemble of {args.ensemble} members completed in {end_time - start_time:.4f} seconds.")
+        print(f"Time per step: {(end_time - start_time) / max(args.steps, 1) * 1000:.3f} ms")
+        print(f"Wrote burn-probability and arrival-time maps to {ENSEMBLE_FILE}")
+
+def shared_worker(args, world, rank):
+    simulate(args, world.communicator(rank))
+
+def run_shared(args):
+    # One worker process per strip on this node. Spawned rather than forked, and
+    # told not to initialise MPI, since the workers never call it
+    os.environ['MPI4PY_RC_INITIALIZE'] = 'false'
+    ctx = mp.get_context('spawn')
+    world = SharedWorld(args.procs, args.rows, args.cols, ctx=ctx)
+    workers = [ctx.Process(target=shared_worker, args=(args, world, rank)) for rank in range(args.procs)]
+    for w in workers:
+        w.start()
+    failed = False
+    pending = list(workers)
+    while pending:
+        ready = wait([w.sentinel for w in pending])
+        for w in [w for w in pending if w.sentinel in ready]:
+            w.join()
+            pending.remove(w)
+            if w.exitcode != 0 and not failed:
+                # The others would wait for it at the next barrier forever
+                failed = True
+                for other in pending:
+                    other.terminate()
+    world.close()
+    if failed:
+        sys.exit(1)
+
+def simulate(args, comm_obj=None):
+    # Runs one rank (or shared-memory worker) of the simulation
+    # A resumed run continues after the checkpointed step
+    meta = load_meta(args.restart) if args.restart else None
+    first_step = meta['step'] + 1 if meta is not None else 0
+    if args.seed is not None:
+        # Resumed legacy-RNG runs draw a new stream for the remaining steps;
+        # only --rng counter continues exactly as the original run would have
+        np.random.seed(args.seed if meta is None else [args.seed, first_step])
+    # Every run (trial, warm-up) gets its own kernel generator
+    reset_kernel_rng()
 
     if args.save:
-        if not os.path.exists("results/logs"):
-            os.makedirs("results/logs")
-        if not os.path.exists("results/plots"):
-            os.makedirs("results/plots")
+        # Every rank runs this before opening the shared file, so tolerate races
+        os.makedirs("results/logs", exist_ok=True)
+        os.makedirs("results/plots", exist_ok=True)
 
     # Initialize the communicator
-    comm_obj = Communicator()
+    if comm_obj is not None:
+        (prow, pcol), (i, j) = (comm_obj.size, 1), (comm_obj.rank, 0)
+    elif args.decomp == 'blocks':
+        comm_obj = CartCommunicator(dims=args.dims)
+        (prow, pcol), (i, j) = comm_obj.dims, comm_obj.coords
+    else:
+        comm_obj = Communicator()
+        (prow, pcol), (i, j) = (comm_obj.size, 1), (comm_obj.rank, 0)
     rank = comm_obj.rank
     size = comm_obj.size
     total_rows = args.rows
-    rows_per_rank = total_rows // size
-    remainder = total_rows % size
-    local_rows = rows_per_rank + (1 if rank < remainder else 0)
-    grid = Grid(local_rows, args.cols)
-    grid = Grid(local_rows, args.cols)
+    local_rows, offset = split(total_rows, prow, i)
+    rule = make_rule(args.rule)
+    # Rows every strip must keep for its neighbours' halos: rules reaching more
+    # than one row run on deep halos even with --halo-depth 1
+    deep_rows = args.halo_depth * rule.radius
+    if meta is not None and args.decomp == 'strips':
+        # The saved strips (as balanced) on the same rank count, otherwise a
+        # split of the saved per-row load
+        bounds = restart_bounds(args.restart, meta, prow, balance=args.balance, min_rows=deep_rows)
+        if bounds is not None:
+            local_rows, offset = int(bounds[i + 1] - bounds[i]), int(bounds[i])
+    local_cols, col_offset = split(args.cols, pcol, j)
+    engine = get_engine(args.engine)
+    grid_cls = engine.grid_cls
     
-    # Optimized offset calculation
-    offset = rank * rows_per_rank + min(rank, remainder)
+    if args.backend == 'shm':
+        grid = comm_obj.make_grid(local_rows, local_cols, offset=offset)
+    elif args.decomp == 'blocks':
+        grid = grid_cls(local_rows, local_cols, offset=offset, col_offset=col_offset)
+    else:
+        grid = grid_cls(local_rows, local_cols, offset=offset)
     
-    # Set the initial fire position
-    if args.fire_pos == 'center':
-        global_center_r = total_rows // 2
-        if offset <= global_center_r < offset + local_rows:
-            local_r = global_center_r - offset
-            grid.set_fire(local_r, args.cols // 2)
-    elif args.fire_pos == 'top':
-        if offset == 0 and local_rows > 0:
-            grid.set_fire(0, args.cols // 2)
-    elif args.fire_pos == 'bottom':
-        # The last row of the global grid
-        if offset + local_rows == total_rows:
-            grid.set_fire(local_rows - 1, args.cols // 2)
-    elif args.fire_pos == 'left':
-        global_center_r = total_rows // 2
-        if offset <= global_center_r < offset + local_rows:
-            local_r = global_center_r - offset
-            grid.set_fire(local_r, 0)
-    elif args.fire_pos == 'right':
-        global_center_r = total_rows // 2
-        if offset <= global_center_r < offset + local_rows:
-            local_r = global_center_r - offset
-            grid.set_fire(local_r, args.cols - 1)
+    # Set the initial fire position (global cell; set_fire ignores cells outside the block)
+    if meta is not None:
+        # Reads only this rank's rows of the checkpoint
+        grid.commit_updates(read_cells(args.restart, offset, local_rows, col_offset, local_cols))
+    else:
+        fire = fire_cell(args)
+        grid.set_fire(fire[0] - offset, fire[1] - col_offset)
     
     # Set up the load balancer
-    balancer = LoadBalancer(comm_obj) if args.balance else None
-    
+    balancer_cls = {'blocks': BlockLoadBalancer, 'strips': LoadBalancer}[args.decomp]
+    if args.backend == 'shm':
+        balancer_cls = SharedLoadBalancer
+    meter = LoadMeter() if args.balance and args.load_metric == 'time' else None
+    balancer = balancer_cls(comm_obj, mode=args.balance_mode, meter=meter, trigger=args.balance_trigger, min_rows=deep_rows) if args.balance else None
+
+    rng = CounterRNG(args.seed or 0) if args.rng == 'counter' else None
+
+    # Pick the update kernel
+    step_fn = engine.build(rule) if engine.rules else engine.build()
+    tiled = TiledEngine(args.threads) if args.threads > 1 else None
+    if tiled is not None:
+        step_fn = tiled.step
+    deep = None
+    if args.halo_depth > 1 or (rule.radius > 1 and size > 1):
+        if total_rows // prow < deep_rows:
+            if rank == 0:
+                print(f"--halo-depth {args.halo_depth} with --rule {args.rule} needs at least {deep_rows} rows per rank")
+            sys.exit(2)
+        deep = DeepHalo(comm_obj, args.halo_depth, step_fn, reach=rule.radius, burning=rule.burning_states)
+        step_fn = deep.step
+    if meter is not None and args.load_bands > 1:
+        def step_fn(grid, heavy_load=False, rng=None, step=0):
+            return banded_step(grid, meter, args.load_bands, heavy_load=heavy_load, rng=rng, step=step)
+
+    if args.save:
+        # Collective MPI-IO: each rank writes its own cells into the shared file
+        if args.save_format == 'delta':
+            writer = DeltaSnapshotWriter(comm_obj.comm, SNAPSHOT_DELTA_FILE, total_rows, args.cols, SNAPSHOT_KEYFRAME_EVERY)
+        else:
+            writer = SnapshotWriter(comm_obj.comm, SNAPSHOT_FILE, (args.steps + SNAPSHOT_INTERVAL - 1) // SNAPSHOT_INTERVAL,
+                                    total_rows, args.cols, interval=SNAPSHOT_INTERVAL)
+
+    # Global counts from the kernels' own tallies. Summed every step when a stop
+    # condition needs them, otherwise only for the every-10-steps report.
+    counters = StepCounters(comm_obj.comm, total_rows * args.cols,
+                            burning=comm_obj.comm.allreduce(rule.count_burning(grid.data), op=MPI.SUM))
+    if meta is not None:
+        counters.burnt = comm_obj.comm.allreduce(grid.count_state(BURNT), op=MPI.SUM)
+    stop_early = args.stop_extinct or args.stop_burnt is not None
+    end_step = args.steps
+
+    checkpointer = None
+    if args.checkpoint_every:
+        checkpointer = Checkpointer(comm_obj.comm, CHECKPOINT_DIR,
+                                    {'rows': total_rows, 'cols': args.cols, 'seed': args.seed, 'rng': args.rng, 'rule': args.rule})
+
+    engine.warm_up()
+    timer = PhaseTimer(trace=args.trace is not None)
+    if args.trace:
+        timer.start_clock(comm_obj.comm)
     start_time = time.time()
     
     # Run the simulation
-    for step in range(args.steps):
-        requests = comm_obj.start_ghost_exchange(grid)
-        comm_obj.end_ghost_exchange(grid, requests)
-        new_data = update_grid(grid, heavy_load=args.heavy)
-        grid.commit_updates(new_data)
+    for step in range(first_step, args.steps):
+        timer.step = step
+        busy = sum(timer.totals.get(p, 0.0) for p in COMPUTE_PHASES)
+        if args.overlap:
+            counts = overlapped_step(comm_obj, grid, timer, heavy_load=args.heavy, rng=rng, step=step,
+                            update_rows=tiled.update_rows if tiled is not None else update_rows_fused)
+        else:
+            with timer.phase('halo'):
+                if deep is not None:
+                    deep.exchange(grid)
+                else:
+                    requests = comm_obj.start_ghost_exchange(grid)
+                    comm_obj.end_ghost_exchange(grid, requests)
+            with timer.phase('compute'):
+                counts = step_fn(grid, heavy_load=args.heavy, rng=rng, step=step)
+        if meter is not None and args.load_bands == 1:
+            meter.record(grid, sum(timer.totals.get(p, 0.0) for p in COMPUTE_PHASES) - busy)
         
         # Balance the load
-        if args.balance and step % args.balance_freq == 0:
-            balancer.redistribute(grid)
+        fired = balancer.stats['fired'] if balancer is not None else 0
+        if args.balance and args.balance_trigger is None and step % args.balance_freq == 0:
+            with timer.phase('balance'):
+                balancer.balance(grid)
+        elif args.balance and args.balance_trigger is not None:
+            # Act on the check posted at the previous balance step: its reduction
+            # completed behind this step's halo exchange and compute
+            with timer.phase('balance'):
+                balancer.balance(grid)
+                if step % args.balance_freq == 0:
+                    balancer.post_check(grid)
+        if deep is not None and balancer is not None and balancer.stats['fired'] != fired:
+            # Rows may have moved; every rank fires together, so all restart the cycle
+            deep.restart()
         
-        if step % 10 == 0:
-            total_burning = comm_obj.comm.reduce(np.sum(grid.data == BURNING), op=MPI.SUM, root=0)
-            if args.save:
-                full_grid = comm_obj.gather_grid(grid)
-                if rank == 0:
-                    np.save(f"results/logs/step_{step:03d}.npy", full_grid)
-            if rank == 0:
-                print(f"Step {step}: Total Burning = {total_burning}")
+        if args.save and step % args.save_every == 0:
+            with timer.phase('io'):
+                writer.write(step, grid)
+
+        if checkpointer is not None and (step + 1) % args.checkpoint_every == 0:
+            # The grid write overlaps the next steps; the previous one completes first
+            with timer.phase('checkpoint'):
+                checkpointer.save(step, grid)
+
+        # Totals for an earlier step arrive here, their sum having run behind
+        # this step; then this step's sum is posted
+        counters.add(counts)
+        with timer.phase('stats'):
+            done = counters.complete()
+            if stop_early or step % 10 == 0:
+                counters.post(step)
+        if rank == 0 and done is not None and done % 10 == 0:
+            print(f"Step {done}: Total Burning = {counters.burning}")
+        if done is not None and ((args.stop_extinct and counters.burning == 0) or
+                                 (args.stop_burnt is not None and counters.burnt_fraction() >= args.stop_burnt)):
+            # Every rank sees the same totals, so all stop after this step
+            end_step = step + 1
+            break
     
+    if checkpointer is not None:
+        checkpointer.complete()
     end_time = time.time()
+    steps_run = end_step - first_step
+    done = counters.complete()
+    if rank == 0 and done is not None and done % 10 == 0:
+        print(f"Step {done}: Total Burning = {counters.burning}")
+    if args.save and args.save_format != 'delta' and end_step < args.steps:
+        # Drop the frames of steps that never ran
+        writer.truncate((end_step + SNAPSHOT_INTERVAL - 1) // SNAPSHOT_INTERVAL)
+    if args.save:
+        writer.close()
+    if tiled is not None:
+        tiled.close()
     
     if rank == 0:
+        if meta is not None:
+            print(f"Resumed from {args.restart} at step {first_step}.")
+        if end_step < args.steps:
+            print(f"Stopped early after {steps_run} steps (step {counters.step}: {counters.burning} burning, {counters.burnt_fraction():.1%} burnt)")
         print(f"Simulation completed in {end_time - start_time:.4f} seconds.")
+        print(f"Time per step: {(end_time - start_time) / max(steps_run, 1) * 1000:.3f} ms")
+        if resource is not None:
+            # ru_maxrss is in KB on Linux
+            print(f"Peak RSS (rank 0): {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+
+    if balancer is not None:
+        balancer.report(rank)
+
+    if args.timing:
+        timer.report(comm_obj.comm, rank)
+    if args.trace:
+        timer.write_trace(comm_obj.comm, rank, args.trace, metadata={'config': vars(args), 'ranks': size})
+
+    # Rank 0 gets every rank's timings for this run
+    return comm_obj.comm.gather({'elapsed': end_time - start_time, 'phases': timer.totals}, root=0)
 
 if __name__ == "__main__":
     main()
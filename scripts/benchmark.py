@@ -1,62 +1,140 @@
 import subprocess
-import time
-import matplotlib.pyplot as plt
+import argparse
+import json
 import os
+import shlex
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.timing import summarize, compare
+
+RESULTS_FILE = "results/benchmark.json"
 
-def run_benchmark(procs, steps=100, size=1000, balance=False):
-    
+def run_benchmark(name, procs, rows, cols, args, engine='dense', balance=False):
+    # One mpiexec launch; main.py repeats the run --warmup + --trials times in
+    # process and reports every rank's loop and phase times per trial
+    fd, bench_json = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    cmd = shlex.split(args.mpiexec) + ["-n", str(procs), sys.executable, "main.py",
+           "--rows", str(rows), "--cols", str(cols),
+           "--steps", str(args.steps), "--fire-pos", "top",
+           "--engine", engine,
+           "--trials", str(args.trials), "--warmup", str(args.warmup),
+           "--bench-json", bench_json] + shlex.split(args.main_args)
+    if balance:
+        cmd.append("--balance")
+
+    print(f"{name}: {procs} procs, {rows}x{cols}, {args.warmup}+{args.trials} runs...")
     try:
-        cmd = ["mpiexec", "-n", str(procs), "python", "main.py", 
-           "--rows", str(size), "--cols", str(size), 
-           "--steps", str(steps), "--fire-pos", "top"]
-           
-        if balance:
-            cmd.append("--balance")
-        
-        start = time.time()
-
-        subprocess.run(cmd, check=True, capture_output=True)
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
-        print(f"Failed to run with {procs} procs: {e}")
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        with open(bench_json) as f:
+            report = json.load(f)
+    except (subprocess.CalledProcessError, FileNotFoundError, ValueError) as e:
+        print(f"  failed: {e}")
+        if getattr(e, 'stderr', None):
+            print((e.stdout + e.stderr).strip()[-600:])
         return None
-    
-    end = time.time()
-    return end - start
+    finally:
+        os.remove(bench_json)
+
+    summary = summarize(report['trials'], args.steps)
+    step = summary['step']
+    print(f"  {step['mean']:.3f} ± {step['std']:.3f} ms/step (slowest rank)")
+    return {'procs': procs, 'rows': rows, 'cols': cols, 'engine': engine, 'balance': balance,
+            'summary': summary, 'trials': report['trials'], 'environment': report['environment']}
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], check=True, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], check=True, capture_output=True, text=True).stdout
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    return out + ("-dirty" if dirty.strip() else "")
+
+def report_regressions(baseline_path, runs, alpha, min_change):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['runs']
+    rows = compare(baseline, runs, alpha=alpha, min_change=min_change)
+    print(f"\nComparison with {baseline_path} (permutation test, alpha={alpha}, min slowdown {min_change:.0%}):")
+    print(f"{'run':<32} {'metric':<10} {'base ms':>9} {'now ms':>9} {'change':>8} {'p':>7}")
+    for name, metric, base, now, change, p, regressed in rows:
+        print(f"{name:<32} {metric:<10} {base:9.3f} {now:9.3f} {change:+8.1%} {p:7.3f}" + ("  REGRESSION" if regressed else ""))
+    return [r for r in rows if r[-1]]
+
+def plot(runs, path):
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 2, figsize=(11, 4))
+    for ax, sweep in zip(axes, ("strong", "weak")):
+        series = {}
+        for run in runs.values():
+            if run['sweep'] == sweep:
+                series.setdefault(run['label'], []).append((run['procs'], run['summary']['step']['mean'], run['summary']['step']['std']))
+        for label, points in series.items():
+            procs, means, stds = zip(*sorted(points))
+            ax.errorbar(procs, means, yerr=stds, marker='o', capsize=3, label=label)
+        ax.set_xlabel('Number of Processes')
+        ax.set_ylabel('Time per step (ms)')
+        ax.set_title(f'{sweep.capitalize()} scaling')
+        ax.grid(True)
+        if series:
+            ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    print(f"Plot saved to {path}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Strong/weak scaling benchmark with per-phase timings and regression checks")
+    parser.add_argument("--engines", nargs="+", default=["dense"], help="Update kernels to compare")
+    parser.add_argument("--modes", nargs="+", choices=["static", "dynamic"], default=["static", "dynamic"], help="Run without and/or with --balance")
+    parser.add_argument("--sweeps", nargs="+", choices=["strong", "weak"], default=["strong", "weak"], help="strong: fixed SIZE x SIZE grid; weak: SIZE rows per process")
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--trials", type=int, default=5, help="Timed runs per configuration")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per configuration")
+    parser.add_argument("--mpiexec", default="mpiexec", help="Launcher command, e.g. 'mpiexec --oversubscribe'")
+    parser.add_argument("--main-args", default="", help="Extra main.py arguments for every run, e.g. '--rng counter'")
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--baseline", default=None, metavar="PATH", help="Earlier benchmark JSON to check for regressions (exit status 1 if any)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level for --baseline")
+    parser.add_argument("--min-change", type=float, default=0.05, help="Smallest relative slowdown reported as a regression")
+    parser.add_argument("--plot", default=None, metavar="PNG", help="Also plot step time against process count (needs matplotlib)")
+    args = parser.parse_args()
 
-    if not os.path.exists("results"):
-        os.makedirs("results")
-        
-    procs_list = [1, 2, 4] 
-    times_static = []
-    times_dynamic = []
-    
     print("Running Benchmarks...")
-    
-    for p in procs_list:
-        print(f"Testing with {p} processes (Static)...")
-        t = run_benchmark(p, balance=False)
-        times_static.append(t)
-        
-        print(f"Testing with {p} processes (Dynamic)...")
-        t = run_benchmark(p, balance=True)
-        times_dynamic.append(t)
-        
-    plt.figure()
-
-    plt.plot(procs_list, times_static, 'o-', label='Static')
-    plt.plot(procs_list, times_dynamic, 's-', label='Dynamic')
-    
-    plt.xlabel('Number of Processes')
-    plt.ylabel('Time (s)')
-    plt.title('Scaling Performance')
-    plt.legend()
-    plt.grid(True)
-    
-    plt.savefig('results/scaling.png')
-
-    print("Benchmark saved to results/scaling.png")
+    runs = {}
+    for sweep in args.sweeps:
+        for engine in args.engines:
+            for mode in args.modes:
+                for p in args.procs:
+                    name = f"{sweep}-{engine}-{mode}-p{p}"
+                    rows = args.size * p if sweep == "weak" else args.size
+                    run = run_benchmark(name, p, rows, args.size, args, engine=engine, balance=mode == "dynamic")
+                    if run is not None:
+                        run.update(sweep=sweep, label=f"{mode.capitalize()} ({engine})")
+                        runs[name] = run
+
+    environment = next((run.pop('environment') for run in runs.values()), None)
+    for run in runs.values():
+        run.pop('environment', None)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({'created': time.strftime("%Y-%m-%dT%H:%M:%S"), 'commit': git_commit(),
+                   'environment': environment, 'settings': vars(args), 'runs': runs}, f, indent=1)
+    print(f"Benchmark saved to {args.output}")
+
+    if args.plot:
+        plot(runs, args.plot)
+
+    if args.baseline:
+        regressions = report_regressions(args.baseline, runs, args.alpha, args.min_change)
+        if regressions:
+            print(f"{len(regressions)} significant regression(s)")
+            sys.exit(1)
+        print("No significant regressions")
 
 if __name__ == "__main__":
     main()
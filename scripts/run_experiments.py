@@ -2,66 +2,74 @@ import subprocess
 import time
 import json
 import os
+import sys
+import glob
+import hashlib
 import argparse
-import matplotlib.pyplot as plt
 
 RESULTS_FILE = "results/final_results.json"
+# Append-only record of every job run: one JSON object per line
+STORE_FILE = "results/experiments.jsonl"
+LOG_DIR = "results/logs/experiments"
 
-def run_simulation(name, rows, cols, steps, procs, fire_pos, heavy=False, balance_freq=10, balance=True, cpp=False):
-    print(f"Running {name} ({rows}x{cols}, {steps} steps, {procs} procs, Pos={fire_pos}, CPP={cpp})...")
-    
-    if cpp:
-        cmd = [
-            "mpiexec", "-n", str(procs), "simulation.exe",
-            "--rows", str(rows), "--cols", str(cols),
-            "--steps", str(steps), "--fire-pos", fire_pos
+# Files whose contents define each implementation's code version; any change
+# invalidates the cached results of that implementation
+PY_SOURCES = ["main.py", "src/*.py"]
+CPP_SOURCES = ["src/cpp/*.cpp", "simulation.exe"]
+
+def code_version(patterns):
+    digest = hashlib.sha256()
+    for path in sorted(p for pattern in patterns for p in glob.glob(pattern)):
+        digest.update(path.encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def build_command(job, mpiexec):
+    if job["cpp"]:
+        cmd = mpiexec + ["-n", str(job["procs"]), "simulation.exe",
+            "--rows", str(job["rows"]), "--cols", str(job["cols"]),
+            "--steps", str(job["steps"]), "--fire-pos", job["fire_pos"]
         ]
-        if balance:
-            cmd.append("--balance")
-        if heavy:
-            cmd.append("--heavy")
     else:
-        cmd = [
-            "mpiexec", "-n", str(procs), "python", "main.py",
-            "--rows", str(rows), "--cols", str(cols),
-            "--steps", str(steps), "--fire-pos", fire_pos,
-            "--balance-freq", str(balance_freq)
+        cmd = mpiexec + ["-n", str(job["procs"]), sys.executable, "main.py",
+            "--rows", str(job["rows"]), "--cols", str(job["cols"]),
+            "--steps", str(job["steps"]), "--fire-pos", job["fire_pos"],
+            "--balance-freq", str(job["balance_freq"])
         ]
-        if heavy:
-            cmd.append("--heavy")
-        if balance:
-            cmd.append("--balance")
-    
-    start_time = time.time()
-    try:
-        subprocess.run(cmd, check=True, capture_output=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error running {name}: {e}")
-        return None
-    end_time = time.time()
-    
-    duration = end_time - start_time
-    print(f"  -> Finished in {duration:.4f}s")
-    return duration
+    if job["heavy"]:
+        cmd.append("--heavy")
+    if job["balance"]:
+        cmd.append("--balance")
+    return cmd
+
+# Labels, not configuration: renaming an experiment keeps its cached results
+LABELS = ("experiment", "mode", "name", "key")
+
+def job_key(job, versions):
+    # Content hash of the run's configuration and the code it runs
+    config = {k: v for k, v in job.items() if k not in LABELS}
+    config["code"] = versions["cpp" if job["cpp"] else "py"]
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
 
 def generate_suite(suite_type):
     experiments = []
-    
+
     sizes = [
         {"label": "Small", "rows": 200, "cols": 200, "steps": 100},
         {"label": "Medium", "rows": 500, "cols": 500, "steps": 150},
         {"label": "Large", "rows": 1000, "cols": 1000, "steps": 200}
     ]
-    
+
     procs_list = [2, 4, 8]
     positions = ["center", "top", "corner"]
-    
+
     for size in sizes:
         for procs in procs_list:
             for pos in positions:
                 # Construct name
                 base_name = f"{suite_type}_{size['label']}_P{procs}_{pos}"
-                
+
                 exp = {
                     "name": base_name,
                     "rows": size["rows"],
@@ -75,9 +83,121 @@ def generate_suite(suite_type):
                 experiments.append(exp)
     return experiments
 
+def expand_jobs(experiments):
+    # One job per experiment and mode
+    jobs = []
+    for exp in experiments:
+        for mode, balance in (("Static", False), ("Dynamic", True)):
+            jobs.append({"experiment": exp["name"], "mode": mode, "rows": exp["rows"], "cols": exp["cols"],
+                         "steps": exp["steps"], "procs": exp["procs"], "fire_pos": exp["fire_pos"],
+                         "heavy": exp["heavy"], "cpp": exp["cpp"], "balance": balance, "balance_freq": 10})
+    return jobs
+
+def load_store():
+    # Latest successful record per key; a torn last line from an interrupted
+    # sweep is skipped
+    done = {}
+    if not os.path.exists(STORE_FILE):
+        return done
+    with open(STORE_FILE) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                done[record["key"]] = record
+    return done
+
+def append_record(record):
+    # One write per line, so concurrent appends and interruptions never corrupt
+    # earlier records
+    with open(STORE_FILE, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+def schedule(jobs, cores, mpiexec):
+    # Packs jobs onto cores by process count: largest first, starting any job
+    # that fits in the free cores. A job wider than the machine runs alone.
+    queue = sorted(jobs, key=lambda j: -j["procs"])
+    running = []
+    free = cores
+    os.makedirs(LOG_DIR, exist_ok=True)
+    try:
+        _run_queue(queue, running, free, cores, mpiexec)
+    except KeyboardInterrupt:
+        # Finished jobs are already in the store; the next run resumes from there
+        for _, proc, log, _, _ in running:
+            proc.terminate()
+            proc.wait()
+            log.close()
+        print(f"Interrupted; {len(running)} running and {len(queue)} queued jobs left for the next run")
+        sys.exit(1)
+
+def _run_queue(queue, running, free, cores, mpiexec):
+    while queue or running:
+        for job in list(queue):
+            width = min(job["procs"], cores)
+            if width <= free:
+                queue.remove(job)
+                free -= width
+                log = open(os.path.join(LOG_DIR, job["key"] + ".log"), "w")
+                cmd = build_command(job, mpiexec)
+                print(f"Starting {job['name']} ({job['procs']} procs, {free} cores free)")
+                proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+                running.append((job, proc, log, width, time.time()))
+        time.sleep(0.05)
+        for entry in list(running):
+            job, proc, log, width, start = entry
+            if proc.poll() is None:
+                continue
+            duration = time.time() - start
+            running.remove(entry)
+            log.close()
+            free += width
+            record = {"key": job["key"], "name": job["name"], "job": job, "status": "ok" if proc.returncode == 0 else "failed",
+                      "returncode": proc.returncode, "duration": duration, "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                      "log": log.name}
+            append_record(record)
+            if proc.returncode == 0:
+                print(f"  {job['name']} -> Finished in {duration:.4f}s")
+            else:
+                print(f"  {job['name']} -> FAILED (exit {proc.returncode}), see {log.name}")
+
+def export_results(experiments, versions):
+    # final_results.json (read by visualize_all.py) from the store: experiments
+    # whose jobs have not succeeded get None timings
+    done = load_store()
+    results = []
+    times = {(job["experiment"], job["mode"]): done.get(job_key(job, versions), {}).get("duration")
+             for job in expand_jobs(experiments)}
+    for exp in experiments:
+        results.append({"name": exp["name"], "config": exp,
+                        "time_static": times[(exp["name"], "Static")], "time_dynamic": times[(exp["name"], "Dynamic")]})
+
+    final_data = []
+    if os.path.exists(RESULTS_FILE):
+        try:
+            with open(RESULTS_FILE, "r") as f:
+                final_data = json.load(f)
+        except ValueError:
+            pass
+    by_name = {r["name"]: i for i, r in enumerate(final_data)}
+    for new_r in results:
+        if new_r["name"] in by_name:
+            final_data[by_name[new_r["name"]]] = new_r
+        else:
+            final_data.append(new_r)
+    with open(RESULTS_FILE, "w") as f:
+        json.dump(final_data, f, indent=4)
+    print(f"Results saved to {RESULTS_FILE}")
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--suite", choices=["python", "cpp", "all", "test"], default="test")
+    parser.add_argument("--cores", type=int, default=os.cpu_count(), help="Cores to pack concurrent jobs onto (default: all)")
+    parser.add_argument("--mpiexec", default="mpiexec", help="Launcher command, e.g. 'mpiexec --oversubscribe'")
+    parser.add_argument("--force", action="store_true", help="Rerun jobs that already have a cached result")
+    parser.add_argument("--dry-run", action="store_true", help="List the jobs that would run and exit")
     args = parser.parse_args()
 
     if not os.path.exists("results"):
@@ -95,46 +215,24 @@ def main():
     elif args.suite == "all":
         experiments = generate_suite("Cpp") + generate_suite("Py")
 
-    results = []
-    
-    for exp in experiments:
-        # Run Static
-        time_static = run_simulation(exp["name"] + "_Static", exp["rows"], exp["cols"], exp["steps"], exp["procs"], exp["fire_pos"], heavy=exp["heavy"], balance=False, cpp=exp["cpp"])
-        
-        # Run Dynamic
-        time_dynamic = run_simulation(exp["name"] + "_Dynamic", exp["rows"], exp["cols"], exp["steps"], exp["procs"], exp["fire_pos"], heavy=exp["heavy"], balance=True, cpp=exp["cpp"])
-        
-        results.append({
-            "name": exp["name"],
-            "config": exp,
-            "time_static": time_static,
-            "time_dynamic": time_dynamic
-        })
-
-    # Save results
-    final_data = []
-    if os.path.exists(RESULTS_FILE):
-        try:
-            with open(RESULTS_FILE, "r") as f:
-                final_data = json.load(f)
-        except:
-            pass
-            
-    # Update or append
-    for new_r in results:
-        found = False
-        for i, old_r in enumerate(final_data):
-            if old_r["name"] == new_r["name"]:
-                final_data[i] = new_r
-                found = True
-                break
-        if not found:
-            final_data.append(new_r)
-            
-    with open(RESULTS_FILE, "w") as f:
-        json.dump(final_data, f, indent=4)
-    
-    print(f"Results saved to {RESULTS_FILE}")
+    versions = {"py": code_version(PY_SOURCES), "cpp": code_version(CPP_SOURCES)}
+    jobs = expand_jobs(experiments)
+    for job in jobs:
+        job["name"] = f"{job['experiment']}_{job['mode']}"
+        job["key"] = job_key(job, versions)
+
+    # Jobs with a result for the current code are skipped, so rerunning an
+    # interrupted sweep resumes it
+    done = {} if args.force else load_store()
+    pending = [job for job in jobs if job["key"] not in done]
+    print(f"{len(jobs)} jobs, {len(jobs) - len(pending)} cached, {len(pending)} to run on {args.cores} cores")
+    if args.dry_run:
+        for job in pending:
+            print(f"  {job['name']} ({job['procs']} procs)")
+        return
+
+    schedule(pending, args.cores, args.mpiexec.split())
+    export_results(experiments, versions)
 
 if __name__ == "__main__":
     main()
@@ -1,40 +1,104 @@
-import matplotlib.pyplot as plt
+import argparse
 import numpy as np
 import glob
 import os
 import re
+import sys
+from multiprocessing import Pool
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-def plot_heatmap(npy_file, output_file):
+from src.snapshots import load_snapshots, DeltaSnapshotReader
+from src.render import scale_for, to_rgb, write_png
+from src.config import SNAPSHOT_INTERVAL, SNAPSHOT_FILE, SNAPSHOT_DELTA_FILE, COLOR_MAP
 
-    data = np.load(npy_file)
+OUTPUT_DIR = "results/plots"
 
-    plt.figure(figsize=(10, 10))
+def plot_heatmap(data, title, output_file):
+    # Slow path with title and colour bar, for --matplotlib
+    import matplotlib.pyplot as plt
     from matplotlib.colors import ListedColormap
-    cmap = ListedColormap(['green', 'red', 'black'])
-    
-    plt.imshow(data, cmap=cmap, vmin=0, vmax=2, interpolation='nearest')
-    plt.title(f"Simulation State: {os.path.basename(npy_file)}")
-    plt.colorbar(ticks=[0, 1, 2], label='State (0=Fuel, 1=Burning, 2=Burnt)')
+
+    plt.figure(figsize=(10, 10))
+    # Same colours as the PNG path, including the states only rule models use
+    states = sorted(COLOR_MAP)
+    cmap = ListedColormap([COLOR_MAP[s] for s in states])
+
+    plt.imshow(data, cmap=cmap, vmin=0, vmax=states[-1], interpolation='nearest')
+    plt.title(f"Simulation State: {title}")
+    plt.colorbar(ticks=states, label='State (0=Fuel, 1=Burning, 2=Burnt, 3=Smouldering)')
     plt.savefig(output_file)
     plt.close()
-    print(f"Saved {output_file}")
 
-def main():
+def render(data, step, opts):
+    output = os.path.join(OUTPUT_DIR, f"heatmap_step_{step}.png")
+    if opts.matplotlib:
+        plot_heatmap(data, f"step {step}", output)
+    else:
+        write_png(output, to_rgb(data, scale_for(data.shape, opts.size)))
+    return output
 
-    files = sorted(glob.glob("results/logs/step_*.npy"))
-    if not files:
-        print("No .npy files found in results/logs/. Run main.py with --save.")
-        return
+# Workers open the input themselves, so only file names and frame numbers cross
+# the process boundary and each worker holds one frame at a time
+
+def render_npy(job):
+    path, frames, opts = job
+    snapshots = load_snapshots(path)
+    return [render(snapshots[i], f"{i * SNAPSHOT_INTERVAL:03d}", opts) for i in frames]
 
-    print(f"Found {len(files)} snapshots. Generating images...")
-    
+def render_delta(job):
+    # A contiguous run of records, so the reader replays one delta per frame
+    path, frames, opts = job
+    reader = DeltaSnapshotReader(path)
+    return [render(reader[i], f"{reader.steps[i]:03d}", opts) for i in frames]
+
+def render_files(job):
+    files, _, opts = job
+    out = []
     for f in files:
         step_match = re.search(r"step_(\d+)", f)
-        step = step_match.group(1) if step_match else "unknown"
-        output = f"results/plots/heatmap_step_{step}.png"
-        plot_heatmap(f, output)
-        
-    print("Done.")
+        out.append(render(np.load(f, mmap_mode='r'), step_match.group(1) if step_match else "unknown", opts))
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description='Render saved snapshots to PNG frames')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Rendering processes')
+    parser.add_argument('--size', type=int, default=1000, help='Longest image side in pixels: larger grids are downsampled, smaller ones scaled up by an integer factor')
+    parser.add_argument('--input', help=f'Snapshot file to render (.delta or .npy; default: the newer of {SNAPSHOT_DELTA_FILE} and {SNAPSHOT_FILE})')
+    parser.add_argument('--matplotlib', action='store_true', help='Draw titled matplotlib figures with a colour bar (slow)')
+    opts = parser.parse_args()
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    if opts.input:
+        if not os.path.exists(opts.input):
+            parser.error(f"{opts.input} does not exist")
+        source = opts.input
+    else:
+        # The most recent --save output, whichever format it was written in
+        saved = [f for f in (SNAPSHOT_DELTA_FILE, SNAPSHOT_FILE) if os.path.exists(f)]
+        source = max(saved, key=os.path.getmtime) if saved else None
+    if source is None:
+        # Per-step files written by older runs
+        files = sorted(glob.glob("results/logs/step_*.npy"))
+        worker, path, count = render_files, files, len(files)
+        source = "results/logs/step_*.npy"
+    elif source.endswith(".delta"):
+        worker, path, count = render_delta, source, len(DeltaSnapshotReader(source))
+    else:
+        # Memory-mapped: only the frames being drawn are read from disk
+        worker, path, count = render_npy, source, len(load_snapshots(source))
+    if not count:
+        print(f"No snapshots found in {SNAPSHOT_DELTA_FILE}, {SNAPSHOT_FILE} or results/logs/step_*.npy. Run main.py with --save.")
+        return
+
+    print(f"Found {count} snapshots in {source}. Generating images with {opts.workers} workers...")
+    chunks = [c for c in np.array_split(np.arange(count), max(opts.workers, 1)) if len(c)]
+    if worker is render_files:
+        jobs = [([path[i] for i in c], None, opts) for c in chunks]
+    else:
+        jobs = [(path, c, opts) for c in chunks]
+    with Pool(len(jobs)) as pool:
+        done = sum(len(outputs) for outputs in pool.imap_unordered(worker, jobs))
+    print(f"Done: {done} frames in {OUTPUT_DIR}/")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,112 @@
+import json
+import os
+import numpy as np
+from src.mpi_comm import MPI
+from src.snapshots import npy_header
+from src.load_balancer import partition_rows
+from src.config import BURNING, LB_ROW_COST
+
+GRID_FILE = "grid.npy"
+ROW_BURNING_FILE = "row_burning.npy"
+META_FILE = "meta.json"
+
+# Parallel checkpoints. Each one is a directory holding:
+# - grid.npy: the whole (rows, cols) grid, written collectively with MPI-IO, each
+#   rank's cells at their global position as in SnapshotWriter;
+# - row_burning.npy: burning cells per global row, so a restart on another rank
+#   count can partition by load without reading the grid;
+# - meta.json: the step, grid size, RNG key and strip boundaries.
+# The grid write is non-blocking and finishes behind the following steps.
+# meta.json is written last, so a directory without it is incomplete.
+class Checkpointer:
+
+    def __init__(self, comm, root, run_info):
+        self.comm = comm
+        self.root = root
+        # Run settings stored with every checkpoint (rows, cols, seed, rng, ...)
+        self.run_info = run_info
+        self.pending = None
+
+    def save(self, step, grid):
+        # Collective: checkpoint of the state after step; the previous one is finished first
+        self.complete()
+        rows, cols = self.run_info['rows'], self.run_info['cols']
+        path = os.path.join(self.root, f"step_{step:06d}")
+        if self.comm.Get_rank() == 0:
+            os.makedirs(path, exist_ok=True)
+        self.comm.Barrier()
+
+        header = npy_header((rows, cols))
+        fh = MPI.File.Open(self.comm, os.path.join(path, GRID_FILE), MPI.MODE_WRONLY | MPI.MODE_CREATE)
+        fh.Set_size(len(header) + rows * cols)
+        if self.comm.Get_rank() == 0:
+            fh.Write_at(0, np.frombuffer(header, dtype=np.uint8))
+        # Private copy: the grid keeps changing while the write is in flight
+        local = np.ascontiguousarray(grid.data, dtype=np.int8).copy()
+        filetype = None
+        if local.size:
+            filetype = MPI.INT8_T.Create_subarray([rows, cols], list(local.shape), [grid.offset, grid.col_offset]).Commit()
+            fh.Set_view(len(header), MPI.INT8_T, filetype)
+        else:
+            # Still takes part in the collective calls
+            fh.Set_view(len(header), MPI.INT8_T, MPI.INT8_T)
+        request = fh.Iwrite_all(local) if hasattr(fh, 'Iwrite_all') else None
+        if request is None:
+            fh.Write_all(local)
+
+        # Small and needed by rank 0 only: where every rank's cells are, and
+        # their burning cells per row
+        burning = np.count_nonzero(grid.data == BURNING, axis=1)
+        parts = self.comm.gather((grid.offset, grid.rows, grid.col_offset, burning), root=0)
+        self.pending = (step, path, fh, request, local, filetype, parts)
+
+    def complete(self):
+        # Collective: waits for the pending grid write and then publishes its metadata
+        if self.pending is None:
+            return
+        step, path, fh, request, local, filetype, parts = self.pending
+        self.pending = None
+        if request is not None:
+            request.Wait()
+        # Close is collective and flushes every rank's data
+        fh.Close()
+        if filetype is not None:
+            filetype.Free()
+        if self.comm.Get_rank() != 0:
+            return
+        row_burning = np.zeros(self.run_info['rows'], dtype=np.int64)
+        for offset, rows, _, burning in parts:
+            row_burning[offset:offset + rows] += burning
+        np.save(os.path.join(path, ROW_BURNING_FILE), row_burning)
+        # Strip boundaries, as left by the balancer; None for 2D blocks
+        strips = all(col_offset == 0 for _, _, col_offset, _ in parts)
+        bounds = [int(offset) for offset, _, _, _ in parts] + [self.run_info['rows']] if strips else None
+        meta = dict(self.run_info, step=step, ranks=len(parts), bounds=bounds)
+        tmp = os.path.join(path, META_FILE + ".tmp")
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=1)
+        os.replace(tmp, os.path.join(path, META_FILE))
+
+def load_meta(path):
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"{path} is not a complete checkpoint (no {META_FILE})")
+    with open(meta_path) as f:
+        return json.load(f)
+
+def restart_bounds(path, meta, parts, balance=False, min_rows=1):
+    # Strip boundaries for a restart on parts ranks: the saved ones if the rank
+    # count is unchanged, otherwise split by load with --balance. None means
+    # split evenly, as a fresh run does.
+    bounds = meta.get('bounds')
+    if bounds is not None and len(bounds) == parts + 1:
+        return np.array(bounds)
+    if balance:
+        costs = LB_ROW_COST + np.load(os.path.join(path, ROW_BURNING_FILE))
+        return partition_rows(costs, parts, min_rows=min_rows)
+    return None
+
+def read_cells(path, offset, rows, col_offset, cols):
+    # This rank's cells, read through a memory map: only its own rows are touched
+    grid = np.load(os.path.join(path, GRID_FILE), mmap_mode='r')
+    return np.array(grid[offset:offset + rows, col_offset:col_offset + cols])
@@ -1,6 +1,8 @@
 FUEL = 0
 BURNING = 1
 BURNT = 2
+# Only used by rule models that declare it (see RULES)
+SMOULDERING = 3
 
 P_IGNITE = 0.01
 P_SPREAD = 0.5
@@ -8,15 +10,84 @@ P_SPREAD = 0.5
 COLOR_MAP = {
     FUEL: [0, 1, 0],      
     BURNING: [1, 0, 0],   
-    BURNT: [0, 0, 0]      
+    BURNT: [0, 0, 0],
+    SMOULDERING: [0.6, 0.2, 0]
+}
+
+# Cellular automaton models for --engine lut, chosen with --rule. Each lists the
+# neighbour offsets (drow, dcol) a cell reads, the states that count as burning
+# for its neighbours, and a transition for every state: a cell moves to 'next',
+# or to 'ignite' instead with probability 1 - (1 - spread) ** n for n burning
+# neighbours, or (with 'spontaneous') through a spontaneous ignition (P_IGNITE).
+# The halo depth and diagonal ghost cells a model needs follow from its offsets.
+VON_NEUMANN = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+MOORE = VON_NEUMANN + [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+RULES = {
+    # The fixed kernels' rule
+    'wildfire': {
+        'neighbors': VON_NEUMANN,
+        'burning': [BURNING],
+        'transitions': {
+            FUEL: {'next': FUEL, 'ignite': BURNING, 'spread': P_SPREAD, 'spontaneous': True},
+            BURNING: {'next': BURNT},
+            BURNT: {'next': BURNT},
+        },
+    },
+    # Diagonal neighbours too, each less likely to pass the fire on
+    'moore': {
+        'neighbors': MOORE,
+        'burning': [BURNING],
+        'transitions': {
+            FUEL: {'next': FUEL, 'ignite': BURNING, 'spread': 0.3, 'spontaneous': True},
+            BURNING: {'next': BURNT},
+            BURNT: {'next': BURNT},
+        },
+    },
+    # Cells burn for two steps, still spreading the fire while they smoulder
+    'smoulder': {
+        'neighbors': VON_NEUMANN,
+        'burning': [BURNING, SMOULDERING],
+        'transitions': {
+            FUEL: {'next': FUEL, 'ignite': BURNING, 'spread': P_SPREAD, 'spontaneous': True},
+            BURNING: {'next': SMOULDERING},
+            BURNT: {'next': BURNT},
+            SMOULDERING: {'next': BURNT},
+        },
+    },
 }
 
 # MPI Tags
 TAG_UP = 1
 TAG_DOWN = 2
+TAG_LEFT = 3
+TAG_RIGHT = 4
 TAG_LOAD = 10
 TAG_BAL = 11
 TAG_CMD = 12
 
 # Load Balancing
 LB_THRESHOLD = 5
+# Baseline cost of a row in the global balancer, on top of its burning cells
+LB_ROW_COST = 1
+# Measured-time metric: balance intervals the per-row costs are smoothed over,
+# and the relative difference that counts as imbalance
+LB_WINDOW = 5
+LB_TIME_THRESHOLD = 0.1
+# Row migration: spare rows a Grid allocates above and below its rows, as a
+# fraction of them (at least ROW_HEADROOM_MIN), so gaining rows rarely reallocates
+ROW_HEADROOM = 0.25
+ROW_HEADROOM_MIN = 8
+
+# Snapshots (--save): one frame every SNAPSHOT_INTERVAL steps, all in one file;
+# the delta format stores a full keyframe every SNAPSHOT_KEYFRAME_EVERY records
+SNAPSHOT_INTERVAL = 10
+SNAPSHOT_FILE = "results/logs/snapshots.npy"
+SNAPSHOT_DELTA_FILE = "results/logs/snapshots.delta"
+SNAPSHOT_KEYFRAME_EVERY = 50
+
+# Monte Carlo ensembles (--ensemble): aggregated maps and default arrival-time bins
+ENSEMBLE_FILE = "results/logs/ensemble.npz"
+ENSEMBLE_BINS = 10
+
+# Checkpoints (--checkpoint-every): one directory per checkpoint under this one
+CHECKPOINT_DIR = "results/checkpoints"
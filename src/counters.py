@@ -0,0 +1,62 @@
+import numpy as np
+from src.mpi_comm import MPI
+
+# Global fire statistics built from the (newly ignited, newly burnt) counts the
+# kernels return, so no rank rescans its grid to report them. The sum for one
+# step is a non-blocking Iallreduce that completes behind the next step's halo
+# exchange and compute; every rank gets the same totals, so decisions made on
+# them (like stopping early) are taken together.
+class StepCounters:
+
+    def __init__(self, comm, total_cells, burning=0):
+        self.comm = comm
+        self.total_cells = total_cells
+        self.local = np.zeros(2, dtype=np.int64)
+        self.result = np.zeros(2, dtype=np.int64)
+        self.request = None
+        self.pending = None
+        # This rank's counts not yet sent: cells ignited and burnt out since the
+        # last post (sums stay valid when rows migrate)
+        self.unsent_ignited = 0
+        self.unsent_burnt = 0
+        # Global totals as of the last completed step; burning starts from the
+        # cells burning before the first step
+        self.step = None
+        self.burning = burning
+        self.burnt = 0
+
+    def add(self, counts):
+        # This rank's (newly ignited, newly burnt) counts for one step
+        self.unsent_ignited += counts[0]
+        self.unsent_burnt += counts[1]
+
+    def post(self, step):
+        # Starts the global sum as of step (the last one added); the previous sum
+        # must be complete
+        self.local[:] = (self.unsent_ignited, self.unsent_burnt)
+        self.unsent_ignited = self.unsent_burnt = 0
+        if hasattr(self.comm, 'Iallreduce'):
+            self.request = self.comm.Iallreduce(self.local, self.result, op=MPI.SUM)
+        else:
+            # Communicators without non-blocking collectives (the shared-memory backend)
+            self.result[:] = self.comm.allreduce(self.local, op=MPI.SUM)
+        self.pending = step
+
+    def complete(self):
+        # Waits for the posted sum and folds it into the totals; returns its step,
+        # or None if nothing was posted
+        if self.pending is None:
+            return None
+        if self.request is not None:
+            self.request.Wait()
+            self.request = None
+        ignited, burnt = self.result
+        # Cells may burn for several steps (rule models), so the burning total
+        # is carried forward rather than taken from the last step's ignitions
+        self.burning += int(ignited) - int(burnt)
+        self.burnt += int(burnt)
+        self.step, self.pending = self.pending, None
+        return self.step
+
+    def burnt_fraction(self):
+        return self.burnt / self.total_cells if self.total_cells else 0.0
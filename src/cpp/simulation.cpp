@@ -6,6 +6,12 @@
 #include <chrono>
 #include <thread>
 #include <string>
+#include <cstdint>
+#include <cmath>
+
+// One byte per cell; three states don't need a 4-byte int
+typedef int8_t Cell;
+#define MPI_CELL MPI_INT8_T
 
 const int FUEL = 0;
 const int BURNING = 1;
@@ -16,20 +22,157 @@ const double P_SPREAD = 0.5;
 const int TAG_BAL = 11;
 const int TAG_CMD = 12;
 const int LB_THRESHOLD = 5;
+const int LB_ROW_COST = 1;  // Baseline cost of a row in the global balancer
+
+// Counter-based RNG: Philox4x32-10, same scheme as src/rng.py. A draw depends only
+// on (seed, step, global row, col, stream), so results don't change with the rank
+// count or with load balancing.
+const int STREAM_SPREAD = 0;
+const int STREAM_SPONTANEOUS = 1;
+const int MAX_SKIP_TABLE = 4096;
+
+uint32_t philox4x32(uint32_t c0, uint32_t c1, uint32_t c2, uint32_t c3, uint32_t k0, uint32_t k1) {
+    for (int i = 0; i < 10; ++i) {
+        if (i) {
+            k0 += 0x9E3779B9u;
+            k1 += 0xBB67AE85u;
+        }
+        uint64_t p0 = (uint64_t)0xD2511F53u * c0;
+        uint64_t p1 = (uint64_t)0xCD9E8D57u * c2;
+        uint32_t n0 = (uint32_t)(p1 >> 32) ^ c1 ^ k0;
+        uint32_t n2 = (uint32_t)(p0 >> 32) ^ c3 ^ k1;
+        c0 = n0;
+        c1 = (uint32_t)p1;
+        c2 = n2;
+        c3 = (uint32_t)p0;
+    }
+    return c0;
+}
+
+struct CounterRNG {
+    uint32_t k0, k1;
+    double spread_prob[5];
+    std::vector<double> skips;  // (1 - P_IGNITE)^k, k = 1..K
+
+    CounterRNG(unsigned long long seed) : k0((uint32_t)seed), k1((uint32_t)(seed >> 32)) {
+        // Built by repeated multiplication so thresholds match the Python engine bit for bit
+        double q = 1.0;
+        for (int n = 0; n < 5; ++n) {
+            spread_prob[n] = 1.0 - q;
+            q *= 1.0 - P_SPREAD;
+        }
+        q = 1.0;
+        while ((int)skips.size() < MAX_SKIP_TABLE) {
+            q *= 1.0 - P_IGNITE;
+            skips.push_back(q);
+            if (q < std::ldexp(1.0, -32)) break;
+        }
+    }
+
+    bool spread(int step, int row, int col, int burning_neighbors) const {
+        double u = philox4x32(col, row, step, STREAM_SPREAD, k0, k1) * std::ldexp(1.0, -32);
+        return u < spread_prob[burning_neighbors];
+    }
+
+    // Calls f(col) for every spontaneous ignition event in a global row, using
+    // geometric skips so the cost is proportional to the number of events
+    template <typename F>
+    void spontaneous(int step, int row, int cols, F f) const {
+        int table_len = (int)skips.size();
+        long long pos = -1;
+        for (uint32_t draw = 0; pos < cols; ++draw) {
+            double u = (philox4x32(draw, row, step, STREAM_SPONTANEOUS, k0, k1) + 1.0) * std::ldexp(1.0, -32);
+            int count = (int)(std::partition_point(skips.begin(), skips.end(), [u](double t) { return t >= u; }) - skips.begin());
+            if (count < table_len) {
+                pos += count + 1;
+                if (pos < cols) f((int)pos);
+            } else {
+                pos += table_len;
+            }
+        }
+    }
+};
+
+// Spare rows kept above and below the local rows when the storage is
+// (re)allocated, as in src/grid.py: rows gained or shed at either edge by row
+// migration only move the window, and only the moved rows are copied
+const double ROW_HEADROOM = 0.25;
+const int ROW_HEADROOM_MIN = 8;
 
 struct Grid {
     int rows;
     int cols;
-    std::vector<int> data;
+    int offset;  // Global index of the first local row
+    std::vector<Cell> store;
+    size_t start;  // Index in store of the first local cell
+
+    Grid(int r, int c, int off = 0) : rows(r), cols(c), offset(off), start(0) {
+        allocate(nullptr, r);
+    }
 
-    Grid(int r, int c) : rows(r), cols(c), data(r * c, FUEL) {}
+    Cell* cells() { return store.data() + start; }
+    const Cell* cells() const { return store.data() + start; }
+    size_t size() const { return static_cast<size_t>(rows) * cols; }
 
-    int& at(int r, int c) {
-        return data[r * cols + c];
+    Cell& at(int r, int c) {
+        return store[start + static_cast<size_t>(r) * cols + c];
     }
-    
-    const int& at(int r, int c) const {
-        return data[r * cols + c];
+
+    const Cell& at(int r, int c) const {
+        return store[start + static_cast<size_t>(r) * cols + c];
+    }
+
+    // New storage holding r rows copied from src (or FUEL) with fresh headroom
+    void allocate(const Cell* src, int r) {
+        size_t spare = static_cast<size_t>(std::max(ROW_HEADROOM_MIN, static_cast<int>(r * ROW_HEADROOM))) * cols;
+        std::vector<Cell> fresh(2 * spare + static_cast<size_t>(r) * cols, FUEL);
+        if (src) std::copy(src, src + static_cast<size_t>(r) * cols, fresh.begin() + spare);
+        store.swap(fresh);
+        start = spare;
+        rows = r;
+    }
+
+    void drop_top(int n) { start += static_cast<size_t>(n) * cols; rows -= n; offset += n; }
+    void drop_bottom(int n) { rows -= n; }
+
+    // Room for n more rows above (or below) the local ones; returns where they go
+    Cell* grow_top(int n) {
+        size_t items = static_cast<size_t>(n) * cols;
+        if (items > start) {
+            std::vector<Cell> old;
+            old.swap(store);
+            const Cell* src = old.data() + start;
+            size_t old_size = size();
+            allocate(nullptr, rows + n);
+            std::copy(src, src + old_size, cells() + items);
+        } else {
+            start -= items;
+            rows += n;
+        }
+        offset -= n;
+        return cells();
+    }
+
+    Cell* grow_bottom(int n) {
+        size_t items = static_cast<size_t>(n) * cols;
+        if (start + size() + items > store.size()) {
+            allocate(cells(), rows);
+        }
+        rows += n;
+        return cells() + size() - items;
+    }
+
+    // Same rows and layout as other, for the next-state buffer after migration
+    void match(const Grid& other) {
+        rows = other.rows;
+        offset = other.offset;
+        start = other.start;
+        if (store.size() != other.store.size()) store.assign(other.store.size(), FUEL);
+    }
+
+    void swap(Grid& other) {
+        store.swap(other.store);
+        std::swap(start, other.start);
     }
 };
 
@@ -39,7 +182,7 @@ void set_fire(Grid& grid, int r, int c) {
     }
 }
 
-void exchange_ghost_cells(Grid& grid, std::vector<int>& top_ghost, std::vector<int>& bottom_ghost, int rank, int size) {
+void exchange_ghost_cells(Grid& grid, std::vector<Cell>& top_ghost, std::vector<Cell>& bottom_ghost, int rank, int size) {
     int top_rank = rank - 1;
     int bottom_rank = rank + 1;
     int cols = grid.cols;
@@ -47,8 +190,8 @@ void exchange_ghost_cells(Grid& grid, std::vector<int>& top_ghost, std::vector<i
 
     // Exchange with Top
     if (top_rank >= 0) {
-        MPI_Sendrecv(grid.data.data(), cols, MPI_INT, top_rank, tag,
-                     top_ghost.data(), cols, MPI_INT, top_rank, tag,
+        MPI_Sendrecv(grid.cells(), cols, MPI_CELL, top_rank, tag,
+                     top_ghost.data(), cols, MPI_CELL, top_rank, tag,
                      MPI_COMM_WORLD, MPI_STATUS_IGNORE);
     } else {
         std::fill(top_ghost.begin(), top_ghost.end(), FUEL); // Boundary condition
@@ -57,57 +200,42 @@ void exchange_ghost_cells(Grid& grid, std::vector<int>& top_ghost, std::vector<i
     // Exchange with Bottom
     if (bottom_rank < size) {
         // Send my last row, receive into bottom_ghost
-        MPI_Sendrecv(grid.data.data() + (grid.rows - 1) * cols, cols, MPI_INT, bottom_rank, tag,
-                     bottom_ghost.data(), cols, MPI_INT, bottom_rank, tag,
+        MPI_Sendrecv(grid.cells() + (grid.rows - 1) * cols, cols, MPI_CELL, bottom_rank, tag,
+                     bottom_ghost.data(), cols, MPI_CELL, bottom_rank, tag,
                      MPI_COMM_WORLD, MPI_STATUS_IGNORE);
     } else {
         std::fill(bottom_ghost.begin(), bottom_ghost.end(), FUEL); // Boundary condition
     }
 }
 
-void update_grid(Grid& grid, Grid& next_grid, int rank, int size, bool heavy_load, const std::vector<int>& top_ghost, const std::vector<int>& bottom_ghost) {
+void update_grid(Grid& grid, Grid& next_grid, int step, const CounterRNG& rng, bool heavy_load, const std::vector<Cell>& top_ghost, const std::vector<Cell>& bottom_ghost) {
     int burning_count = 0;
     
     for (int r = 0; r < grid.rows; ++r) {
+        const Cell* above = (r > 0) ? &grid.at(r - 1, 0) : top_ghost.data();
+        const Cell* below = (r + 1 < grid.rows) ? &grid.at(r + 1, 0) : bottom_ghost.data();
         for (int c = 0; c < grid.cols; ++c) {
             int state = grid.at(r, c);
             if (state == BURNING) {
                 next_grid.at(r, c) = BURNT;
                 burning_count++;
-                
-                // Spread to neighbors
-                if (c + 1 < grid.cols && grid.at(r, c+1) == FUEL) next_grid.at(r, c+1) = BURNING;
-                if (c - 1 >= 0 && grid.at(r, c-1) == FUEL) next_grid.at(r, c-1) = BURNING;
-                
-                // Down
-                if (r + 1 < grid.rows) {
-                    if (grid.at(r+1, c) == FUEL) next_grid.at(r+1, c) = BURNING;
-                } 
-                // Up
-                if (r - 1 >= 0) {
-                    if (grid.at(r-1, c) == FUEL) next_grid.at(r-1, c) = BURNING;
-                }
             } else if (state == BURNT) {
                 next_grid.at(r, c) = BURNT;
             } else {
-
-                if (next_grid.at(r, c) != BURNING) next_grid.at(r, c) = FUEL;
+                int n = (above[c] == BURNING) + (below[c] == BURNING)
+                      + (c > 0 && grid.at(r, c - 1) == BURNING)
+                      + (c + 1 < grid.cols && grid.at(r, c + 1) == BURNING);
+                // Randoms are only drawn for fuel cells next to the fire
+                next_grid.at(r, c) = (n > 0 && rng.spread(step, grid.offset + r, c, n)) ? BURNING : FUEL;
             }
         }
     }
     
-    // Handle Ghost Cell Spreading (Pull from Ghost)
-    // Top Row (r=0) checks Top Ghost
-    for (int c = 0; c < grid.cols; ++c) {
-        if (grid.at(0, c) == FUEL && top_ghost[c] == BURNING) {
-            next_grid.at(0, c) = BURNING;
-        }
-    }
-    // Bottom Row (r=rows-1) checks Bottom Ghost
-    for (int c = 0; c < grid.cols; ++c) {
-        if (grid.at(grid.rows - 1, c) == FUEL && bottom_ghost[c] == BURNING) {
-            next_grid.at(grid.rows - 1, c) = BURNING;
-        }
+    // Spontaneous ignition
+    for (int r = 0; r < grid.rows; ++r) {
+        rng.spontaneous(step, grid.offset + r, grid.cols, [&](int c) {
+            if (grid.at(r, c) == FUEL) next_grid.at(r, c) = BURNING;
+        });
     }
 
     if (heavy_load && burning_count > 0) {
@@ -116,7 +244,83 @@ void update_grid(Grid& grid, Grid& next_grid, int rank, int size, bool heavy_loa
         while (std::chrono::high_resolution_clock::now() < target);
     }
     
-    grid.data = next_grid.data;
+    grid.swap(next_grid);
+}
+
+// Strip boundaries that split integer per-row costs into parts of near-equal
+// total; same rule as partition_rows in src/load_balancer.py
+std::vector<int> partition_rows(const std::vector<long long>& costs, int parts, int min_rows) {
+    int n = static_cast<int>(costs.size());
+    std::vector<long long> prefix(n + 1, 0);
+    for (int i = 0; i < n; ++i) prefix[i + 1] = prefix[i] + costs[i];
+    long long total = prefix[n];
+
+    std::vector<int> bounds(1, 0);
+    for (int k = 1; k < parts; ++k) {
+        long long target = k * total;
+        int cut = static_cast<int>(std::lower_bound(prefix.begin(), prefix.end(), target,
+            [&](long long p, long long t) { return p * parts < t; }) - prefix.begin());
+        if (cut > 0 && target - prefix[cut - 1] * parts <= prefix[cut] * parts - target) cut--;
+        cut = std::min(std::max(cut, bounds.back() + min_rows), n - (parts - k) * min_rows);
+        bounds.push_back(cut);
+    }
+    bounds.push_back(n);
+    return bounds;
+}
+
+// Global balancing: every rank's row costs (burning cells + LB_ROW_COST) are
+// gathered, new strips are cut from the prefix sum, and each overlap between an
+// old and a new strip moves as one message straight into the new buffer
+bool repartition(Grid& grid, Grid& next_grid, int rank, int size) {
+    std::vector<int> counts(size);
+    MPI_Allgather(&grid.rows, 1, MPI_INT, counts.data(), 1, MPI_INT, MPI_COMM_WORLD);
+    std::vector<int> old_bounds(size + 1, 0);
+    for (int i = 0; i < size; ++i) old_bounds[i + 1] = old_bounds[i] + counts[i];
+    int total_rows = old_bounds[size];
+    int cols = grid.cols;
+
+    std::vector<long long> local_costs(grid.rows, LB_ROW_COST);
+    for (int r = 0; r < grid.rows; ++r)
+        for (int c = 0; c < cols; ++c)
+            if (grid.at(r, c) == BURNING) local_costs[r]++;
+    std::vector<long long> costs(total_rows);
+    MPI_Allgatherv(local_costs.data(), grid.rows, MPI_LONG_LONG, costs.data(), counts.data(),
+                   old_bounds.data(), MPI_LONG_LONG, MPI_COMM_WORLD);
+
+    std::vector<int> new_bounds = partition_rows(costs, size, std::min(1, total_rows / size));
+    if (new_bounds == old_bounds) return false;
+
+    int o0 = old_bounds[rank], o1 = old_bounds[rank + 1];
+    int n0 = new_bounds[rank], n1 = new_bounds[rank + 1];
+    // Received with fresh headroom, so the next migrations still only move the window
+    Grid fresh(n1 - n0, cols, n0);
+    Cell* data = fresh.cells();
+    std::vector<MPI_Request> requests;
+    for (int other = 0; other < size; ++other) {
+        int a = std::max(o0, new_bounds[other]), b = std::min(o1, new_bounds[other + 1]);
+        if (other == rank) {
+            if (a < b) std::copy(&grid.at(a - o0, 0), &grid.at(a - o0, 0) + (b - a) * cols, data + (a - n0) * cols);
+            continue;
+        }
+        if (a < b) {
+            requests.emplace_back();
+            MPI_Isend(&grid.at(a - o0, 0), (b - a) * cols, MPI_CELL, other, TAG_CMD, MPI_COMM_WORLD, &requests.back());
+        }
+        a = std::max(n0, old_bounds[other]);
+        b = std::min(n1, old_bounds[other + 1]);
+        if (a < b) {
+            requests.emplace_back();
+            MPI_Irecv(data + (a - n0) * cols, (b - a) * cols, MPI_CELL, other, TAG_CMD, MPI_COMM_WORLD, &requests.back());
+        }
+    }
+    MPI_Waitall(static_cast<int>(requests.size()), requests.data(), MPI_STATUSES_IGNORE);
+
+    grid.store.swap(fresh.store);
+    grid.start = fresh.start;
+    grid.rows = fresh.rows;
+    grid.offset = fresh.offset;
+    next_grid.match(grid);
+    return true;
 }
 
 int main(int argc, char** argv) {
@@ -131,7 +335,9 @@ int main(int argc, char** argv) {
     int steps = 200;
     bool balance = false;
     bool heavy = false;
+    std::string balance_mode = "diffusive";
     std::string fire_pos = "center";
+    unsigned long long seed = 0;
 
     // Parse args manually for simplicity
     for (int i = 1; i < argc; ++i) {
@@ -140,8 +346,10 @@ int main(int argc, char** argv) {
         else if (arg == "--cols") cols = std::stoi(argv[++i]);
         else if (arg == "--steps") steps = std::stoi(argv[++i]);
         else if (arg == "--balance") balance = true;
+        else if (arg == "--balance-mode") balance_mode = argv[++i];
         else if (arg == "--heavy") heavy = true;
         else if (arg == "--fire-pos") fire_pos = argv[++i];
+        else if (arg == "--seed") seed = std::stoull(argv[++i]);
     }
 
     // Domain Decomposition
@@ -150,11 +358,12 @@ int main(int argc, char** argv) {
     int local_rows = rows_per_rank + (rank < remainder ? 1 : 0);
     int offset = rank * rows_per_rank + std::min(rank, remainder);
 
-    Grid grid(local_rows, cols);
-    Grid next_grid(local_rows, cols);
+    Grid grid(local_rows, cols, offset);
+    Grid next_grid(local_rows, cols, offset);
+    CounterRNG rng(seed);
     
-    std::vector<int> top_ghost(cols, FUEL);
-    std::vector<int> bottom_ghost(cols, FUEL);
+    std::vector<Cell> top_ghost(cols, FUEL);
+    std::vector<Cell> bottom_ghost(cols, FUEL);
 
     // Init Fire
     if (fire_pos == "top") {
@@ -173,13 +382,15 @@ int main(int argc, char** argv) {
 
     for (int step = 0; step < steps; ++step) {
         exchange_ghost_cells(grid, top_ghost, bottom_ghost, rank, size);
-        update_grid(grid, next_grid, rank, size, heavy, top_ghost, bottom_ghost);
+        update_grid(grid, next_grid, step, rng, heavy, top_ghost, bottom_ghost);
         
         // Aggressive: Balance every 5 steps
-        if (balance && step % 5 == 0) {
+        if (balance && step % 5 == 0 && balance_mode == "global") {
+            repartition(grid, next_grid, rank, size);
+        } else if (balance && step % 5 == 0) {
             // Check load
             int local_load = 0;
-            for(int x : grid.data) if(x == BURNING) local_load++;
+            local_load = static_cast<int>(std::count(grid.cells(), grid.cells() + grid.size(), BURNING));
             
             // Aggressive migration
             int rows_to_move = 5;
@@ -193,27 +404,16 @@ int main(int argc, char** argv) {
                              MPI_COMM_WORLD, MPI_STATUS_IGNORE);
                 
                 if (local_load > neighbor_load + LB_THRESHOLD && grid.rows > rows_to_move + 1) {
-                    // Send bottom rows to neighbor
-                    std::vector<int> row_to_send(grid.data.end() - items_to_move, grid.data.end());
-                    
-                    // Send rows
-                    MPI_Send(row_to_send.data(), items_to_move, MPI_INT, rank + 1, TAG_CMD, MPI_COMM_WORLD);
+                    // Send bottom rows to neighbor, straight from the grid
+                    MPI_Send(grid.cells() + grid.size() - items_to_move, items_to_move, MPI_CELL, rank + 1, TAG_CMD, MPI_COMM_WORLD);
                     
                     // Remove rows
-                    grid.data.resize(grid.data.size() - items_to_move);
-                    grid.rows -= rows_to_move;
-                    next_grid.data.resize(grid.data.size()); 
-                    next_grid.rows -= rows_to_move;
+                    grid.drop_bottom(rows_to_move);
+                    next_grid.match(grid);
                 } else if (neighbor_load > local_load + LB_THRESHOLD) {
-                     // Receive rows from neighbor
-                     std::vector<int> recv_row(items_to_move);
-                     MPI_Recv(recv_row.data(), items_to_move, MPI_INT, rank + 1, TAG_CMD, MPI_COMM_WORLD, MPI_STATUS_IGNORE);
-                     
-                     // Append to bottom
-                     grid.data.insert(grid.data.end(), recv_row.begin(), recv_row.end());
-                     grid.rows += rows_to_move;
-                     next_grid.data.resize(grid.data.size());
-                     next_grid.rows += rows_to_move;
+                     // Receive rows from neighbor, appended to the bottom
+                     MPI_Recv(grid.grow_bottom(rows_to_move), items_to_move, MPI_CELL, rank + 1, TAG_CMD, MPI_COMM_WORLD, MPI_STATUS_IGNORE);
+                     next_grid.match(grid);
                 }
             } else if (rank % 2 == 1) {
                 // Odd rank (i) is the "Down" neighbor of Even rank (i-1)
@@ -223,24 +423,15 @@ int main(int argc, char** argv) {
                              MPI_COMM_WORLD, MPI_STATUS_IGNORE);
                              
                 if (neighbor_load > local_load + LB_THRESHOLD) {
-                    // Receive rows from Up (i-1)
-                    std::vector<int> recv_row(items_to_move);
-                    MPI_Recv(recv_row.data(), items_to_move, MPI_INT, rank - 1, TAG_CMD, MPI_COMM_WORLD, MPI_STATUS_IGNORE);
-                    
-                    grid.data.insert(grid.data.begin(), recv_row.begin(), recv_row.end());
-                    grid.rows += rows_to_move;
-                    next_grid.data.resize(grid.data.size());
-                    next_grid.rows += rows_to_move;
+                    // Receive rows from Up (i-1) into the headroom above
+                    MPI_Recv(grid.grow_top(rows_to_move), items_to_move, MPI_CELL, rank - 1, TAG_CMD, MPI_COMM_WORLD, MPI_STATUS_IGNORE);
+                    next_grid.match(grid);
                 } else if (local_load > neighbor_load + LB_THRESHOLD && grid.rows > rows_to_move + 1) {
                     // Send top rows to Up (i-1)
-                    std::vector<int> row_to_send(grid.data.begin(), grid.data.begin() + items_to_move);
+                    MPI_Send(grid.cells(), items_to_move, MPI_CELL, rank - 1, TAG_CMD, MPI_COMM_WORLD);
                     
-                    MPI_Send(row_to_send.data(), items_to_move, MPI_INT, rank - 1, TAG_CMD, MPI_COMM_WORLD);
-                    
-                    grid.data.erase(grid.data.begin(), grid.data.begin() + items_to_move);
-                    grid.rows -= rows_to_move;
-                    next_grid.data.resize(grid.data.size());
-                    next_grid.rows -= rows_to_move;
+                    grid.drop_top(rows_to_move);
+                    next_grid.match(grid);
                 }
             }
             
@@ -253,19 +444,12 @@ int main(int argc, char** argv) {
                              MPI_COMM_WORLD, MPI_STATUS_IGNORE);
                 
                 if (local_load > neighbor_load + LB_THRESHOLD && grid.rows > rows_to_move + 1) {
-                    std::vector<int> row_to_send(grid.data.end() - items_to_move, grid.data.end());
-                    MPI_Send(row_to_send.data(), items_to_move, MPI_INT, rank + 1, TAG_CMD, MPI_COMM_WORLD);
-                    grid.data.resize(grid.data.size() - items_to_move);
-                    grid.rows -= rows_to_move;
-                    next_grid.data.resize(grid.data.size());
-                    next_grid.rows -= rows_to_move;
+                    MPI_Send(grid.cells() + grid.size() - items_to_move, items_to_move, MPI_CELL, rank + 1, TAG_CMD, MPI_COMM_WORLD);
+                    grid.drop_bottom(rows_to_move);
+                    next_grid.match(grid);
                 } else if (neighbor_load > local_load + LB_THRESHOLD) {
-                     std::vector<int> recv_row(items_to_move);
-                     MPI_Recv(recv_row.data(), items_to_move, MPI_INT, rank + 1, TAG_CMD, MPI_COMM_WORLD, MPI_STATUS_IGNORE);
-                     grid.data.insert(grid.data.end(), recv_row.begin(), recv_row.end());
-                     grid.rows += rows_to_move;
-                     next_grid.data.resize(grid.data.size());
-                     next_grid.rows += rows_to_move;
+                     MPI_Recv(grid.grow_bottom(rows_to_move), items_to_move, MPI_CELL, rank + 1, TAG_CMD, MPI_COMM_WORLD, MPI_STATUS_IGNORE);
+                     next_grid.match(grid);
                 }
             } else if (rank % 2 == 0 && rank > 0) {
                 int neighbor_load;
@@ -274,22 +458,25 @@ int main(int argc, char** argv) {
                              MPI_COMM_WORLD, MPI_STATUS_IGNORE);
                              
                 if (neighbor_load > local_load + LB_THRESHOLD) {
-                    std::vector<int> recv_row(items_to_move);
-                    MPI_Recv(recv_row.data(), items_to_move, MPI_INT, rank - 1, TAG_CMD, MPI_COMM_WORLD, MPI_STATUS_IGNORE);
-                    grid.data.insert(grid.data.begin(), recv_row.begin(), recv_row.end());
-                    grid.rows += rows_to_move;
-                    next_grid.data.resize(grid.data.size());
-                    next_grid.rows += rows_to_move;
+                    MPI_Recv(grid.grow_top(rows_to_move), items_to_move, MPI_CELL, rank - 1, TAG_CMD, MPI_COMM_WORLD, MPI_STATUS_IGNORE);
+                    next_grid.match(grid);
                 } else if (local_load > neighbor_load + LB_THRESHOLD && grid.rows > rows_to_move + 1) {
-                    std::vector<int> row_to_send(grid.data.begin(), grid.data.begin() + items_to_move);
-                    MPI_Send(row_to_send.data(), items_to_move, MPI_INT, rank - 1, TAG_CMD, MPI_COMM_WORLD);
-                    grid.data.erase(grid.data.begin(), grid.data.begin() + items_to_move);
-                    grid.rows -= rows_to_move;
-                    next_grid.data.resize(grid.data.size());
-                    next_grid.rows -= rows_to_move;
+                    MPI_Send(grid.cells(), items_to_move, MPI_CELL, rank - 1, TAG_CMD, MPI_COMM_WORLD);
+                    grid.drop_top(rows_to_move);
+                    next_grid.match(grid);
                 }
             }
         }
+
+        if (step % 10 == 0) {
+            int local_burning = 0;
+            local_burning = static_cast<int>(std::count(grid.cells(), grid.cells() + grid.size(), BURNING));
+            int total_burning = 0;
+            MPI_Reduce(&local_burning, &total_burning, 1, MPI_INT, MPI_SUM, 0, MPI_COMM_WORLD);
+            if (rank == 0) {
+                std::cout << "Step " << step << ": Total Burning = " << total_burning << std::endl;
+            }
+        }
     }
 
     MPI_Barrier(MPI_COMM_WORLD);
@@ -0,0 +1,64 @@
+import numpy as np
+from src.grid import Grid
+from src.config import BURNING
+
+# Deep halos: every depth steps, each rank swaps depth * reach edge rows with its
+# neighbours and then runs depth steps on its strip extended by those rows,
+# recomputing the borrowed rows redundantly. reach is how many rows a cell reads
+# on each side (1, or a rule's radius). After j local steps only the outermost
+# j * reach borrowed rows are stale (they never saw the rows beyond them), so
+# the rank's own rows stay exact for the whole cycle. Redundant rows must draw
+# the same randoms on both ranks, so cycles of more than one step need a
+# coordinate-keyed RNG.
+class DeepHalo:
+
+    def __init__(self, comm_obj, depth, step_fn, reach=1, burning=(BURNING,)):
+        self.comm_obj = comm_obj
+        self.depth = depth
+        self.step_fn = step_fn
+        # Rows borrowed from each neighbour per cycle
+        self.width = depth * reach
+        # States counted as burning (a rule may have several)
+        self.burning_states = burning
+        self.phase = 0
+        self.ext = None
+        self.top = 0
+
+    def restart(self):
+        # Start a new cycle at the next step. Must happen on all ranks at once, e.g.
+        # after a balancing round that may have moved rows.
+        self.phase = 0
+
+    def exchange(self, grid):
+        # Refills the extended strip at the start of each cycle; no-op otherwise
+        if self.phase != 0:
+            return
+        above, below = self.comm_obj.exchange_rows(grid, self.width)
+        parts = [p for p in (above, grid.data, below) if p is not None]
+        self.top = 0 if above is None else self.width
+        rows = sum(len(p) for p in parts)
+        if self.ext is None or self.ext.rows != rows or self.ext.cols != grid.cols:
+            # Kept between cycles so kernel scratch is reused
+            self.ext = Grid(rows, grid.cols)
+        self.ext.offset = grid.offset - self.top
+        # commit_updates bumps the version, so stateful engines resync
+        self.ext.commit_updates(np.concatenate(parts))
+
+    def _is_burning(self, data):
+        mask = data == self.burning_states[0]
+        for state in self.burning_states[1:]:
+            mask |= data == state
+        return mask
+
+    def step(self, grid, heavy_load=False, rng=None, step=0):
+        self.step_fn(self.ext, heavy_load=heavy_load, rng=rng, step=step)
+        # The kernel's counts include the borrowed rows, so count the owned ones
+        # from their states before and after the step
+        owned = self.ext.data[self.top:self.top + grid.rows]
+        was, now = self._is_burning(grid.data), self._is_burning(owned)
+        ignited, burnt = int(np.count_nonzero(now & ~was)), int(np.count_nonzero(was & ~now))
+        # The owned rows are exact after every local step, so the strip is always
+        # current for statistics, snapshots and balancing
+        grid.data[:] = owned
+        self.phase = (self.phase + 1) % self.depth
+        return ignited, burnt
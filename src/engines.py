@@ -0,0 +1,58 @@
+from src.grid import Grid
+from src.packed import PackedGrid, update_packed
+from src.wildfire import update_grid, update_grid_fused
+from src.frontier import FrontierEngine
+from src.rules import RuleEngine, make_rule
+from src import numba_kernel
+
+# Kernel backends selectable with --engine. Each one advances a grid by one step
+# through step(grid, heavy_load=False, rng=None, step=0), reading the ghost rows
+# (and columns) the communicator filled in, and returns the local (newly
+# ignited, newly burnt) cell counts; build() returns a fresh step function for
+# one run, since some engines keep state between steps. Engines with rules=True
+# take the model to run, build(rule); the others hard-code the wildfire rule.
+class Engine:
+
+    def __init__(self, name, build, description, grid_cls=Grid, available=True, warm_up=None, swaps=False, rules=False):
+        self.name = name
+        self.build = build
+        self.description = description
+        self.grid_cls = grid_cls
+        # True if steps write only the back buffer and swap, never the front in place
+        self.swaps = swaps
+        # True if build(rule) runs any model from config.RULES (--rule)
+        self.rules = rules
+        # False when an optional dependency is missing
+        self.available = available
+        self._warm_up = warm_up
+
+    def warm_up(self):
+        # One-off startup cost (JIT compilation, cache loading), paid before timing
+        if self._warm_up is not None:
+            self._warm_up()
+
+ENGINES = {}
+
+def register(engine):
+    ENGINES[engine.name] = engine
+    return engine
+
+def get_engine(name):
+    engine = ENGINES[name]
+    if not engine.available:
+        raise RuntimeError(f"--engine {name} is not available (missing optional dependency)")
+    return engine
+
+def _dense_step(grid, heavy_load=False, rng=None, step=0):
+    next_state, counts = update_grid(grid, heavy_load=heavy_load, rng=rng, step=step, return_counts=True)
+    grid.commit_updates(next_state)
+    return counts
+
+register(Engine('dense', lambda: _dense_step, 'full-strip NumPy'))
+register(Engine('fused', lambda: update_grid_fused, 'double-buffered, allocation-free NumPy', swaps=True))
+register(Engine('frontier', lambda: FrontierEngine().step, 'visits only cells next to the fire'))
+register(Engine('packed', lambda: update_packed, '2-bit packed bitplanes, bitwise stencil', grid_cls=PackedGrid))
+register(Engine('numba', lambda: numba_kernel.update_grid_numba, 'single-pass compiled loop, parallel across rows (needs numba)',
+                available=numba_kernel.numba is not None, warm_up=numba_kernel.warm_up, swaps=True))
+register(Engine('lut', lambda rule=None: RuleEngine(rule or make_rule('wildfire')).step,
+                'lookup-table kernel for any model in RULES (src/config.py, chosen with --rule)', swaps=True, rules=True))
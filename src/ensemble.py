@@ -0,0 +1,100 @@
+import numpy as np
+from src.config import FUEL, BURNING, BURNT
+from src.wildfire import IGNITION_LUT
+
+# Monte Carlo ensemble: independent realizations of one scenario, stored as one
+# padded (members, rows + 2, cols + 2) array so a step advances every member in
+# the same vectorized NumPy passes. Each rank holds whole members over the full
+# grid (no halos); first_member is the global index of this rank's member 0.
+# Under a CounterRNG, member m draws as a single run with seed + (m << 32), so
+# results do not depend on how members are split across ranks, and member 0
+# matches the plain run with the same seed.
+class Ensemble:
+
+    def __init__(self, members, rows, cols, first_member=0):
+        self.members, self.rows, self.cols = members, rows, cols
+        self.first_member = first_member
+        self.padded = np.full((members, rows + 2, cols + 2), FUEL, dtype=np.int8)
+        self._back = self.padded.copy()
+        self.counts = np.zeros((members, rows, cols), dtype=np.uint8)
+        self.mask = np.zeros((members, rows, cols), dtype=bool)
+        self.ignite = np.zeros((members, rows, cols), dtype=bool)
+        self.gen = None
+
+    @property
+    def data(self):
+        return self.padded[:, 1:-1, 1:-1]
+
+    def count_state(self, state):
+        return int(np.count_nonzero(self.data == state))
+
+    def set_fire(self, r, c):
+        if 0 <= r < self.rows and 0 <= c < self.cols:
+            self.data[:, r, c] = BURNING
+
+    def _generator(self):
+        # Legacy RNG: one generator per rank, seeded from the global state (and so
+        # from --seed and the rank's first member)
+        if self.gen is None:
+            self.gen = np.random.default_rng([np.random.randint(2**31), self.first_member])
+        return self.gen
+
+    def step(self, rng=None, step=0, lut=IGNITION_LUT):
+        # One step of every member; returns the burning + newly ignited count
+        src, dst = self.padded, self._back
+        inner = src[:, 1:-1, 1:-1]
+        counts, mask = self.counts, self.mask
+        counts.fill(0)
+        for neighbor in (src[:, :-2, 1:-1], src[:, 2:, 1:-1], src[:, 1:-1, :-2], src[:, 1:-1, 2:]):
+            np.equal(neighbor, BURNING, out=mask)
+            np.add(counts, mask, out=counts, casting='unsafe')
+
+        out = dst[:, 1:-1, 1:-1]
+        np.copyto(out, inner)
+        np.equal(inner, BURNING, out=mask)
+        np.copyto(out, BURNT, where=mask)
+        num_burning = np.count_nonzero(mask)
+
+        np.equal(inner, FUEL, out=mask)
+        ignite = self.ignite
+        if rng is None:
+            fuel_counts = counts[mask]
+            hits = self._generator().random(len(fuel_counts), dtype=np.float32) < lut[fuel_counts]
+            ignite.fill(False)
+            np.place(ignite, mask, hits)
+        else:
+            m, r, c = np.nonzero(mask & (counts > 0))
+            hits = rng.spread(step, r, c, counts[m, r, c], member=self.first_member + m)
+            ignite.fill(False)
+            ignite[m[hits], r[hits], c[hits]] = True
+            members = np.arange(self.first_member, self.first_member + self.members)
+            sm, sr, sc = rng.spontaneous_members(step, members, self.rows, self.cols)
+            ignite[sm - self.first_member, sr, sc] = True
+            ignite &= mask
+        np.copyto(out, BURNING, where=ignite)
+
+        self.padded, self._back = dst, src
+        return num_burning + np.count_nonzero(ignite)
+
+class EnsembleStats:
+    # Streaming aggregates over this rank's members: per cell, how many members
+    # ignited it in each arrival-time bin, where time t is the state after t steps
+    # (0 = initial fire) and bins split [0, steps] evenly. Nothing per member is
+    # kept, so memory is rows * cols * bins whatever the ensemble size.
+    def __init__(self, rows, cols, steps, bins):
+        self.shape = (rows, cols)
+        self.steps, self.bins = steps, bins
+        self.arrival = np.zeros((bins, rows * cols), dtype=np.int64)
+
+    def record(self, ensemble, time):
+        # A BURNING cell ignited during the last step (or is the initial fire)
+        cells = np.flatnonzero(ensemble.data == BURNING) % self.arrival.shape[1]
+        if len(cells):
+            self.arrival[time * self.bins // (self.steps + 1)] += np.bincount(cells, minlength=self.arrival.shape[1])
+
+    def bin_edges(self):
+        # First time of each bin, plus one past the last time
+        return -(-np.arange(self.bins + 1) * (self.steps + 1) // self.bins)
+
+    def histogram(self):
+        return self.arrival.reshape((self.bins,) + self.shape)
@@ -0,0 +1,98 @@
+import numpy as np
+from src.config import FUEL, BURNING, BURNT, P_SPREAD, P_IGNITE
+from src.wildfire import heavy_wait
+
+def sample_sparse(n, p):
+    # Geometric skip sampling: each of n positions is picked with probability p,
+    # at a cost proportional to the number of picks rather than to n
+    if n <= 0 or p <= 0:
+        return np.empty(0, dtype=np.int64)
+    if p >= 1:
+        return np.arange(n, dtype=np.int64)
+
+    chunk = int(n * p + 4 * np.sqrt(n * p)) + 16
+    picks = []
+    pos = -1
+    while True:
+        idx = pos + np.cumsum(np.random.geometric(p, size=chunk))
+        picks.append(idx[idx < n])
+        if idx[-1] >= n:
+            break
+        pos = idx[-1]
+    return np.concatenate(picks)
+
+# Advances a Grid in place, visiting only the burning frontier. Burning cells are
+# tracked as flat indices (r * cols + c); the frontier is rebuilt whenever the
+# grid's version changes (e.g. after LoadBalancer migrates rows).
+class FrontierEngine:
+
+    def __init__(self, p_spread=P_SPREAD, p_ignite=P_IGNITE):
+        self.p_spread = p_spread
+        self.p_ignite = p_ignite
+        # Same rule as update_grid: a fuel cell ignites if random < max(spread, ignite)
+        self.ignite_prob = np.maximum(1 - (1 - p_spread) ** np.arange(5), p_ignite)
+        self.burning = np.empty(0, dtype=np.int64)
+        self._stamp = None
+
+    def reset(self, grid):
+        self.burning = np.flatnonzero(grid.data == BURNING)
+        self._stamp = (id(grid), grid.version)
+
+    def step(self, grid, heavy_load=False, rng=None, step=0):
+        if (id(grid), grid.version) != self._stamp:
+            self.reset(grid)
+
+        rows, cols = grid.rows, grid.cols
+        data = grid.data
+        ghost = grid.data_with_ghost
+        if rows == 0:
+            return 0, 0
+
+        burning = self.burning
+        r, c = np.divmod(burning, cols)
+
+        # Burning neighbours of every candidate, one entry per (cell, neighbour) pair
+        neighbors = [
+            burning[r > 0] - cols,
+            burning[r < rows - 1] + cols,
+            burning[c > 0] - 1,
+            burning[c < cols - 1] + 1,
+            np.flatnonzero(ghost[0, :] == BURNING),
+            (rows - 1) * cols + np.flatnonzero(ghost[-1, :] == BURNING),
+            # Ghost columns, only ever burning when the grid is split into 2D blocks
+            cols * np.flatnonzero(grid.padded[1:-1, 0] == BURNING),
+            cols * np.flatnonzero(grid.padded[1:-1, -1] == BURNING) + cols - 1,
+        ]
+        candidates, counts = np.unique(np.concatenate(neighbors), return_counts=True)
+        is_fuel = data[candidates // cols, candidates % cols] == FUEL
+        candidates, counts = candidates[is_fuel], counts[is_fuel]
+
+        if rng is None:
+            random_vals = np.random.random(len(candidates))
+            spread = candidates[random_vals < self.ignite_prob[counts]]
+
+            # Spontaneous ignition elsewhere; frontier candidates already rolled for it
+            spont = sample_sparse(rows * cols, self.p_ignite)
+            spont = spont[data[spont // cols, spont % cols] == FUEL]
+            spont = spont[~np.isin(spont, candidates, assume_unique=True)]
+        else:
+            cr, cc = np.divmod(candidates, cols)
+            spread = candidates[rng.spread(step, grid.offset + cr, grid.col_offset + cc, counts)]
+
+            sr, sc = rng.spontaneous(step, grid.offset, grid.offset + rows, grid.col_offset + cols, col_start=grid.col_offset)
+            sr, sc = sr - grid.offset, sc - grid.col_offset
+            spont = sr * cols + sc
+            spont = spont[data[sr, sc] == FUEL]
+            spont = np.setdiff1d(spont, spread, assume_unique=True)
+
+        ignited = np.concatenate((spread, spont))
+
+        # data is a view into the padded buffer, so ghost-row copies stay in sync
+        data[r, c] = BURNT
+        ir, ic = np.divmod(ignited, cols)
+        data[ir, ic] = BURNING
+        self.burning = ignited
+
+        if heavy_load:
+            heavy_wait(len(burning) + len(ignited))
+        return len(ignited), len(burning)
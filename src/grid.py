@@ -1,19 +1,82 @@
 import numpy as np
-from src.config import FUEL, BURNING, BURNT
+from src.config import FUEL, BURNING, BURNT, ROW_HEADROOM, ROW_HEADROOM_MIN
+
+def _headroom(rows):
+    # Spare rows kept at each end of a freshly allocated store
+    return max(ROW_HEADROOM_MIN, int(rows * ROW_HEADROOM))
 
 class Grid:
-    def __init__(self, rows, cols):
+    def __init__(self, rows, cols, offset=0, col_offset=0):
         self.rows = rows
         self.cols = cols
-        self.data = np.full((rows, cols), FUEL, dtype=np.int8)
-        self.data_with_ghost = np.full((rows + 2, cols), FUEL, dtype=np.int8)
+        # Global index of the first local row (and column, for 2D blocks), kept
+        # up to date by row and column migration
+        self.offset = offset
+        self.col_offset = col_offset
+        self.version = 0
+        self._set_rows(np.full((rows, cols), FUEL, dtype=np.int8))
+
+    def _set_rows(self, data):
+        # Front buffer: one ghost row above and below, plus a ghost column on each
+        # side that stays FUEL unless a 2D decomposition fills it, so stencils
+        # never need edge special cases. data and data_with_ghost are views into it.
+        # It is a window into a larger store with ROW_HEADROOM spare rows at both
+        # ends, so rows gained or shed at either edge by row migration only move
+        # the window; the store is reallocated when the headroom runs out.
+        self.rows, self.cols = data.shape
+        spare = _headroom(self.rows)
+        self._store = np.full((self.rows + 2 + 2 * spare, self.cols + 2), FUEL, dtype=np.int8)
+        self._back_store = None
+        self._top = spare
+        self._window()
+        self.padded[1:-1, 1:-1] = data
+
+    def _window(self):
+        # Views of the rows + 2 padded rows starting at store row _top, in both buffers
+        self.padded = self._store[self._top:self._top + self.rows + 2]
+        self._back = None
+        if self._back_store is not None:
+            self._back = self._back_store[self._top:self._top + self.rows + 2]
+        self.scratch = {}
+        self._bind()
+
+    def _move_window(self, top, rows):
+        # New window over the same store. Its ghost rows may hold interior data
+        # from before, so they are reset to FUEL as in a fresh buffer; the halo
+        # exchange refills them.
+        self._top, self.rows = top, rows
+        self._window()
+        for buffer in (self.padded, self._back):
+            if buffer is not None:
+                buffer[[0, -1]] = FUEL
+
+    def _bind(self):
+        self.data_with_ghost = self.padded[:, 1:-1]
+        self._interior = self.padded[1:-1, 1:-1]
+        self.data = self._interior
+        self.version += 1
 
     def update_from_ghost(self):
-        self.data_with_ghost[1:-1, :] = self.data
+        if self.data is not self._interior:
+            self._interior[:] = self.data
+            self.data = self._interior
 
     def commit_updates(self, new_data):
         self.data = new_data
         self.update_from_ghost()
+        self.version += 1
+
+    def back_buffer(self):
+        # Second padded buffer for kernels that write the next state in place
+        if self._back is None:
+            self._back_store = np.full_like(self._store, FUEL)
+            self._back = self._back_store[self._top:self._top + self.rows + 2]
+        return self._back
+
+    def swap(self):
+        self.padded, self._back = self._back, self.padded
+        self._store, self._back_store = self._back_store, self._store
+        self._bind()
 
     def set_fire(self, r, c):
         if 0 <= r < self.rows and 0 <= c < self.cols:
@@ -22,3 +85,92 @@ class Grid:
 
     def get_state(self):
         return self.data
+
+    def count_state(self, state):
+        return int(np.count_nonzero(self.data == state))
+
+    # Row wire format used for halo exchange, gathers and row migration
+    def empty_rows(self, n):
+        return np.zeros((n, self.cols), dtype=np.int8)
+
+    def export_rows(self, start, stop):
+        return self.data[start:stop, :].copy()
+
+    def decode_rows(self, rows):
+        return rows
+
+    @property
+    def halo_buffer(self):
+        # Array the halo views point into; it changes on swap and whenever the
+        # buffers are reallocated, and Communicator caches persistent requests by it
+        return self.padded
+
+    def halo_views(self):
+        # (first row, last row, top ghost, bottom ghost) as views into the live buffer
+        return self.padded[1, 1:-1], self.padded[-2, 1:-1], self.padded[0, 1:-1], self.padded[-1, 1:-1]
+
+    def halo_columns(self):
+        # (first col, last col, left ghost, right ghost) of the interior rows, each
+        # as a flat view starting at its top cell; successive cells are cols + 2
+        # apart, so an MPI vector type can send them in place
+        flat = self.padded.reshape(-1)
+        stride = self.cols + 2
+        return tuple(flat[stride + c:] for c in (1, self.cols, 0, self.cols + 1))
+
+    def set_ghost_rows(self, top=None, bottom=None):
+        if top is not None:
+            self.data_with_ghost[0, :] = top
+        if bottom is not None:
+            self.data_with_ghost[-1, :] = bottom
+
+    def take_rows(self, n, top):
+        # Only the n taken rows are copied; the window shrinks over them
+        if top:
+            taken = self.export_rows(0, n)
+            self._move_window(self._top + n, self.rows - n)
+            self.offset += n
+        else:
+            taken = self.export_rows(self.rows - n, self.rows)
+            self._move_window(self._top, self.rows - n)
+        return taken
+
+    def add_rows(self, rows, top):
+        # The window grows into the headroom and only the new rows are written
+        n = len(rows)
+        if n > (self._top if top else len(self._store) - self._top - self.rows - 2):
+            self._set_rows(np.vstack((rows, self.data)) if top else np.vstack((self.data, rows)))
+            if top:
+                self.offset -= n
+            return
+        if top:
+            self._move_window(self._top - n, self.rows + n)
+            new = slice(1, n + 1)
+            self.offset -= n
+        else:
+            self._move_window(self._top, self.rows + n)
+            new = slice(self.rows - n + 1, self.rows + 1)
+        self.padded[new, 1:-1] = rows
+        for buffer in (self.padded, self._back):
+            if buffer is not None:
+                buffer[new, 0] = buffer[new, -1] = FUEL
+
+    # Column migration between 2D blocks; columns travel as (rows, n) int8 blocks
+    def empty_cols(self, n):
+        return np.zeros((self.rows, n), dtype=np.int8)
+
+    def take_cols(self, n, left):
+        if left:
+            taken = self.data[:, :n].copy()
+            self._set_rows(self.data[:, n:])
+            self.col_offset += n
+        else:
+            taken = self.data[:, self.cols - n:].copy()
+            self._set_rows(self.data[:, :self.cols - n])
+        return taken
+
+    def add_cols(self, cols, left):
+        if left:
+            self._set_rows(np.hstack((cols, self.data)))
+            self.col_offset -= cols.shape[1]
+        else:
+            self._set_rows(np.hstack((self.data, cols)))
@@ -1,95 +1,382 @@
+import time
 import numpy as np
-from src.config import BURNING, TAG_LOAD, TAG_BAL, TAG_CMD, LB_THRESHOLD
+from src.config import BURNING, TAG_LOAD, TAG_BAL, TAG_CMD, LB_THRESHOLD, LB_ROW_COST, LB_WINDOW, LB_TIME_THRESHOLD
 from src.mpi_comm import MPI
 
+def partition_rows(costs, parts, min_rows=1):
+    # Strip boundaries (parts + 1 of them) that split integer per-row costs into
+    # parts of near-equal total: cut k goes where the prefix sum is closest to
+    # k / parts of the total. Integer arithmetic only, so every rank (and the C++
+    # engine) computes the same cuts.
+    n = len(costs)
+    prefix = np.concatenate(([0], np.cumsum(costs, dtype=np.int64)))
+    total = int(prefix[-1])
+    bounds = [0]
+    for k in range(1, parts):
+        # First row count whose prefix reaches the target, then step back if the
+        # prefix one row earlier is closer
+        target = k * total
+        cut = int(np.searchsorted(prefix * parts, target, side='left'))
+        if cut > 0 and target - prefix[cut - 1] * parts <= prefix[cut] * parts - target:
+            cut -= 1
+        cut = min(max(cut, bounds[-1] + min_rows), n - (parts - k) * min_rows)
+        bounds.append(cut)
+    bounds.append(n)
+    return np.array(bounds)
+
+class LoadMeter:
+    # Measured compute cost per row. Each step's kernel time is spread evenly over
+    # the rows (or row band) it covered; at every balance call the interval's
+    # average is folded into an exponential moving average spanning `window`
+    # intervals. Halo waits are left out: they are the symptom, not the load.
+
+    def __init__(self, window=LB_WINDOW):
+        self.alpha = 2.0 / (window + 1)
+        self.offset = 0
+        self.row_time = None
+        self.pending = None
+        self.steps = 0
+
+    def record(self, grid, seconds, start=0, stop=None):
+        # A step is counted when the band ending at the last row is recorded
+        stop = grid.rows if stop is None else stop
+        if self.pending is None or len(self.pending) != grid.rows:
+            self.pending = np.zeros(grid.rows)
+        if stop > start:
+            self.pending[start:stop] += seconds / (stop - start)
+        if stop == grid.rows:
+            self.steps += 1
+
+    def update(self, grid):
+        if self.steps == 0 or len(self.pending) != grid.rows:
+            return
+        sample = self.pending / self.steps
+        current = self._aligned(grid)
+        self.row_time = sample if current is None else (1 - self.alpha) * current + self.alpha * sample
+        self.offset = grid.offset
+        self.pending = None
+        self.steps = 0
+
+    def assign(self, offset, row_time):
+        # Take over costs measured elsewhere, e.g. for rows received in a migration
+        self.offset = offset
+        self.row_time = np.asarray(row_time, dtype=float)
+
+    def _aligned(self, grid):
+        # Smoothed costs of the grid's current rows by global index; rows that
+        # arrived since the last measurement get this rank's mean row cost
+        if self.row_time is None:
+            return None
+        out = np.full(grid.rows, self.row_time.mean() if len(self.row_time) else 0.0)
+        a = max(self.offset, grid.offset)
+        b = min(self.offset + len(self.row_time), grid.offset + grid.rows)
+        if a < b:
+            out[a - grid.offset:b - grid.offset] = self.row_time[a - self.offset:b - self.offset]
+        return out
+
+    def row_costs(self, grid):
+        # Smoothed seconds per step for each local row (zeros before any sample)
+        aligned = self._aligned(grid)
+        return np.zeros(grid.rows) if aligned is None else aligned
+
 class LoadBalancer:
-    def __init__(self, communicator):
+    # mode 'diffusive' moves one row per neighbour pair per call; 'global'
+    # repartitions all strips at once from the prefix sum of every row's cost.
+    # Loads are burning-cell counts, or measured compute time when given a LoadMeter.
+    # With a trigger, balance() only redistributes when the max/mean load ratio
+    # from the last post_check() exceeds it. No strip is left with fewer than
+    # min_rows rows (deep halos need as many rows as their depth).
+    def __init__(self, communicator, mode='diffusive', meter=None, trigger=None, min_rows=1):
         self.comm_obj = communicator
+        self.min_rows = min_rows
         self.comm = communicator.comm
         self.rank = communicator.rank
         self.size = communicator.size
+        self.mode = mode
+        self.meter = meter
+        self.trigger = trigger
+        self.stats = {'checks': 0, 'fired': 0, 'changed': 0, 'seconds': 0.0, 'max_ratio': 1.0}
+        self._check = None
 
     def check_imbalance(self, grid):
-        local_load = np.sum(grid.data == BURNING)
+        if self.meter is not None:
+            return float(self.meter.row_costs(grid).sum())
+        local_load = grid.count_state(BURNING)
         return local_load
 
+    def _exceeds(self, load, other_load):
+        # Burning counts differ by a fixed number of cells, measured times by a fraction
+        if self.meter is not None:
+            return load > other_load * (1 + LB_TIME_THRESHOLD)
+        return load > other_load + LB_THRESHOLD
+
+    def row_costs(self, grid):
+        # Integer per-row costs for partition_rows: measured nanoseconds, or
+        # burning cells per local row plus a baseline for the row itself
+        if self.meter is not None:
+            return np.rint(self.meter.row_costs(grid) * 1e9).astype(np.int64)
+        return np.count_nonzero(grid.data == BURNING, axis=1).astype(np.int64) + LB_ROW_COST
+
+    def post_check(self, grid):
+        # Starts the imbalance check: each rank puts its load at its own index, so
+        # one small non-blocking Iallreduce gives every rank all loads
+        if self.size < 2:
+            return
+        if self.meter is not None:
+            self.meter.update(grid)
+        self._loads = np.zeros(self.size)
+        self._loads[self.rank] = self.check_imbalance(grid)
+        self._all_loads = np.empty(self.size)
+        self._check = self.comm.Iallreduce(self._loads, self._all_loads, op=MPI.SUM)
+
+    def imbalance(self):
+        # max/mean load ratio from the last post_check; waits for it to complete
+        self._check.Wait()
+        self._check = None
+        mean = self._all_loads.mean()
+        return float(self._all_loads.max() / mean) if mean > 0 else 1.0
+
+    def balance(self, grid):
+        # Without a trigger, always redistribute; with one, act on the pending
+        # check (if any) and only redistribute when the ratio exceeds the trigger
+        if self.trigger is None:
+            if self.meter is not None:
+                self.meter.update(grid)
+        else:
+            if self._check is None:
+                return False
+            ratio = self.imbalance()
+            self.stats['max_ratio'] = max(self.stats['max_ratio'], ratio)
+            if ratio <= self.trigger:
+                self.stats['checks'] += 1
+                return False
+        self.stats['checks'] += 1
+        self.stats['fired'] += 1
+        start = time.perf_counter()
+        changed = self.redistribute(grid)
+        self.stats['seconds'] += time.perf_counter() - start
+        self.stats['changed'] += int(changed)
+        return changed
+
+    def report(self, rank):
+        # Balancing activity; the cost is the slowest rank's time in redistribute.
+        # A check still in flight is completed first so nothing is left pending.
+        if self._check is not None:
+            self._check.Wait()
+            self._check = None
+        seconds = self.comm.reduce(self.stats['seconds'], op=MPI.MAX, root=0)
+        changed = self.comm.reduce(self.stats['changed'], op=MPI.MAX, root=0)
+        if rank == 0:
+            s = self.stats
+            # The load ratio is only measured when a trigger checks it
+            seen = f" (max/mean load seen: {s['max_ratio']:.2f})" if self.trigger is not None else ""
+            print(f"Load balancing: fired {s['fired']} of {s['checks']} checks, "
+                  f"moved rows in up to {changed} of them, {seconds:.4f} s spent{seen}")
+
     def redistribute(self, grid):
 
         if self.size < 2:
             return False
 
-        self.comm.Barrier() 
-        local_load = int(self.check_imbalance(grid))
-        
+        if self.mode == 'global':
+            return self._repartition(grid)
+
+        # No barriers: each phase is a blocking pairwise exchange, so a rank only
+        # ever waits for its own neighbours
         changed = False
         
         # Balance pair
         if self.rank % 2 == 0 and self.comm_obj.down != MPI.PROC_NULL:
-            self._balance_pair(grid, self.comm_obj.down)
+            changed |= self._balance_pair(grid, self.comm_obj.down)
         elif self.rank % 2 == 1 and self.comm_obj.up != MPI.PROC_NULL:
-            self._balance_pair_passive(grid, self.comm_obj.up)
+            changed |= self._balance_pair_passive(grid, self.comm_obj.up)
 
-        self.comm.Barrier()
-        
         # Balance 
         if self.rank % 2 == 1 and self.comm_obj.down != MPI.PROC_NULL:
-            self._balance_pair(grid, self.comm_obj.down)
+            changed |= self._balance_pair(grid, self.comm_obj.down)
         elif self.rank % 2 == 0 and self.rank != 0 and self.comm_obj.up != MPI.PROC_NULL:
-             self._balance_pair_passive(grid, self.comm_obj.up)
+             changed |= self._balance_pair_passive(grid, self.comm_obj.up)
              
         return changed
 
+    def _repartition(self, grid):
+        counts = self.comm.allgather(grid.rows)
+        costs = np.empty(sum(counts), dtype=np.int64)
+        self.comm.Allgatherv(self.row_costs(grid), [costs, counts, MPI.INT64_T])
+        old = np.concatenate(([0], np.cumsum(counts)))
+        if not costs.any():
+            # Nothing measured yet
+            return False
+        new = partition_rows(costs, self.size, min_rows=min(self.min_rows, len(costs) // self.size))
+        if np.array_equal(old, new):
+            return False
+        self._migrate(grid, old, new)
+        if self.meter is not None:
+            self.meter.assign(grid.offset, costs[grid.offset:grid.offset + grid.rows] * 1e-9)
+        return True
+
+    def _migrate(self, grid, old, new):
+        # Every rank sends the part of its old strip that falls in another rank's
+        # new strip as one block; usually that is one message per moved boundary.
+        # Plain ints, so the grid's rows and offset do not become NumPy scalars
+        o0, o1 = int(old[self.rank]), int(old[self.rank + 1])
+        n0, n1 = int(new[self.rank]), int(new[self.rank + 1])
+        requests, outgoing, incoming = [], [], []
+        for other in range(self.size):
+            if other == self.rank:
+                continue
+            a, b = max(o0, new[other]), min(o1, new[other + 1])
+            if a < b:
+                outgoing.append(grid.export_rows(a - o0, b - o0))
+                requests.append(self.comm.Isend(outgoing[-1], dest=other, tag=TAG_LOAD))
+            a, b = max(n0, old[other]), min(n1, old[other + 1])
+            if a < b:
+                incoming.append((a, grid.empty_rows(b - a)))
+                requests.append(self.comm.Irecv(incoming[-1][1], source=other, tag=TAG_LOAD))
+        MPI.Request.Waitall(requests)
+
+        # Trim to the rows this rank keeps, then attach the received blocks
+        keep_start = min(max(o0, n0), o1)
+        keep_stop = max(keep_start, min(o1, n1))
+        if keep_start > o0:
+            grid.take_rows(keep_start - o0, top=True)
+        if o1 > keep_stop:
+            grid.take_rows(o1 - keep_stop, top=False)
+        above = [rows for a, rows in incoming if a < keep_start]
+        below = [rows for a, rows in incoming if a >= keep_start]
+        if above:
+            grid.add_rows(np.concatenate(above), top=True)
+        if below:
+            grid.add_rows(np.concatenate(below), top=False)
+        grid.offset = n0
+
     def _balance_pair(self, grid, other_rank):
-        my_load = int(self.check_imbalance(grid))
+        my_load = self.check_imbalance(grid)
         
-        my_load = int(self.check_imbalance(grid))
+        my_load = self.check_imbalance(grid)
         
         self.comm.send(my_load, dest=other_rank, tag=TAG_BAL)
-        other_load = self.comm.recv(source=other_rank, tag=TAG_BAL)
+        other_load, other_rows = self.comm.recv(source=other_rank, tag=TAG_BAL)
         
-        if my_load > other_load + LB_THRESHOLD and grid.rows > 2:
+        if self._exceeds(my_load, other_load) and grid.rows > max(2, self.min_rows):
             self.comm.send(1, dest=other_rank, tag=TAG_CMD)
-            row_to_send = grid.data[-1, :].copy()
+            row_to_send = grid.take_rows(1, top=False)
             self.comm.Send(row_to_send, dest=other_rank)
-            grid.data = grid.data[:-1, :]
-            grid.rows -= 1
-            grid.data_with_ghost = np.zeros((grid.rows + 2, grid.cols), dtype=np.int8)
-            grid.update_from_ghost() 
+            return True
             
-        elif other_load > my_load + LB_THRESHOLD:
+        elif self._exceeds(other_load, my_load) and other_rows > max(2, self.min_rows):
             self.comm.send(-1, dest=other_rank, tag=TAG_CMD)
-            recv_buf = np.empty(grid.cols, dtype=np.int8)
+            recv_buf = grid.empty_rows(1)
             self.comm.Recv(recv_buf, source=other_rank)
-            grid.data = np.vstack((grid.data, recv_buf))
-            grid.rows += 1
-            grid.data_with_ghost = np.zeros((grid.rows + 2, grid.cols), dtype=np.int8)
-            grid.update_from_ghost()
+            grid.add_rows(recv_buf, top=False)
+            return True
         else:
             self.comm.send(0, dest=other_rank, tag=TAG_CMD)
+            return False
 
     def _balance_pair_passive(self, grid, other_rank):
 
-        my_load = int(self.check_imbalance(grid))       
+        my_load = self.check_imbalance(grid)       
         other_load = self.comm.recv(source=other_rank, tag=TAG_BAL)
 
-        self.comm.send(my_load, dest=other_rank, tag=TAG_BAL)
+        # Send the row count too, so the active side never asks for a row this
+        # rank is not allowed to give (it would wait forever for it)
+        self.comm.send((my_load, grid.rows), dest=other_rank, tag=TAG_BAL)
         
         command = self.comm.recv(source=other_rank, tag=TAG_CMD)
         
         if command == 1:
-            recv_buf = np.empty(grid.cols, dtype=np.int8)
+            recv_buf = grid.empty_rows(1)
             self.comm.Recv(recv_buf, source=other_rank)
-            grid.data = np.vstack((recv_buf, grid.data))
-            grid.rows += 1
+            grid.add_rows(recv_buf, top=True)
         elif command == -1:
-            if grid.rows > 2:
-                row_to_send = grid.data[0, :].copy()
-                self.comm.Send(row_to_send, dest=other_rank)
-                grid.data = grid.data[1:, :]
-                grid.rows -= 1
-            else:
-                pass
-        
-        if command != 0:
-            grid.data_with_ghost = np.zeros((grid.rows + 2, grid.cols), dtype=np.int8)
-            grid.update_from_ghost()
+            row_to_send = grid.take_rows(1, top=True)
+            self.comm.Send(row_to_send, dest=other_rank)
+        return command != 0
+
+class BlockLoadBalancer(LoadBalancer):
+    # Diffusive balancing for 2D blocks. The partition stays rectilinear: all
+    # ranks in a process row share its row cuts and all ranks in a process column
+    # share its column cuts, so each cut moves by one row/column at a time for the
+    # whole band, decided from the band's total load on both sides.
+    def __init__(self, communicator, mode='diffusive', meter=None, trigger=None, min_rows=1):
+        super().__init__(communicator, mode, meter, trigger, min_rows)
+        # Ranks in the same process row / process column
+        self.row_band = self.comm.Sub([False, True])
+        self.col_band = self.comm.Sub([True, False])
+
+    def redistribute(self, grid):
+
+        if self.size < 2:
+            return False
+
+        changed = self._shift_cuts(grid, self.row_band, self.comm_obj.up, self.comm_obj.down, axis=0)
+        changed |= self._shift_cuts(grid, self.col_band, self.comm_obj.left, self.comm_obj.right, axis=1)
+        return changed
+
+    def _direction(self, before, after):
+        # +1 if the band before the cut gives one slice to the band after it, -1
+        # for the reverse; both sides evaluate this on the same numbers
+        (load_a, extent_a), (load_b, extent_b) = before, after
+        if self._exceeds(load_a, load_b) and extent_a > 2:
+            return 1
+        if self._exceeds(load_b, load_a) and extent_b > 2:
+            return -1
+        return 0
+
+    def _shift_cuts(self, grid, band, prev, nxt, axis):
+        load = band.allreduce(self.check_imbalance(grid), op=MPI.SUM)
+        mine = (load, grid.rows if axis == 0 else grid.cols)
+        before = self.comm.sendrecv(mine, dest=prev, sendtag=TAG_BAL, source=prev, recvtag=TAG_BAL)
+        after = self.comm.sendrecv(mine, dest=nxt, sendtag=TAG_BAL, source=nxt, recvtag=TAG_BAL)
+        to_prev = -self._direction(before, mine) if before is not None else 0
+        to_next = self._direction(mine, after) if after is not None else 0
+
+        if axis == 0:
+            take, add, empty = grid.take_rows, grid.add_rows, lambda: grid.empty_rows(1)
+        else:
+            take, add, empty = grid.take_cols, grid.add_cols, lambda: grid.empty_cols(1)
+
+        # Cut the outgoing slices first, then receive into slices shaped like the
+        # remaining block; neighbours along an axis share the other extent
+        requests, outgoing, incoming = [], [], []
+        for other, direction, first in ((prev, to_prev, True), (nxt, to_next, False)):
+            if direction == 1:
+                outgoing.append(take(1, first))
+                requests.append(self.comm.Isend(outgoing[-1], dest=other, tag=TAG_LOAD))
+            elif direction == -1:
+                buf = empty()
+                requests.append(self.comm.Irecv(buf, source=other, tag=TAG_LOAD))
+                incoming.append((buf, first))
+        MPI.Request.Waitall(requests)
+        for buf, first in incoming:
+            add(buf, first)
+        return bool(requests)
+
+class SharedLoadBalancer(LoadBalancer):
+    # Global repartitioning for the shared-memory backend. Every strip already
+    # lives in the shared global grid, so nothing is sent: each worker publishes
+    # its row costs in the shared cost array, every worker computes the same
+    # cuts from it, and each one moves its window to its new rows.
+    def __init__(self, communicator, mode='global', meter=None, trigger=None, min_rows=1):
+        super().__init__(communicator, mode, meter, trigger, min_rows)
+
+    def redistribute(self, grid):
+        if self.size < 2:
+            return False
+        costs = self.comm_obj.costs
+        costs[grid.offset:grid.offset + grid.rows] = self.row_costs(grid)
+        self.comm.Barrier()
+        if not costs.any():
+            return False
+        new = partition_rows(costs, self.size, min_rows=min(self.min_rows, len(costs) // self.size))
+        n0, n1 = int(new[self.rank]), int(new[self.rank + 1])
+        mine = costs[n0:n1] * 1e-9
+        # Nobody rewrites the costs before every worker has read them
+        self.comm.Barrier()
+        if (n0, n1 - n0) == (grid.offset, grid.rows):
+            return False
+        if self.meter is not None:
+            self.meter.assign(n0, mine)
+        grid.rebind(n0, n1 - n0)
+        return True
@@ -1,30 +1,84 @@
-from mpi4py import MPI
+import operator
 import numpy as np
-from src.config import TAG_UP, TAG_DOWN
+try:
+    from mpi4py import MPI
+except ImportError:  # Only --backend shm runs without an MPI install
+    class MPI:
+        # The constants shared code paths take from mpi4py.MPI; ops are plain
+        # callables, as mpi4py's are
+        PROC_NULL = -2
+        SUM = staticmethod(operator.add)
+        MAX = staticmethod(max)
+        MIN = staticmethod(min)
+        LAND = staticmethod(lambda a, b: a and b)
+from src.config import TAG_UP, TAG_DOWN, TAG_LEFT, TAG_RIGHT
 
 class Communicator:
 
-    def __init__(self):
+    # Persistent halo channels kept alive at once: one per buffer of a
+    # double-buffered grid
+    MAX_CHANNELS = 2
+
+    def __init__(self, persistent=True):
         self.comm = MPI.COMM_WORLD
         self.rank = self.comm.Get_rank()
         self.size = self.comm.Get_size()
         self.up = self.rank - 1 if self.rank > 0 else MPI.PROC_NULL
         self.down = self.rank + 1 if self.rank < self.size - 1 else MPI.PROC_NULL
+        self.persistent = persistent
+        self._channels = {}
+
+    def _halo_channel(self, grid):
+        # Send_init/Recv_init bound directly to the grid's edge and ghost rows, so
+        # a step is just Startall + Waitall with no copies or allocations. Channels
+        # are keyed by the grid's storage array and rebuilt only when it is
+        # reallocated (e.g. by row migration).
+        key = id(grid.halo_buffer)
+        channel = self._channels.get(key)
+        if channel is not None:
+            return channel[1]
+
+        # Drop channels for buffers of another shape (the strip was resized) and
+        # the oldest one if the cache is full
+        buffer = grid.halo_buffer
+        for old_key, (old_buffer, old_requests) in list(self._channels.items()):
+            if old_buffer.shape != buffer.shape or len(self._channels) >= self.MAX_CHANNELS:
+                for req in old_requests:
+                    req.Free()
+                del self._channels[old_key]
+
+        views = grid.halo_views()
+        send_up, send_down, recv_up, recv_down = views
+        requests = []
+        if self.up != MPI.PROC_NULL:
+            requests.append(self.comm.Send_init(send_up, dest=self.up, tag=TAG_DOWN))
+            requests.append(self.comm.Recv_init(recv_up, source=self.up, tag=TAG_UP))
+        if self.down != MPI.PROC_NULL:
+            requests.append(self.comm.Send_init(send_down, dest=self.down, tag=TAG_UP))
+            requests.append(self.comm.Recv_init(recv_down, source=self.down, tag=TAG_DOWN))
+        # Keep the storage alive as long as the requests reference its memory
+        self._channels[key] = (buffer, requests)
+        return requests
 
     def start_ghost_exchange(self, grid):
 
         if self.size == 1:
             return []
 
-        # Ghost exchange data
+        if self.persistent and grid.rows > 0:
+            requests = self._halo_channel(grid)
+            MPI.Prequest.Startall(requests)
+            return requests
+
+        # Ghost exchange data, in the grid's row wire format (int8 or packed words)
         requests = []
         # Handle 0-row case
         if grid.rows == 0:
-            send_up = np.zeros(grid.cols, dtype=np.int8)
-            send_down = np.zeros(grid.cols, dtype=np.int8)
+            send_up = grid.empty_rows(1)[0]
+            send_down = grid.empty_rows(1)[0]
         else:
-            send_up = grid.data[0, :].copy()
-            send_down = grid.data[-1, :].copy()
+            send_up = grid.export_rows(0, 1)[0]
+            send_down = grid.export_rows(grid.rows - 1, grid.rows)[0]
         
         # Create receive buffers
         self.recv_up_buf = np.empty_like(send_up)
@@ -52,34 +106,148 @@ class Communicator:
         if requests:
             MPI.Request.Waitall(requests)
 
+        # Persistent receives land directly in the ghost rows
+        if self.persistent and grid.rows > 0:
+            return
+
         # Update ghost data
+        grid.set_ghost_rows(
+            top=self.recv_up_buf if self.up != MPI.PROC_NULL else None,
+            bottom=self.recv_down_buf if self.down != MPI.PROC_NULL else None)
+
+    def exchange_rows(self, grid, depth):
+        # Deep halos: swap depth edge rows with each neighbour in one message per
+        # direction. Returns (rows above, rows below), None at the global edges.
+        above = below = None
+        requests, outgoing = [], []
         if self.up != MPI.PROC_NULL:
-            grid.data_with_ghost[0, :] = self.recv_up_buf
+            above = grid.empty_rows(depth)
+            outgoing.append(grid.export_rows(0, depth))
+            requests.append(self.comm.Isend(outgoing[-1], dest=self.up, tag=TAG_DOWN))
+            requests.append(self.comm.Irecv(above, source=self.up, tag=TAG_UP))
         if self.down != MPI.PROC_NULL:
-            grid.data_with_ghost[-1, :] = self.recv_down_buf
+            below = grid.empty_rows(depth)
+            outgoing.append(grid.export_rows(grid.rows - depth, grid.rows))
+            requests.append(self.comm.Isend(outgoing[-1], dest=self.down, tag=TAG_UP))
+            requests.append(self.comm.Irecv(below, source=self.down, tag=TAG_DOWN))
+        MPI.Request.Waitall(requests)
+        return above, below
 
     def gather_grid(self, grid):
         local_rows = grid.rows
         all_rows = self.comm.gather(local_rows, root=0)
-        local_data = grid.data
+        # Rows travel in the grid's wire format and are decoded on rank 0
+        local_data = grid.export_rows(0, local_rows)
+        row_bytes = grid.empty_rows(1).nbytes
 
         # Gather grid data
         if self.rank == 0:
             total_rows = sum(all_rows)
-            full_grid = np.empty((total_rows, grid.cols), dtype=np.int8)
+            full_grid = grid.empty_rows(total_rows)
             
             displacements = [0]
             for r in all_rows[:-1]:
                 displacements.append(displacements[-1] + r)
             
-            counts = [r * grid.cols for r in all_rows]
-            displacements_bytes = [d * grid.cols for d in displacements] 
+            counts = [r * row_bytes for r in all_rows]
+            displacements_bytes = [d * row_bytes for d in displacements] 
             
             if self.size > 1:
-                self.comm.Gatherv(local_data, [full_grid, counts, displacements_bytes, MPI.SIGNED_CHAR], root=0)
+                self.comm.Gatherv(local_data.view(np.uint8), [full_grid.view(np.uint8), counts, displacements_bytes, MPI.BYTE], root=0)
             else:
                 full_grid[:] = local_data
+            return grid.decode_rows(full_grid)
+        else:
+            self.comm.Gatherv(local_data.view(np.uint8), None, root=0)
+            return None
+
+class CartCommunicator(Communicator):
+    # 2D block decomposition on a Cartesian communicator: rank (i, j) owns one
+    # block of a rectilinear partition, with ghost rows from up/down and ghost
+    # columns from left/right. The stencil has no diagonal neighbours, so corner
+    # cells are never exchanged.
+
+    def __init__(self, dims=None, persistent=True):
+        super().__init__(persistent)
+        self.dims = MPI.Compute_dims(self.size, dims or [0, 0])
+        # reorder=False keeps ranks (and rank 0 as the root) as in COMM_WORLD
+        self.comm = self.comm.Create_cart(self.dims, periods=[False, False], reorder=False)
+        self.coords = self.comm.Get_coords(self.rank)
+        self.up, self.down = self.comm.Shift(0, 1)
+        self.left, self.right = self.comm.Shift(1, 1)
+        self._col_channels = {}
+        self._col_types = {}
+
+    def _col_type(self, grid):
+        # One column of the interior rows: rows cells, cols + 2 apart
+        key = (grid.rows, grid.cols + 2)
+        col_type = self._col_types.get(key)
+        if col_type is None:
+            for old in self._col_types.values():
+                old.Free()
+            self._col_types.clear()
+            col_type = self._col_types[key] = MPI.INT8_T.Create_vector(grid.rows, 1, grid.cols + 2).Commit()
+        return col_type
+
+    def _column_requests(self, grid, persistent):
+        col_type = self._col_type(grid)
+        send_left, send_right, recv_left, recv_right = grid.halo_columns()
+        send = self.comm.Send_init if persistent else self.comm.Isend
+        recv = self.comm.Recv_init if persistent else self.comm.Irecv
+        requests = []
+        if self.left != MPI.PROC_NULL:
+            requests.append(send([send_left, 1, col_type], dest=self.left, tag=TAG_RIGHT))
+            requests.append(recv([recv_left, 1, col_type], source=self.left, tag=TAG_LEFT))
+        if self.right != MPI.PROC_NULL:
+            requests.append(send([send_right, 1, col_type], dest=self.right, tag=TAG_LEFT))
+            requests.append(recv([recv_right, 1, col_type], source=self.right, tag=TAG_RIGHT))
+        return requests
+
+    def _column_channel(self, grid):
+        # Same caching as _halo_channel, for the ghost columns
+        key = id(grid.halo_buffer)
+        channel = self._col_channels.get(key)
+        if channel is not None:
+            return channel[1]
+        buffer = grid.halo_buffer
+        for old_key, (old_buffer, old_requests) in list(self._col_channels.items()):
+            if old_buffer.shape != buffer.shape or len(self._col_channels) >= self.MAX_CHANNELS:
+                for req in old_requests:
+                    req.Free()
+                del self._col_channels[old_key]
+        requests = self._column_requests(grid, persistent=True)
+        self._col_channels[key] = (buffer, requests)
+        return requests
+
+    def start_ghost_exchange(self, grid):
+        requests = list(super().start_ghost_exchange(grid))
+        if self.dims[1] == 1 or grid.rows == 0:
+            return requests
+        # Columns go straight from and into the padded buffer via the vector type
+        if self.persistent:
+            col_requests = self._column_channel(grid)
+            MPI.Prequest.Startall(col_requests)
+        else:
+            col_requests = self._column_requests(grid, persistent=False)
+        return requests + col_requests
+
+    def gather_grid(self, grid):
+        # Blocks are gathered flat with their global position and placed on rank 0
+        blocks = self.comm.gather((grid.offset, grid.col_offset, grid.rows, grid.cols), root=0)
+        local_data = np.ascontiguousarray(grid.data)
+        if self.rank == 0:
+            counts = [r * c * local_data.itemsize for _, _, r, c in blocks]
+            displacements = np.concatenate(([0], np.cumsum(counts)[:-1])).tolist()
+            flat = np.empty(sum(counts), dtype=np.uint8)
+            self.comm.Gatherv(local_data.view(np.uint8), [flat, counts, displacements, MPI.BYTE], root=0)
+            flat = flat.view(local_data.dtype)
+            total_rows = max(o + r for o, _, r, _ in blocks)
+            total_cols = max(co + c for _, co, _, c in blocks)
+            full_grid = np.empty((total_rows, total_cols), dtype=local_data.dtype)
+            for (o, co, r, c), d in zip(blocks, displacements):
+                start = d // local_data.itemsize
+                full_grid[o:o + r, co:co + c] = flat[start:start + r * c].reshape(r, c)
             return full_grid
         else:
-            self.comm.Gatherv(local_data, None, root=0)
+            self.comm.Gatherv(local_data.view(np.uint8), None, root=0)
             return None
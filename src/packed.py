@@ -0,0 +1,235 @@
+import numpy as np
+from src.config import FUEL, BURNING, BURNT, P_SPREAD, P_IGNITE
+from src.frontier import sample_sparse
+from src.wildfire import heavy_wait
+from src.grid import _headroom
+
+# Cells are stored as two bitplanes (burning, burnt) of uint64 words per row;
+# bit j of word w holds column 64 * w + j. FUEL is the absence of both bits.
+WORD_BITS = 64
+PLANE_BURNING = 0
+PLANE_BURNT = 1
+PROB_BITS = 32
+
+ONE = np.uint64(1)
+HIGH_BIT = np.uint64(WORD_BITS - 1)
+
+def popcount(words):
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(np.ascontiguousarray(words).view(np.uint8)).sum())
+
+def pack_rows(rows, nwords):
+    # (n, cols) int8 states -> (n, 2, nwords) uint64 planes
+    n, cols = rows.shape
+    planes = np.zeros((n, 2, nwords * 8), dtype=np.uint8)
+    planes[:, PLANE_BURNING, :(cols + 7) // 8] = np.packbits(rows == BURNING, axis=-1, bitorder='little')
+    planes[:, PLANE_BURNT, :(cols + 7) // 8] = np.packbits(rows == BURNT, axis=-1, bitorder='little')
+    return planes.view('<u8').astype(np.uint64, copy=False)
+
+def unpack_rows(words, cols):
+    # (n, 2, nwords) uint64 planes -> (n, cols) int8 states
+    bits = np.unpackbits(words.astype('<u8', copy=False).view(np.uint8), axis=-1, count=cols, bitorder='little')
+    states = np.full(bits.shape[:1] + (cols,), FUEL, dtype=np.int8)
+    states[bits[:, PLANE_BURNING, :] == 1] = BURNING
+    states[bits[:, PLANE_BURNT, :] == 1] = BURNT
+    return states
+
+def bernoulli_words(p, n):
+    # n words whose bits are independently set with probability p (to PROB_BITS
+    # of precision), combining one random word per binary digit of p
+    q = int(round(min(max(p, 0.0), 1.0) * (1 << PROB_BITS)))
+    if q >= 1 << PROB_BITS:
+        return np.full(n, np.iinfo(np.uint64).max, dtype=np.uint64)
+    mask = np.zeros(n, dtype=np.uint64)
+    if q == 0:
+        return mask
+    # Digits are consumed from least significant up; those below the lowest
+    # set bit leave the mask at zero, so skip them
+    lowest = (q & -q).bit_length() - 1
+    for digit in range(lowest, PROB_BITS):
+        rand = np.frombuffer(np.random.bytes(8 * n), dtype=np.uint64)
+        mask = (rand | mask) if (q >> digit) & 1 else (rand & mask)
+    return mask
+
+class PackedGrid:
+
+    def __init__(self, rows, cols, offset=0):
+        self.rows = rows
+        self.cols = cols
+        self.offset = offset
+        # Packed grids are only split into row strips
+        self.col_offset = 0
+        self.nwords = (cols + WORD_BITS - 1) // WORD_BITS
+        # Valid-column mask; bits past cols in the last word must stay clear
+        self.col_mask = np.full(self.nwords, np.iinfo(np.uint64).max, dtype=np.uint64)
+        if cols % WORD_BITS:
+            self.col_mask[-1] = np.uint64((1 << (cols % WORD_BITS)) - 1)
+        self._set_words(self.empty_rows(rows))
+
+    def _set_words(self, rows):
+        # words (rows + 2 padded rows) is a window into a store with spare rows at
+        # both ends, as in Grid, so row migration only moves the window and copies
+        # the moved rows; the store is reallocated when the headroom runs out
+        spare = _headroom(len(rows))
+        self._store = np.zeros((len(rows) + 2 + 2 * spare, 2, self.nwords), dtype=np.uint64)
+        self._move_window(spare, len(rows))
+        self.words[1:-1] = rows
+
+    def _move_window(self, top, rows):
+        # Ghost rows may hold interior words from before; the halo exchange refills them
+        self._top, self.rows = top, rows
+        self.words = self._store[top:top + rows + 2]
+        self.words[[0, -1]] = 0
+
+    @property
+    def data(self):
+        return unpack_rows(self.words[1:-1], self.cols)
+
+    @data.setter
+    def data(self, values):
+        self.words[1:-1] = pack_rows(values, self.nwords)
+
+    @property
+    def data_with_ghost(self):
+        return unpack_rows(self.words, self.cols)
+
+    def update_from_ghost(self):
+        pass
+
+    def commit_updates(self, new_data):
+        self.data = new_data
+
+    def set_fire(self, r, c):
+        if 0 <= r < self.rows and 0 <= c < self.cols:
+            w, bit = divmod(c, WORD_BITS)
+            self.words[r + 1, PLANE_BURNING, w] |= ONE << np.uint64(bit)
+            self.words[r + 1, PLANE_BURNT, w] &= ~(ONE << np.uint64(bit))
+
+    def get_state(self):
+        return self.data
+
+    def count_state(self, state):
+        burning = popcount(self.words[1:-1, PLANE_BURNING])
+        burnt = popcount(self.words[1:-1, PLANE_BURNT])
+        if state == BURNING:
+            return burning
+        if state == BURNT:
+            return burnt
+        return self.rows * self.cols - burning - burnt
+
+    # Wire format: one row is a (2, nwords) uint64 block, 4x smaller than int8
+    def empty_rows(self, n):
+        return np.zeros((n, 2, self.nwords), dtype=np.uint64)
+
+    def export_rows(self, start, stop):
+        return self.words[start + 1:stop + 1].copy()
+
+    def decode_rows(self, rows):
+        return unpack_rows(rows, self.cols)
+
+    @property
+    def halo_buffer(self):
+        # Array the halo views point into; a new one whenever the words are
+        # reallocated, which invalidates the persistent requests cached for it
+        return self.words
+
+    def halo_views(self):
+        # (first row, last row, top ghost, bottom ghost) as views into the live buffer
+        return self.words[1], self.words[-2], self.words[0], self.words[-1]
+
+    def set_ghost_rows(self, top=None, bottom=None):
+        if top is not None:
+            self.words[0] = top
+        if bottom is not None:
+            self.words[-1] = bottom
+
+    def take_rows(self, n, top):
+        # Only the n taken rows are copied; the window shrinks over them
+        if top:
+            taken = self.export_rows(0, n)
+            self._move_window(self._top + n, self.rows - n)
+            self.offset += n
+        else:
+            taken = self.export_rows(self.rows - n, self.rows)
+            self._move_window(self._top, self.rows - n)
+        return taken
+
+    def add_rows(self, rows, top):
+        # The window grows into the headroom and only the new rows are written
+        n = len(rows)
+        if top:
+            self.offset -= n
+        if n > (self._top if top else len(self._store) - self._top - self.rows - 2):
+            inner = self.words[1:-1]
+            self._set_words(np.concatenate((rows, inner) if top else (inner, rows)))
+            return
+        if top:
+            self._move_window(self._top - n, self.rows + n)
+            self.words[1:n + 1] = rows
+        else:
+            self._move_window(self._top, self.rows + n)
+            self.words[self.rows - n + 1:self.rows + 1] = rows
+
+def _word_bits(words):
+    # (n,) uint64 -> (n, 64) 0/1 array, bit j in column j
+    return np.unpackbits(words.astype('<u8').view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+
+def _set_bits(words, rows, cols):
+    np.bitwise_or.at(words, (rows, cols // WORD_BITS), ONE << (cols % WORD_BITS).astype(np.uint64))
+
+def update_packed(grid_obj, heavy_load=False, rng=None, step=0, p_spread=P_SPREAD, p_ignite=P_IGNITE):
+    # Each burning neighbour independently spreads with p_spread, so a fuel cell
+    # with n burning neighbours ignites with 1 - (1 - p_spread) ** n, as in
+    # update_grid; spontaneous ignition is an independent p_ignite event.
+    words = grid_obj.words
+    rows = grid_obj.rows
+    if rows == 0:
+        return 0, 0
+
+    burning = words[:, PLANE_BURNING, :]
+    burnt = words[:, PLANE_BURNT, :]
+    cur = burning[1:-1]
+    fuel = ~(cur | burnt[1:-1]) & grid_obj.col_mask
+
+    up = burning[:-2]
+    down = burning[2:]
+    left = cur << ONE
+    left[:, 1:] |= cur[:, :-1] >> HIGH_BIT
+    right = cur >> ONE
+    right[:, :-1] |= cur[:, 1:] << HIGH_BIT
+
+    ignite = np.zeros_like(cur)
+    exposed = np.nonzero(fuel & (up | down | left | right))
+    n = len(exposed[0])
+    if rng is None:
+        if n:
+            spread = np.zeros(n, dtype=np.uint64)
+            for neighbor in (up, down, left, right):
+                spread |= neighbor[exposed] & bernoulli_words(p_spread, n)
+            ignite[exposed] = spread
+
+        spont = sample_sparse(rows * grid_obj.cols, p_ignite)
+        if len(spont):
+            _set_bits(ignite, *np.divmod(spont, grid_obj.cols))
+    else:
+        # Counter-based draws need per-cell neighbour counts, so unpack only the
+        # exposed words
+        if n:
+            counts = sum(_word_bits(neighbor[exposed]) for neighbor in (up, down, left, right))
+            i, bit = np.nonzero(_word_bits(fuel[exposed]) & (counts > 0))
+            r, c = exposed[0][i], exposed[1][i] * WORD_BITS + bit
+            hits = rng.spread(step, grid_obj.offset + r, c, counts[i, bit])
+            _set_bits(ignite, r[hits], c[hits])
+        sr, sc = rng.spontaneous(step, grid_obj.offset, grid_obj.offset + rows, grid_obj.cols)
+        _set_bits(ignite, sr - grid_obj.offset, sc)
+    ignite &= fuel
+
+    # Popcounts touch 64 cells per word, a small fraction of the step
+    counts = (popcount(ignite), popcount(cur))
+    burnt[1:-1] |= cur
+    burning[1:-1] = ignite
+
+    if heavy_load:
+        heavy_wait(sum(counts))
+    return counts
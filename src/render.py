@@ -0,0 +1,60 @@
+import struct
+import zlib
+import numpy as np
+from src.config import COLOR_MAP, FUEL, BURNING, BURNT, SMOULDERING
+
+# RGB of each state, indexed by the state's byte value
+PALETTE = np.zeros((256, 3), dtype=np.uint8)
+for _state, _rgb in COLOR_MAP.items():
+    PALETTE[_state] = np.round(np.asarray(_rgb) * 255)
+
+# When a downsampled pixel covers several states, show the most interesting one:
+# burning beats smouldering beats burnt beats fuel
+_PRIORITY = np.zeros(256, dtype=np.uint8)
+_PRIORITY[[FUEL, BURNT, SMOULDERING, BURNING]] = [0, 1, 2, 3]
+_BY_PRIORITY = np.array([FUEL, BURNT, SMOULDERING, BURNING], dtype=np.uint8)
+
+# Source rows reduced at a time, so huge memory-mapped frames stay bounded in memory
+BAND_ROWS = 4096
+
+def scale_for(shape, size):
+    # Negative: downsample by that factor; positive: upsample by it
+    longest = max(shape)
+    if longest > size:
+        return -((longest + size - 1) // size)
+    return max(1, size // max(longest, 1))
+
+def downsample(frame, factor):
+    # Each factor x factor block becomes its highest-priority state
+    rows, cols = frame.shape
+    col_starts = np.arange(0, cols, factor)
+    band = max(factor, BAND_ROWS // factor * factor)
+    out = []
+    for start in range(0, rows, band):
+        chunk = _PRIORITY[np.asarray(frame[start:start + band]).view(np.uint8)]
+        chunk = np.maximum.reduceat(chunk, np.arange(0, chunk.shape[0], factor), axis=0)
+        out.append(np.maximum.reduceat(chunk, col_starts, axis=1))
+    return _BY_PRIORITY[np.concatenate(out)]
+
+def to_rgb(frame, scale=1):
+    # (rows, cols, 3) uint8 image through the palette lookup
+    if scale < -1:
+        frame = downsample(frame, -scale)
+    rgb = PALETTE[np.asarray(frame).view(np.uint8)]
+    if scale > 1:
+        rgb = rgb.repeat(scale, axis=0).repeat(scale, axis=1)
+    return rgb
+
+def _chunk(tag, data):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+def write_png(path, rgb, level=6):
+    # 8-bit truecolour PNG, no filtering; the flat colour areas compress well anyway
+    height, width, _ = rgb.shape
+    raw = np.zeros((height, 1 + 3 * width), dtype=np.uint8)
+    raw[:, 1:] = rgb.reshape(height, -1)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(_chunk(b'IDAT', zlib.compress(raw.tobytes(), level)))
+        f.write(_chunk(b'IEND', b''))
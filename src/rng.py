@@ -0,0 +1,139 @@
+import numpy as np
+from src.config import P_SPREAD, P_IGNITE
+
+# Philox4x32-10 (Salmon et al., "Parallel random numbers: as easy as 1, 2, 3").
+# Every draw is a pure function of (key, counter), so a cell's random number
+# depends only on (seed, step, global row, global col) and never on how the
+# grid is split across ranks. src/cpp/simulation.cpp implements the same scheme.
+PHILOX_M0 = np.uint64(0xD2511F53)
+PHILOX_M1 = np.uint64(0xCD9E8D57)
+PHILOX_W0 = np.uint64(0x9E3779B9)
+PHILOX_W1 = np.uint64(0xBB67AE85)
+MASK32 = np.uint64(0xFFFFFFFF)
+SHIFT32 = np.uint64(32)
+PHILOX_ROUNDS = 10
+
+# Counter word 3 separates the independent streams
+STREAM_SPREAD = 0
+STREAM_SPONTANEOUS = 1
+
+# Longest geometric lookup table for spontaneous-ignition skips
+MAX_SKIP_TABLE = 4096
+
+def philox4x32(c0, c1, c2, c3, k0, k1):
+    ctr = [np.asarray(c, dtype=np.uint64) & MASK32 for c in np.broadcast_arrays(c0, c1, c2, c3)]
+    k0 = np.uint64(k0) & MASK32
+    k1 = np.uint64(k1) & MASK32
+    for i in range(PHILOX_ROUNDS):
+        if i:
+            k0 = (k0 + PHILOX_W0) & MASK32
+            k1 = (k1 + PHILOX_W1) & MASK32
+        p0 = PHILOX_M0 * ctr[0]
+        p1 = PHILOX_M1 * ctr[2]
+        ctr = [(p1 >> SHIFT32) ^ ctr[1] ^ k0, p1 & MASK32, (p0 >> SHIFT32) ^ ctr[3] ^ k1, p0 & MASK32]
+    return ctr
+
+def spread_table(p_spread, neighbors=4):
+    # 1 - (1 - p) ** n for n = 0..neighbors, built by repeated multiplication so
+    # the C++ engine gets bit-identical thresholds
+    table = []
+    q = 1.0
+    for _ in range(neighbors + 1):
+        table.append(1.0 - q)
+        q *= 1.0 - p_spread
+    return np.array(table)
+
+def skip_table(p):
+    # (1 - p) ** k for k = 1..K; a skip is the number of entries >= u, plus one
+    table = []
+    q = 1.0
+    while len(table) < MAX_SKIP_TABLE:
+        q *= 1.0 - p
+        table.append(q)
+        if q < 2.0 ** -32:
+            break
+    return np.array(table)
+
+class CounterRNG:
+    # Ignition rule under this RNG: a fuel cell with n > 0 burning neighbours
+    # ignites if uniform(step, row, col) < 1 - (1 - P_SPREAD) ** n; independently,
+    # spontaneous ignition events are placed along each global row by geometric
+    # skips drawn from their own stream, so they cost O(events) to generate.
+
+    def __init__(self, seed=0, p_spread=P_SPREAD, p_ignite=P_IGNITE):
+        self.seed = int(seed)
+        self.key = (self.seed & 0xFFFFFFFF, (self.seed >> 32) & 0xFFFFFFFF)
+        self.p_ignite = p_ignite
+        self.spread_prob = spread_table(p_spread)
+        self.skips = skip_table(p_ignite) if 0 < p_ignite < 1 else None
+        self._skips_ascending = self.skips[::-1] if self.skips is not None else None
+
+    def random_bits(self, step, rows, cols, stream=STREAM_SPREAD, member=0):
+        # Ensemble member m draws under key (seed, seed_hi + m), i.e. as a run
+        # with seed + (m << 32); member 0 is the plain run with this seed
+        k1 = self.key[1] + member if np.isscalar(member) else (self.key[1] + np.asarray(member, dtype=np.uint64))
+        return philox4x32(cols, rows, step, stream, self.key[0], k1)[0]
+
+    def uniform(self, step, rows, cols, member=0):
+        # [0, 1) with 32 bits of resolution
+        return self.random_bits(step, rows, cols, member=member) * 2.0 ** -32
+
+    def spread(self, step, rows, cols, counts, member=0):
+        # rows/cols are global coordinates of fuel cells with counts > 0 burning neighbours
+        return self.uniform(step, rows, cols, member=member) < self.spread_prob[counts]
+
+    def spontaneous(self, step, row_start, row_stop, col_stop, col_start=0):
+        # Global (row, col) of spontaneous ignition events in rows [row_start, row_stop)
+        # and columns [col_start, col_stop). Skips always start from column 0, so a
+        # column block pays for the events to its left but sees the same ones.
+        if self.p_ignite <= 0 or row_stop <= row_start or col_stop <= col_start:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        rows = np.arange(row_start, row_stop, dtype=np.int64)
+        return self._events(step, rows, 0, col_start, col_stop)
+
+    def spontaneous_members(self, step, members, rows, cols):
+        # (member, row, col) of the spontaneous events of ensemble members (global
+        # indices) on a full rows x cols grid, all members in one pass
+        empty = np.empty(0, dtype=np.int64)
+        if self.p_ignite <= 0 or not len(members) or rows <= 0 or cols <= 0:
+            return empty, empty, empty
+        count = len(members)
+        members = np.repeat(np.asarray(members, dtype=np.int64), rows)
+        row_ids = np.tile(np.arange(rows, dtype=np.int64), count)
+        pair, hit_cols = self._events(step, np.arange(len(members)), members, 0, cols, row_ids=row_ids)
+        return members[pair], row_ids[pair], hit_cols
+
+    def _events(self, step, rows, member, col_start, col_stop, row_ids=None):
+        # Skip sampling along each entry of rows (global row indices, or with
+        # row_ids, labels of (member, row) pairs); returns (label, col) per event
+        row_ids = rows if row_ids is None else row_ids
+        if self.p_ignite >= 1:
+            cols = np.arange(col_start, col_stop, dtype=np.int64)
+            return np.repeat(rows, len(cols)), np.tile(cols, len(rows))
+
+        table_len = len(self.skips)
+        # Draws per row per pass: enough that most rows finish in one pass
+        batch = int(col_stop * self.p_ignite * 1.25) + 8
+        pos = np.full(len(rows), -1, dtype=np.int64)
+        hit_rows, hit_cols = [], []
+        first_draw = 0
+        while len(rows):
+            draws = np.arange(first_draw, first_draw + batch, dtype=np.int64)
+            # (0, 1] so that the table lookup always terminates
+            key = member if np.isscalar(member) else member[:, None]
+            u = (self.random_bits(step, row_ids[:, None], draws[None, :], STREAM_SPONTANEOUS, member=key) + 1) * 2.0 ** -32
+            count = table_len - np.searchsorted(self._skips_ascending, u, side='left')
+            # Past the end of the table: skip table_len cells with no event (the
+            # geometric distribution is memoryless) and draw again
+            event = count < table_len
+            cells = pos[:, None] + np.cumsum(np.where(event, count + 1, table_len), axis=1)
+            hit = event & (cells >= col_start) & (cells < col_stop)
+            hit_rows.append(np.broadcast_to(rows[:, None], hit.shape)[hit])
+            hit_cols.append(cells[hit])
+            pos = cells[:, -1]
+            alive = pos < col_stop
+            rows, row_ids, pos = rows[alive], row_ids[alive], pos[alive]
+            if not np.isscalar(member):
+                member = member[alive]
+            first_draw += batch
+        return np.concatenate(hit_rows), np.concatenate(hit_cols)
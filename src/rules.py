@@ -0,0 +1,155 @@
+import numpy as np
+from src.config import RULES, P_IGNITE
+from src.rng import spread_table
+from src.wildfire import heavy_wait, _rng
+
+# Lookup-table rule engine for the models declared in config.RULES. A cell's
+# state and its number of burning neighbours are packed into one small code,
+# state * (neighbours + 1) + count, and every per-cell decision (next state,
+# ignition probability, whether the cell starts or stops burning) is a table
+# lookup by code, so a new model is a config entry rather than a new kernel.
+class Rule:
+
+    def __init__(self, name, neighbors, burning, transitions, p_ignite=P_IGNITE):
+        self.name = name
+        self.neighbors = [tuple(offset) for offset in neighbors]
+        # Ghost cells the model reads beyond a strip's edge, and whether it reads
+        # the diagonal (corner) ghosts
+        self.radius = max(max(abs(dr), abs(dc)) for dr, dc in self.neighbors)
+        self.diagonal = any(dr and dc for dr, dc in self.neighbors)
+        states = max(transitions) + 1
+        missing = sorted(set(range(states)) - set(transitions))
+        if missing:
+            raise ValueError(f"rule {name}: no transition for states {missing}")
+        self.burning_states = tuple(burning)
+        is_burning = np.zeros(states, dtype=bool)
+        is_burning[list(burning)] = True
+
+        self.base = len(self.neighbors) + 1
+        codes = states * self.base
+        self.code_dtype = np.uint8 if codes <= 256 else np.uint16
+        self.next = np.zeros(codes, dtype=np.int8)
+        self.alt = np.zeros(codes, dtype=np.int8)
+        # Legacy RNG: one draw per cell against max(spread, spontaneous), as in
+        # IGNITION_LUT; counter RNG: CounterRNG's spread draw, plus its
+        # spontaneous events for the codes that take them
+        self.prob = np.zeros(codes, dtype=np.float32)
+        self.spread_prob = np.zeros(codes)
+        self.spontaneous = np.zeros(codes, dtype=bool)
+        counts = np.arange(self.base)
+        for state, t in transitions.items():
+            block = slice(state * self.base, (state + 1) * self.base)
+            self.next[block] = t['next']
+            self.alt[block] = t.get('ignite', t['next'])
+            if 'ignite' in t:
+                p_spont = p_ignite if t.get('spontaneous') else 0
+                self.prob[block] = np.maximum(1 - (1 - t['spread']) ** counts, p_spont)
+                self.spread_prob[block] = spread_table(t['spread'], len(self.neighbors))
+                self.spontaneous[block] = bool(t.get('spontaneous'))
+        self.draws = self.prob > 0
+        self.spread_draws = self.spread_prob > 0
+
+        # Cells that start or stop burning under each outcome, for the
+        # (newly ignited, newly burnt) counts
+        was = is_burning[np.arange(codes) // self.base]
+        self.ignites = (~was & is_burning[self.next]).astype(np.int64)
+        self.burns_out = (was & ~is_burning[self.next]).astype(np.int64)
+        self.alt_ignites = (~was & is_burning[self.alt]).astype(np.int64) - self.ignites
+        self.alt_burns_out = (was & ~is_burning[self.alt]).astype(np.int64) - self.burns_out
+
+    def count_burning(self, data):
+        return sum(int(np.count_nonzero(data == state)) for state in self.burning_states)
+
+def make_rule(name):
+    if name not in RULES:
+        raise ValueError(f"unknown rule {name!r}; RULES has {', '.join(RULES)}")
+    return Rule(name, **RULES[name])
+
+class _RuleScratch:
+    def __init__(self, rows, cols, code_dtype):
+        self.burning = np.zeros((rows + 2, cols + 2), dtype=bool)
+        self.other = np.zeros((rows + 2, cols + 2), dtype=bool)
+        self.counts = np.zeros((rows, cols), dtype=np.uint8)
+        self.codes = np.zeros((rows, cols), dtype=code_dtype)
+
+# Same Grid contract as update_grid_fused: reads the padded front buffer,
+# writes the back buffer and swaps. Neighbours beyond the one ghost layer read
+# as not burning, which is exact at the global edges; strips of a multi-rank
+# run get wider halos from DeepHalo (see main.py).
+class RuleEngine:
+
+    def __init__(self, rule):
+        self.rule = rule
+
+    def _scratch(self, grid):
+        key = ('lut', self.rule.name)
+        s = grid.scratch.get(key)
+        if s is None:
+            s = grid.scratch[key] = _RuleScratch(grid.rows, grid.cols, self.rule.code_dtype)
+        return s
+
+    def _apply(self, out, flat, cells):
+        # Alternative transition for the flat cell indices; returns the change
+        # it makes to the (ignited, burnt) counts
+        codes = np.take(flat, cells)
+        out[cells // out.shape[1], cells % out.shape[1]] = np.take(self.rule.alt, codes)
+        return int(np.take(self.rule.alt_ignites, codes).sum()), int(np.take(self.rule.alt_burns_out, codes).sum())
+
+    def step(self, grid, heavy_load=False, rng=None, step=0):
+        rule = self.rule
+        rows, cols = grid.rows, grid.cols
+        src = grid.padded
+        dst = grid.back_buffer()
+        if rows == 0:
+            grid.swap()
+            return 0, 0
+        s = self._scratch(grid)
+
+        # Burning neighbours: one mask over the padded block, added at every offset
+        np.equal(src, rule.burning_states[0], out=s.burning)
+        for state in rule.burning_states[1:]:
+            np.equal(src, state, out=s.other)
+            np.logical_or(s.burning, s.other, out=s.burning)
+        s.counts.fill(0)
+        for dr, dc in rule.neighbors:
+            r0, r1 = max(0, -1 - dr), min(rows, rows + 1 - dr)
+            c0, c1 = max(0, -1 - dc), min(cols, cols + 1 - dc)
+            if r0 < r1 and c0 < c1:
+                window = s.counts[r0:r1, c0:c1]
+                np.add(window, s.burning[r0 + 1 + dr:r1 + 1 + dr, c0 + 1 + dc:c1 + 1 + dc], out=window, casting='unsafe')
+
+        codes = s.codes
+        np.copyto(codes, src[1:-1, 1:-1], casting='unsafe')
+        np.multiply(codes, rule.base, out=codes)
+        np.add(codes, s.counts, out=codes, casting='unsafe')
+        flat = codes.ravel()
+        out = dst[1:-1, 1:-1]
+        np.copyto(out, np.take(rule.next, codes))
+        histogram = np.bincount(flat, minlength=len(rule.next))
+        ignited, burnt = int(histogram @ rule.ignites), int(histogram @ rule.burns_out)
+
+        # Cells whose code can take the alternative transition
+        if rng is None:
+            candidates = np.flatnonzero(np.take(rule.draws, flat))
+            random_vals = _rng().random(len(candidates), dtype=np.float32)
+            hits = candidates[random_vals < np.take(rule.prob, np.take(flat, candidates))]
+        else:
+            candidates = np.flatnonzero(np.take(rule.spread_draws, flat))
+            r, c = np.divmod(candidates, cols)
+            hits = candidates[rng.uniform(step, grid.offset + r, grid.col_offset + c) < np.take(rule.spread_prob, np.take(flat, candidates))]
+        changes = [self._apply(out, flat, hits)]
+        if rng is not None:
+            sr, sc = rng.spontaneous(step, grid.offset, grid.offset + rows, grid.col_offset + cols, col_start=grid.col_offset)
+            sr, sc = sr - grid.offset, sc - grid.col_offset
+            events = sr * cols + sc
+            event_codes = np.take(flat, events)
+            # A cell hit by both still makes one transition
+            fresh = np.take(rule.spontaneous, event_codes) & (out[sr, sc] == np.take(rule.next, event_codes))
+            changes.append(self._apply(out, flat, events[fresh]))
+        ignited += sum(c[0] for c in changes)
+        burnt += sum(c[1] for c in changes)
+
+        grid.swap()
+        if heavy_load:
+            heavy_wait(ignited + burnt)
+        return ignited, burnt
@@ -0,0 +1,165 @@
+import functools
+import multiprocessing as mp
+import numpy as np
+from multiprocessing import shared_memory
+from src.grid import Grid
+from src.mpi_comm import MPI
+from src.config import FUEL
+
+# Single-node backend with no MPI install: worker processes share two padded
+# global grids (front and back buffer), and each worker's strip, ghost rows
+# included, is a window of rows into them. A neighbour's edge row *is* this
+# strip's ghost row, so the halo exchange is a barrier and copies nothing.
+# Only engines that write the back buffer and swap (Engine.swaps) are safe here:
+# in-place kernels would change rows a neighbour is still reading.
+
+class SharedWorld:
+    # Created by the parent process and handed to every worker: the shared
+    # buffers plus the queues and barrier the collectives are built on
+
+    def __init__(self, size, rows, cols, ctx=mp):
+        self.size = size
+        self.shape = (rows + 2, cols + 2)
+        self.blocks = [shared_memory.SharedMemory(create=True, size=self.shape[0] * self.shape[1]) for _ in range(2)]
+        # Per-row balancer costs, written by the owning worker
+        self.cost_block = shared_memory.SharedMemory(create=True, size=rows * 8)
+        for block in self.blocks:
+            np.ndarray(self.shape, dtype=np.int8, buffer=block.buf).fill(FUEL)
+        self.inboxes = [ctx.Queue() for _ in range(size)]
+        self.barrier = ctx.Barrier(size)
+
+    def communicator(self, rank):
+        return SharedMemoryCommunicator(self, rank)
+
+    def close(self):
+        for block in self.blocks + [self.cost_block]:
+            block.close()
+            block.unlink()
+
+class SharedComm:
+    # The subset of the mpi4py communicator API the simulation uses outside the
+    # MPI-only paths: point-to-point pickled messages through per-rank queues, and
+    # collectives built on them. Ops are callables, as mpi4py's are.
+
+    def __init__(self, world, rank):
+        self.rank = rank
+        self.size = world.size
+        self.inboxes = world.inboxes
+        self.barrier = world.barrier
+        # Messages that arrived before anyone asked for them, by (source, tag)
+        self._pending = {}
+        # Collectives run in the same order on every rank, so a counter gives
+        # each one a tag of its own (negative, never clashing with user tags)
+        self._collectives = 0
+
+    def Get_rank(self):
+        return self.rank
+
+    def Get_size(self):
+        return self.size
+
+    def Barrier(self):
+        self.barrier.wait()
+
+    def send(self, obj, dest, tag=0):
+        self.inboxes[dest].put((self.rank, tag, obj))
+
+    def recv(self, source, tag=0):
+        waiting = self._pending.get((source, tag))
+        if waiting:
+            return waiting.pop(0)
+        while True:
+            src, t, obj = self.inboxes[self.rank].get()
+            if (src, t) == (source, tag):
+                return obj
+            self._pending.setdefault((src, t), []).append(obj)
+
+    def _tag(self):
+        self._collectives += 1
+        return -self._collectives
+
+    def gather(self, obj, root=0):
+        tag = self._tag()
+        if self.rank != root:
+            self.send(obj, root, tag)
+            return None
+        return [obj if r == root else self.recv(r, tag) for r in range(self.size)]
+
+    def bcast(self, obj, root=0):
+        tag = self._tag()
+        if self.rank == root:
+            for r in range(self.size):
+                if r != root:
+                    self.send(obj, r, tag)
+            return obj
+        return self.recv(root, tag)
+
+    def allgather(self, obj):
+        return self.bcast(self.gather(obj))
+
+    def reduce(self, obj, op=MPI.SUM, root=0):
+        values = self.gather(obj, root=root)
+        return functools.reduce(op, values) if values is not None else None
+
+    def allreduce(self, obj, op=MPI.SUM):
+        return self.bcast(self.reduce(obj, op=op))
+
+class SharedGrid(Grid):
+    # Grid whose front and back buffers are row windows of the shared global
+    # buffers; row migration is just moving the window (rebind)
+
+    def __init__(self, buffers, rows, cols, offset=0):
+        self._globals = list(buffers)
+        self.cols = cols
+        self.col_offset = 0
+        self.version = 0
+        self.rebind(offset, rows)
+
+    def rebind(self, offset, rows):
+        self.offset, self.rows = offset, rows
+        front, back = self._globals
+        self.padded = front[offset:offset + rows + 2]
+        self._back = back[offset:offset + rows + 2]
+        self.scratch = {}
+        self._bind()
+
+    def swap(self):
+        self._globals.reverse()
+        self.padded, self._back = self._back, self.padded
+        self._bind()
+
+    @property
+    def global_front(self):
+        return self._globals[0]
+
+class SharedMemoryCommunicator:
+    # Same interface as Communicator (rank/size/up/down, comm, ghost exchange,
+    # gather_grid) for workers attached to a SharedWorld
+
+    def __init__(self, world, rank):
+        self.world = world
+        self.comm = SharedComm(world, rank)
+        self.rank = rank
+        self.size = world.size
+        self.up = rank - 1 if rank > 0 else MPI.PROC_NULL
+        self.down = rank + 1 if rank < self.size - 1 else MPI.PROC_NULL
+        self.buffers = [np.ndarray(world.shape, dtype=np.int8, buffer=block.buf) for block in world.blocks]
+        self.costs = np.ndarray(world.shape[0] - 2, dtype=np.int64, buffer=world.cost_block.buf)
+
+    def make_grid(self, rows, cols, offset=0):
+        return SharedGrid(self.buffers, rows, cols, offset=offset)
+
+    def start_ghost_exchange(self, grid):
+        return []
+
+    def end_ghost_exchange(self, grid, requests):
+        # Every worker's last update is complete (and visible) once all arrive
+        if self.size > 1:
+            self.comm.Barrier()
+
+    def gather_grid(self, grid):
+        self.comm.Barrier()
+        full = grid.global_front[1:-1, 1:-1].copy() if self.rank == 0 else None
+        # Nobody writes the buffer again until rank 0 has its copy
+        self.comm.Barrier()
+        return full
@@ -0,0 +1,188 @@
+import io
+import struct
+import numpy as np
+from src.mpi_comm import MPI
+
+def npy_header(shape, dtype=np.int8, size=None):
+    # .npy v1.0 header for a C-ordered array; the data follows it directly. With
+    # size, padded with spaces to exactly that many bytes.
+    buf = io.BytesIO()
+    np.lib.format.write_array_header_1_0(buf, {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': tuple(shape)})
+    header = buf.getvalue()
+    if size is not None and size > len(header):
+        header = header[:-1] + b' ' * (size - len(header)) + b'\n'
+        header = header[:8] + struct.pack('<H', size - 10) + header[10:]
+    return header
+
+class SnapshotWriter:
+    # Collective MPI-IO writer for one preallocated .npy file shaped
+    # (snapshots, rows, cols): every rank writes its own strip or block straight
+    # to its global position, so no rank ever holds more than its local grid.
+    # Frame i holds step i * interval.
+
+    def __init__(self, comm, path, count, rows, cols, interval=1):
+        self.comm = comm
+        self.shape = (count, rows, cols)
+        self.interval = interval
+        header = npy_header(self.shape)
+        self.data_start = len(header)
+        self.fh = MPI.File.Open(comm, path, MPI.MODE_WRONLY | MPI.MODE_CREATE)
+        # Drop an earlier run's frames first: Set_size alone never shrinks the file
+        self.fh.Set_size(0)
+        self.fh.Set_size(self.data_start + count * rows * cols)
+        if comm.Get_rank() == 0:
+            self.fh.Write_at(0, np.frombuffer(header, dtype=np.uint8))
+
+    def write(self, step, grid):
+        _, rows, cols = self.shape
+        local = np.ascontiguousarray(grid.data, dtype=np.int8)
+        disp = self.data_start + step // self.interval * rows * cols
+        if local.size:
+            filetype = MPI.INT8_T.Create_subarray([rows, cols], list(local.shape), [grid.offset, grid.col_offset]).Commit()
+            self.fh.Set_view(disp, MPI.INT8_T, filetype)
+            self.fh.Write_all(local)
+            filetype.Free()
+        else:
+            # Still takes part in the collective calls
+            self.fh.Set_view(disp, MPI.INT8_T, MPI.INT8_T)
+            self.fh.Write_all(local)
+
+    def truncate(self, count):
+        # Collective: keep only the first count frames (e.g. after an early stop).
+        # The header is padded to its old length, so the data does not move.
+        _, rows, cols = self.shape
+        self.shape = (count, rows, cols)
+        self.fh.Set_size(self.data_start + count * rows * cols)
+        # Back to a plain byte view (collective) for the header write
+        self.fh.Set_view(0, MPI.BYTE, MPI.BYTE)
+        if self.comm.Get_rank() == 0:
+            self.fh.Write_at(0, np.frombuffer(npy_header(self.shape, size=self.data_start), dtype=np.uint8))
+
+    def close(self):
+        self.fh.Close()
+
+def load_snapshots(path):
+    # (snapshots, rows, cols) memory-mapped; frames are read from disk on access
+    return np.load(path, mmap_mode='r')
+
+# Delta format: a fixed header, then one record per saved step, then an index.
+# Every keyframe_every-th record is a full int8 frame (written like
+# SnapshotWriter); the others list only the cells that changed since the
+# previous record, as flat global indices followed by their new states. The
+# index maps each record to (step, kind, file offset, cell count), so any step
+# is rebuilt from its keyframe plus at most keyframe_every - 1 deltas.
+DELTA_MAGIC = b'WFDELTA1'
+DELTA_HEADER = np.dtype([('magic', 'S8'), ('rows', '<i8'), ('cols', '<i8'), ('keyframe_every', '<i8'),
+                         ('index_bytes', '<i8'), ('index_offset', '<i8'), ('records', '<i8')])
+DELTA_INDEX = np.dtype([('step', '<i8'), ('kind', '<i8'), ('offset', '<i8'), ('count', '<i8')])
+RECORD_KEYFRAME = 0
+RECORD_DELTA = 1
+
+class DeltaSnapshotWriter:
+
+    def __init__(self, comm, path, rows, cols, keyframe_every):
+        self.comm = comm
+        self.rank = comm.Get_rank()
+        self.rows, self.cols = rows, cols
+        self.keyframe_every = keyframe_every
+        self.index_dtype = np.dtype('<u4') if rows * cols < 2 ** 32 else np.dtype('<u8')
+        self.fh = MPI.File.Open(comm, path, MPI.MODE_WRONLY | MPI.MODE_CREATE)
+        self.fh.Set_size(0)
+        # Same on every rank: all writes are collective and advance it equally
+        self.pos = DELTA_HEADER.itemsize
+        self.index = []
+        self.prev = None
+
+    def _changes(self, grid, local):
+        # Global flat index and state of every local cell that differs from the
+        # last record; cells this rank did not own then (migrated in) count as changed
+        before = np.full(local.shape, -1, dtype=np.int8)
+        if self.prev is not None:
+            prev, r0, c0 = self.prev
+            rows = slice(max(r0, grid.offset), min(r0 + prev.shape[0], grid.offset + grid.rows))
+            cols = slice(max(c0, grid.col_offset), min(c0 + prev.shape[1], grid.col_offset + grid.cols))
+            if rows.start < rows.stop and cols.start < cols.stop:
+                before[rows.start - grid.offset:rows.stop - grid.offset, cols.start - grid.col_offset:cols.stop - grid.col_offset] = \
+                    prev[rows.start - r0:rows.stop - r0, cols.start - c0:cols.stop - c0]
+        r, c = np.nonzero(local != before)
+        flat = (grid.offset + r) * self.cols + grid.col_offset + c
+        return flat.astype(self.index_dtype), local[r, c]
+
+    def write(self, step, grid):
+        local = np.ascontiguousarray(grid.data, dtype=np.int8)
+        if len(self.index) % self.keyframe_every == 0:
+            if local.size:
+                filetype = MPI.INT8_T.Create_subarray([self.rows, self.cols], list(local.shape), [grid.offset, grid.col_offset]).Commit()
+                self.fh.Set_view(self.pos, MPI.INT8_T, filetype)
+                self.fh.Write_all(local)
+                filetype.Free()
+            else:
+                self.fh.Set_view(self.pos, MPI.INT8_T, MPI.INT8_T)
+                self.fh.Write_all(local)
+            self.fh.Set_view(0, MPI.BYTE, MPI.BYTE)
+            self.index.append((step, RECORD_KEYFRAME, self.pos, self.rows * self.cols))
+            self.pos += self.rows * self.cols
+        else:
+            flat, states = self._changes(grid, local)
+            before = self.comm.exscan(len(flat)) or 0
+            total = self.comm.allreduce(len(flat))
+            width = self.index_dtype.itemsize
+            self.fh.Write_at_all(self.pos + before * width, flat)
+            self.fh.Write_at_all(self.pos + total * width + before, states)
+            self.index.append((step, RECORD_DELTA, self.pos, total))
+            self.pos += total * (width + 1)
+        self.prev = (local, grid.offset, grid.col_offset)
+
+    def close(self):
+        if self.rank == 0:
+            index = np.array(self.index, dtype=DELTA_INDEX)
+            header = np.array([(DELTA_MAGIC, self.rows, self.cols, self.keyframe_every,
+                                self.index_dtype.itemsize, self.pos, len(index))], dtype=DELTA_HEADER)
+            self.fh.Write_at(self.pos, index.view(np.uint8))
+            self.fh.Write_at(0, header.view(np.uint8))
+        self.fh.Close()
+
+class DeltaSnapshotReader:
+    # Random access to the frames of a delta snapshot file. Sequential reads
+    # reuse the previously rebuilt frame, so replaying a run costs one delta
+    # per frame.
+
+    def __init__(self, path):
+        self.raw = np.memmap(path, dtype=np.uint8, mode='r')
+        header = self.raw[:DELTA_HEADER.itemsize].view(DELTA_HEADER)[0]
+        if header['magic'] != DELTA_MAGIC:
+            raise ValueError(f"{path} is not a delta snapshot file")
+        self.shape = (int(header['rows']), int(header['cols']))
+        self.index_dtype = np.dtype('<u4') if header['index_bytes'] == 4 else np.dtype('<u8')
+        start = int(header['index_offset'])
+        self.index = self.raw[start:start + int(header['records']) * DELTA_INDEX.itemsize].view(DELTA_INDEX)
+        self.steps = self.index['step']
+        self._position = {int(s): i for i, s in enumerate(self.steps)}
+        # Record number of the keyframe each record is rebuilt from
+        keyframes = np.flatnonzero(self.index['kind'] == RECORD_KEYFRAME)
+        self._keyframe = keyframes[np.searchsorted(keyframes, np.arange(len(self.index)), side='right') - 1]
+        self._cached = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        i = range(len(self))[i]
+        key = self._keyframe[i]
+        if self._cached is not None and self._keyframe[self._cached[0]] == key and self._cached[0] <= i:
+            start, frame = self._cached[0] + 1, self._cached[1]
+        else:
+            offset = int(self.index['offset'][key])
+            frame = self.raw[offset:offset + self.shape[0] * self.shape[1]].reshape(self.shape).view(np.int8).copy()
+            start = key + 1
+        flat_frame = frame.reshape(-1)
+        for j in range(start, i + 1):
+            offset, count = int(self.index['offset'][j]), int(self.index['count'][j])
+            width = self.index_dtype.itemsize
+            cells = self.raw[offset:offset + count * width].view(self.index_dtype)
+            flat_frame[cells] = self.raw[offset + count * width:offset + count * (width + 1)].view(np.int8)
+        self._cached = (i, frame)
+        return frame.copy()
+
+    def at_step(self, step):
+        return self[self._position[step]]
@@ -0,0 +1,158 @@
+import itertools
+import json
+import math
+import os
+import platform
+import socket
+import sys
+import time
+from contextlib import contextmanager
+import numpy as np
+
+class PhaseTimer:
+    # Accumulates wall-clock seconds per named phase of the main loop on one rank.
+    # With trace=True every phase is also kept as a (name, step, start, end) event,
+    # in seconds since start_clock(), for a Chrome trace of the run.
+
+    def __init__(self, trace=False):
+        self.totals = {}
+        self.events = [] if trace else None
+        # Step the next events belong to; set by the main loop
+        self.step = 0
+        self.origin = time.perf_counter()
+
+    def start_clock(self, comm):
+        # Ranks leave the barrier within microseconds of each other, so event
+        # times line up across ranks without synchronizing clocks
+        comm.Barrier()
+        self.origin = time.perf_counter()
+
+    def add(self, name, seconds):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.add(name, end - start)
+            if self.events is not None:
+                self.events.append((name, self.step, start - self.origin, end - self.origin))
+
+    def write_trace(self, comm, rank, path, metadata=None):
+        # Collective: rank 0 merges every rank's events into one trace file
+        all_events = comm.gather(self.events, root=0)
+        if rank != 0:
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(chrome_trace(all_events, metadata), f)
+
+    def report(self, comm, rank):
+        # Gathers every rank's totals and prints one row per rank on rank 0
+        all_totals = comm.gather(self.totals, root=0)
+        if rank != 0:
+            return
+        phases = []
+        for totals in all_totals:
+            phases += [p for p in totals if p not in phases]
+        print("Per-rank phase times (s):")
+        print("rank  " + "  ".join(f"{p:>12}" for p in phases))
+        for r, totals in enumerate(all_totals):
+            print(f"{r:>4}  " + "  ".join(f"{totals.get(p, 0.0):>12.4f}" for p in phases))
+
+def environment():
+    # Where a run happened, stored next to its timings so results from different
+    # machines or library versions are never compared blindly
+    env = {
+        'host': socket.gethostname(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+    }
+    # Imported here so scripts that only need the statistics below (and launch
+    # mpiexec themselves) do not initialize MPI
+    from src.mpi_comm import MPI
+    if hasattr(MPI, 'Get_library_version'):
+        import mpi4py
+        env['mpi4py'] = mpi4py.__version__
+        env['mpi'] = MPI.Get_library_version().strip('\x00 \n').splitlines()[0]
+        env['ranks'] = MPI.COMM_WORLD.Get_size()
+    return env
+
+def chrome_trace(all_events, metadata=None):
+    # Chrome/Perfetto trace: one process per rank holding its phases as complete
+    # ('X') events, each nested in a span covering that rank's whole step, so
+    # gaps between phases and ranks waiting on each other show up directly.
+    # Times are integer microseconds.
+    trace = []
+    for rank, events in enumerate(all_events):
+        trace.append({'name': 'process_name', 'ph': 'M', 'pid': rank, 'tid': 0, 'args': {'name': f'rank {rank}'}})
+        trace.append({'name': 'process_sort_index', 'ph': 'M', 'pid': rank, 'tid': 0, 'args': {'sort_index': rank}})
+        spans = {}
+        for name, step, start, end in events:
+            begin, finish = round(start * 1e6), round(end * 1e6)
+            trace.append({'name': name, 'cat': 'phase', 'ph': 'X', 'ts': begin, 'dur': finish - begin,
+                          'pid': rank, 'tid': 0, 'args': {'step': step}})
+            first, last = spans.get(step, (begin, finish))
+            spans[step] = (min(first, begin), max(last, finish))
+        for step, (begin, finish) in spans.items():
+            trace.append({'name': f'step {step}', 'cat': 'step', 'ph': 'X', 'ts': begin, 'dur': finish - begin,
+                          'pid': rank, 'tid': 0, 'args': {'step': step}})
+    return {'traceEvents': trace, 'displayTimeUnit': 'ms', 'otherData': metadata or {}}
+
+def summarize(trials, steps):
+    # Per-trial samples from the slowest rank, in ms per step: the whole loop
+    # ('step') and each phase. trials is a list of per-rank timing lists.
+    samples = {'step': [max(r['elapsed'] for r in t) / steps * 1000 for t in trials]}
+    phases = []
+    for t in trials:
+        for r in t:
+            phases += [p for p in r['phases'] if p not in phases]
+    for p in phases:
+        samples[p] = [max(r['phases'].get(p, 0.0) for r in t) / steps * 1000 for t in trials]
+    return {k: {'mean': float(np.mean(v)), 'std': float(np.std(v, ddof=1)) if len(v) > 1 else 0.0, 'samples': v}
+            for k, v in samples.items()}
+
+def permutation_pvalue(before, after, resamples=10000, seed=0):
+    # One-sided permutation test: how often relabelling the pooled trials gives a
+    # mean increase at least as large as the observed one. No normality
+    # assumption, which matters for the skewed timings of a handful of trials.
+    # Every relabelling is tried when there are at most resamples of them (so
+    # 3 + 3 trials can reach p = 1/20), a random sample of them otherwise.
+    before, after = np.asarray(before, dtype=float), np.asarray(after, dtype=float)
+    pooled = np.concatenate((before, after))
+    observed = after.mean() - before.mean()
+    if math.comb(len(pooled), len(after)) <= resamples:
+        picks = np.array(list(itertools.combinations(range(len(pooled)), len(after))))
+        chosen = np.zeros((len(picks), len(pooled)), dtype=bool)
+        np.put_along_axis(chosen, picks, True, axis=1)
+        extra = 0
+    else:
+        order = np.argsort(np.random.default_rng(seed).random((resamples, len(pooled))), axis=1)
+        chosen = order >= len(before)
+        extra = 1
+    diffs = (chosen @ pooled) / len(after) - (~chosen @ pooled) / len(before)
+    # The random sample counts the observed labelling once more, so p is never 0
+    return float((np.count_nonzero(diffs >= observed - 1e-12) + extra) / (len(diffs) + extra))
+
+def compare(baseline, current, alpha=0.05, min_change=0.05):
+    # (run, metric, baseline mean, current mean, relative change, p, regressed) for
+    # every metric both result sets have; a regression is a slowdown of at least
+    # min_change that is significant at alpha (p <= alpha)
+    rows = []
+    for name, run in current.items():
+        if name not in baseline:
+            continue
+        for metric, stats in run['summary'].items():
+            base = baseline[name]['summary'].get(metric)
+            if base is None or base['mean'] <= 0:
+                continue
+            change = stats['mean'] / base['mean'] - 1
+            p = permutation_pvalue(base['samples'], stats['samples'])
+            rows.append((name, metric, base['mean'], stats['mean'], change, p, change >= min_change and p <= alpha))
+    return rows
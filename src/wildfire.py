@@ -2,36 +2,36 @@ import numpy as np
 import time
 from src.config import FUEL, BURNING, BURNT, P_SPREAD, P_IGNITE
 
-def update_grid(grid_obj, heavy_load=False):
-    current_state = grid_obj.data_with_ghost
+# Ignition probability by number of burning neighbours (0-4), same rule as
+# update_grid: a fuel cell ignites if random < max(spread, ignite)
+IGNITION_LUT = np.maximum(1 - (1 - P_SPREAD) ** np.arange(5), P_IGNITE).astype(np.float32)
 
-    rows, cols = grid_obj.rows, grid_obj.cols
-    next_state = current_state[1:-1, :].copy()
-    
-    burning_mask = (current_state[1:-1, :] == BURNING)
-    next_state[burning_mask] = BURNT
-    
-    fuel_mask = (current_state[1:-1, :] == FUEL)
-    burning_neighbors = np.zeros((rows, cols), dtype=int)
-    
-    burning_neighbors += (current_state[0:-2, :] == BURNING).astype(int)
-    burning_neighbors += (current_state[2:, :] == BURNING).astype(int)
-    
-    inner = current_state[1:-1, :]
-    burning_neighbors[:, 1:] += (inner[:, :-1] == BURNING).astype(int)
-    burning_neighbors[:, :-1] += (inner[:, 1:] == BURNING).astype(int)
-    
-    random_vals = np.random.random((rows, cols))
-    ignition_prob = 1 - (1 - P_SPREAD) ** burning_neighbors
-    ignite_mask = (random_vals < ignition_prob) & fuel_mask
-    
-    # Spontaneous ignition
-    ignite_mask |= (random_vals < P_IGNITE) & fuel_mask
-import numpy as np
-import time
-from src.config import FUEL, BURNING, BURNT, P_SPREAD, P_IGNITE
+_kernel_rng = None
+
+def counter_ignitions(rng, step, row_offset, fuel_mask, counts, out, col_offset=0):
+    # Ignite mask under a CounterRNG for a block whose first cell is global
+    # (row_offset, col_offset): randoms only for fuel cells next to the fire,
+    # plus the spontaneous events that fall in the block
+    rows, cols = fuel_mask.shape
+    out.fill(False)
+    r, c = np.nonzero(fuel_mask & (counts > 0))
+    hits = rng.spread(step, row_offset + r, col_offset + c, counts[r, c])
+    out[r[hits], c[hits]] = True
+    sr, sc = rng.spontaneous(step, row_offset, row_offset + rows, col_offset + cols, col_start=col_offset)
+    out[sr - row_offset, sc - col_offset] = True
+    out &= fuel_mask
+    return out
+
+def heavy_wait(num_burning):
+    if num_burning > 0:
+        # Busy wait proportional to load
+        target = time.time() + (num_burning * 0.00005)
+        while time.time() < target:
+            pass
 
-def update_grid(grid_obj, heavy_load=False):
+def update_grid(grid_obj, heavy_load=False, rng=None, step=0, return_counts=False):
+    # Returns the next state of the local cells; with return_counts, also the
+    # (newly ignited, newly burnt) cell counts the masks give for free
     current_state = grid_obj.data_with_ghost
 
     rows, cols = grid_obj.rows, grid_obj.cols
@@ -49,22 +49,117 @@ def update_grid(grid_obj, heavy_load=False):
     inner = current_state[1:-1, :]
     burning_neighbors[:, 1:] += (inner[:, :-1] == BURNING).astype(int)
     burning_neighbors[:, :-1] += (inner[:, 1:] == BURNING).astype(int)
+
+    # Ghost columns (always FUEL unless the grid is split into 2D blocks)
+    burning_neighbors[:, 0] += (grid_obj.padded[1:-1, 0] == BURNING)
+    burning_neighbors[:, -1] += (grid_obj.padded[1:-1, -1] == BURNING)
     
-    random_vals = np.random.random((rows, cols))
-    ignition_prob = 1 - (1 - P_SPREAD) ** burning_neighbors
-    ignite_mask = (random_vals < ignition_prob) & fuel_mask
-    
-    # Spontaneous ignition
-    ignite_mask |= (random_vals < P_IGNITE) & fuel_mask
+    if rng is None:
+        random_vals = np.random.random((rows, cols))
+        ignition_prob = 1 - (1 - P_SPREAD) ** burning_neighbors
+        ignite_mask = (random_vals < ignition_prob) & fuel_mask
+        
+        # Spontaneous ignition
+        ignite_mask |= (random_vals < P_IGNITE) & fuel_mask
+    else:
+        ignite_mask = counter_ignitions(rng, step, grid_obj.offset, fuel_mask, burning_neighbors, np.empty((rows, cols), dtype=bool), col_offset=grid_obj.col_offset)
     
     next_state[ignite_mask] = BURNING
     
+    if heavy_load or return_counts:
+        ignited, burnt = int(np.count_nonzero(ignite_mask)), int(np.count_nonzero(burning_mask))
     if heavy_load:
-        num_burning = np.sum(burning_mask) + np.sum(ignite_mask)
-        if num_burning > 0:
-            # Busy wait proportional to load
-            target = time.time() + (num_burning * 0.00005) 
-            while time.time() < target:
-                pass
+        heavy_wait(burnt + ignited)
 
+    if return_counts:
+        return next_state, (ignited, burnt)
     return next_state
+
+def _rng():
+    # Generator that can fill preallocated buffers; seeded from the legacy global
+    # state so --seed still makes runs reproducible
+    global _kernel_rng
+    if _kernel_rng is None:
+        _kernel_rng = np.random.default_rng(np.random.randint(2**31))
+    return _kernel_rng
+
+def reset_kernel_rng():
+    # Start a new run: the next _rng() call seeds a fresh generator from the
+    # (just reseeded) legacy global state, so repeated runs in one process with
+    # the same --seed draw the same numbers
+    global _kernel_rng
+    _kernel_rng = None
+
+class _FusedScratch:
+    def __init__(self, rows, cols):
+        self.counts = np.zeros((rows, cols), dtype=np.uint8)
+        self.mask = np.zeros((rows, cols), dtype=bool)
+        self.fuel = np.zeros((rows, cols), dtype=bool)
+        self.ignite = np.zeros((rows, cols), dtype=bool)
+        n = rows * cols
+        self.fuel_counts = np.zeros(n, dtype=np.uint8)
+        self.random = np.zeros(n, dtype=np.float32)
+        self.prob = np.zeros(n, dtype=np.float32)
+        self.hits = np.zeros(n, dtype=bool)
+
+def fused_scratch(grid_obj):
+    s = grid_obj.scratch.get('fused')
+    if s is None:
+        s = grid_obj.scratch['fused'] = _FusedScratch(grid_obj.rows, grid_obj.cols)
+    return s
+
+def update_rows_fused(grid_obj, start, stop, rng=None, step=0, lut=IGNITION_LUT, gen=None):
+    # Writes the next state of local rows [start, stop) into the grid's back
+    # buffer and returns the (newly ignited, newly burnt) counts. Only rows 0 and
+    # rows - 1 read the ghost rows, so the rest can run during a 1D halo exchange
+    # (every row reads the ghost columns of a 2D block). Calls on disjoint row
+    # ranges touch disjoint scratch, so they can run on concurrent threads if each
+    # passes its own generator gen for the legacy RNG.
+    # Allocated even for an empty range: the caller swaps it in afterwards
+    dst = grid_obj.back_buffer()
+    if stop <= start:
+        return 0, 0
+    cols = grid_obj.cols
+    src = grid_obj.padded
+    s = fused_scratch(grid_obj)
+
+    inner = src[start + 1:stop + 1, 1:-1]
+    counts, mask = s.counts[start:stop], s.mask[start:stop]
+    fuel, ignite = s.fuel[start:stop], s.ignite[start:stop]
+    np.equal(src[start:stop, 1:-1], BURNING, out=mask)
+    np.copyto(counts, mask, casting='unsafe')
+    for neighbor in (src[start + 2:stop + 2, 1:-1], src[start + 1:stop + 1, :-2], src[start + 1:stop + 1, 2:]):
+        np.equal(neighbor, BURNING, out=mask)
+        np.add(counts, mask, out=counts, casting='unsafe')
+
+    out = dst[start + 1:stop + 1, 1:-1]
+    np.copyto(out, inner)
+    np.equal(inner, BURNING, out=mask)
+    np.copyto(out, BURNT, where=mask)
+    num_burning = np.count_nonzero(mask)
+
+    np.equal(inner, FUEL, out=fuel)
+    if rng is None:
+        n_fuel = np.count_nonzero(fuel)
+        flat = slice(start * cols, start * cols + n_fuel)
+        fuel_counts = np.compress(fuel.ravel(), counts.ravel(), out=s.fuel_counts[flat])
+        random_vals = (gen or _rng()).random(dtype=np.float32, out=s.random[flat])
+        prob = np.take(lut, fuel_counts, out=s.prob[flat])
+        hits = np.less(random_vals, prob, out=s.hits[flat])
+        ignite.fill(False)
+        np.place(ignite, fuel, hits)
+    else:
+        counter_ignitions(rng, step, grid_obj.offset + start, fuel, counts, ignite, col_offset=grid_obj.col_offset)
+    np.copyto(out, BURNING, where=ignite)
+
+    return int(np.count_nonzero(ignite)), int(num_burning)
+
+def update_grid_fused(grid_obj, heavy_load=False, rng=None, step=0, lut=IGNITION_LUT):
+    # Same model as update_grid, but reads the grid's padded front buffer, writes
+    # the next state into its back buffer and swaps; all temporaries are
+    # preallocated per grid shape and randoms are drawn for fuel cells only.
+    counts = update_rows_fused(grid_obj, 0, grid_obj.rows, rng=rng, step=step, lut=lut)
+    grid_obj.swap()
+    if heavy_load:
+        heavy_wait(sum(counts))
+    return counts
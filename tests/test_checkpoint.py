@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.checkpoint import Checkpointer, load_meta, restart_bounds, read_cells
+from src.grid import Grid
+from src.packed import PackedGrid
+from src.mpi_comm import MPI
+from src.config import BURNING, BURNT
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.info = {'rows': 8, 'cols': 70, 'seed': 1, 'rng': 'counter'}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def save(self, grid, step):
+        checkpointer = Checkpointer(MPI.COMM_SELF, self.tmp.name, self.info)
+        checkpointer.save(step, grid)
+        path = os.path.join(self.tmp.name, f"step_{step:06d}")
+        # Not published until the write completes
+        self.assertFalse(os.path.exists(os.path.join(path, "meta.json")))
+        checkpointer.complete()
+        return path
+
+    def test_round_trip(self):
+        for step, grid_cls in enumerate((Grid, PackedGrid)):
+            grid = grid_cls(8, 70)
+            grid.set_fire(2, 65)
+            grid.set_fire(5, 3)
+            data = grid.data.copy()
+            data[7, :10] = BURNT
+            grid.commit_updates(data)
+            path = self.save(grid, step)
+            meta = load_meta(path)
+            self.assertEqual((meta['step'], meta['ranks'], meta['bounds']), (step, 1, [0, 8]))
+            self.assertEqual(meta['rng'], 'counter')
+            np.testing.assert_array_equal(read_cells(path, 0, 8, 0, 70), data)
+            # Any other strip or block reads just its cells
+            np.testing.assert_array_equal(read_cells(path, 2, 4, 60, 10), data[2:6, 60:])
+
+    def test_restart_bounds(self):
+        grid = Grid(8, 70)
+        grid.data[6:, :] = BURNING
+        path = self.save(grid, 3)
+        meta = load_meta(path)
+        # Same rank count: the saved strips
+        np.testing.assert_array_equal(restart_bounds(path, meta, 1), [0, 8])
+        # New rank count: split evenly by the caller, or by the saved load
+        self.assertIsNone(restart_bounds(path, meta, 2))
+        np.testing.assert_array_equal(restart_bounds(path, meta, 2, balance=True), [0, 7, 8])
+        np.testing.assert_array_equal(restart_bounds(path, meta, 2, balance=True, min_rows=2), [0, 6, 8])
+
+    def test_incomplete_checkpoint(self):
+        with self.assertRaises(FileNotFoundError):
+            load_meta(self.tmp.name)
+
+if __name__ == '__main__':
+    unittest.main()
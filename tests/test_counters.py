@@ -0,0 +1,31 @@
+import unittest
+from src.counters import StepCounters
+from src.grid import Grid
+from src.rng import CounterRNG
+from src.wildfire import update_grid_fused
+from src.mpi_comm import MPI
+from src.config import BURNING, BURNT
+
+class TestStepCounters(unittest.TestCase):
+
+    def test_totals_match_grid(self):
+        grid = Grid(20, 30)
+        grid.set_fire(10, 15)
+        rng = CounterRNG(4)
+        counters = StepCounters(MPI.COMM_SELF, 20 * 30, burning=1)
+        for step in range(12):
+            counters.add(update_grid_fused(grid, rng=rng, step=step))
+            counters.complete()
+            # Only every third step is sent; burnt counts in between still add up
+            if step % 3 == 2:
+                counters.post(step)
+                self.assertEqual(counters.complete(), step)
+                self.assertEqual(counters.burning, grid.count_state(BURNING))
+                self.assertEqual(counters.burnt, grid.count_state(BURNT))
+        self.assertAlmostEqual(counters.burnt_fraction(), grid.count_state(BURNT) / 600)
+
+    def test_nothing_posted(self):
+        self.assertIsNone(StepCounters(MPI.COMM_SELF, 10).complete())
+
+if __name__ == '__main__':
+    unittest.main()
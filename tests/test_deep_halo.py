@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+from src.deep_halo import DeepHalo
+from src.grid import Grid
+from src.rng import CounterRNG
+from src.wildfire import update_grid_fused
+from src.frontier import FrontierEngine
+from src.rules import Rule, RuleEngine
+from src.config import BURNING, BURNT, RULES, VON_NEUMANN
+
+class StripNeighbours:
+    # In-process stand-in for Communicator.exchange_rows over a list of strips
+    def __init__(self, strips, index):
+        self.strips, self.index = strips, index
+
+    def exchange_rows(self, grid, depth):
+        up = self.strips[self.index - 1] if self.index > 0 else None
+        down = self.strips[self.index + 1] if self.index + 1 < len(self.strips) else None
+        return (up.data[-depth:].copy() if up is not None else None,
+                down.data[:depth].copy() if down is not None else None)
+
+def run(bounds, cols, steps, depth, step_fn, rng, restart_at=(), reach=1):
+    strips = [Grid(b - a, cols, offset=a) for a, b in zip(bounds[:-1], bounds[1:])]
+    for g in strips:
+        g.set_fire(bounds[-1] // 2 - g.offset, cols // 2)
+    halos = [DeepHalo(StripNeighbours(strips, i), depth, step_fn(), reach=reach) for i in range(len(strips))]
+    for step in range(steps):
+        for g, h in zip(strips, halos):
+            h.exchange(g)
+        for g, h in zip(strips, halos):
+            h.step(g, rng=rng, step=step)
+            if step in restart_at:
+                h.restart()
+    return np.vstack([g.data for g in strips])
+
+class TestDeepHalo(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = CounterRNG(6)
+        self.expected = run([0, 40], 23, 17, 1, lambda: update_grid_fused, self.rng)
+
+    def test_exact_for_any_depth(self):
+        for depth in (1, 2, 3, 5):
+            result = run([0, 9, 20, 31, 40], 23, 17, depth, lambda: update_grid_fused, self.rng)
+            np.testing.assert_array_equal(result, self.expected, err_msg=f"depth {depth}")
+
+    def test_restart_mid_cycle(self):
+        result = run([0, 9, 20, 31, 40], 23, 17, 4, lambda: update_grid_fused, self.rng, restart_at=(1, 6))
+        np.testing.assert_array_equal(result, self.expected)
+
+    def test_stateful_engine(self):
+        result = run([0, 13, 27, 40], 23, 17, 3, lambda: FrontierEngine().step, self.rng)
+        np.testing.assert_array_equal(result, self.expected)
+
+    def test_rule_reaching_two_rows(self):
+        # Borrows depth * 2 rows per cycle for a rule of radius 2
+        rule = Rule('wide', VON_NEUMANN + [(-2, 0), (2, 0)], [BURNING], RULES['wildfire']['transitions'])
+        expected = run([0, 40], 23, 17, 1, lambda: RuleEngine(rule).step, self.rng)
+        for depth in (1, 3):
+            result = run([0, 9, 20, 31, 40], 23, 17, depth, lambda: RuleEngine(rule).step, self.rng, reach=2)
+            np.testing.assert_array_equal(result, expected, err_msg=f"depth {depth}")
+
+    def test_counts_owned_rows(self):
+        grid = Grid(10, 12)
+        grid.set_fire(5, 6)
+        halo = DeepHalo(StripNeighbours([grid], 0), 2, update_grid_fused)
+        for step in range(4):
+            halo.exchange(grid)
+            burning, burnt = grid.count_state(BURNING), grid.count_state(BURNT)
+            ignited, burnt_now = halo.step(grid, rng=self.rng, step=step)
+            self.assertEqual((ignited, burnt_now), (grid.count_state(BURNING), burning))
+            self.assertEqual(grid.count_state(BURNT), burnt + burnt_now)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+from src.engines import ENGINES, Engine, register, get_engine
+from src.grid import Grid
+from src.packed import PackedGrid
+from src.rng import CounterRNG
+from src.numba_kernel import numba, stencil_kernel, update_grid_numba
+from src.wildfire import IGNITION_LUT, update_grid_fused
+from src.config import FUEL, BURNING, BURNT
+from tests.test_rng import run_strips, run_blocks
+
+class TestRegistry(unittest.TestCase):
+
+    def test_builtin_engines(self):
+        self.assertEqual(list(ENGINES)[:5], ['dense', 'fused', 'frontier', 'packed', 'numba'])
+        self.assertIs(ENGINES['packed'].grid_cls, PackedGrid)
+        self.assertIs(ENGINES['fused'].grid_cls, Grid)
+        self.assertEqual(ENGINES['numba'].available, numba is not None)
+
+    def test_unavailable_engine(self):
+        engine = register(Engine('missing', lambda: None, 'test', available=False))
+        try:
+            self.assertIs(ENGINES['missing'], engine)
+            with self.assertRaises(RuntimeError):
+                get_engine('missing')
+        finally:
+            del ENGINES['missing']
+
+    def test_build_gives_fresh_state(self):
+        frontier = ENGINES['frontier']
+        self.assertIsNot(frontier.build().__self__, frontier.build().__self__)
+
+    def test_steps_return_counts(self):
+        # Every engine reports (newly ignited, newly burnt); the numba kernel runs
+        # as plain Python when numba is missing
+        rng = CounterRNG(2)
+        for name, engine in ENGINES.items():
+            grid = engine.grid_cls(12, 70)
+            grid.set_fire(6, 30)
+            step_fn = engine.build()
+            for step in range(6):
+                burning = grid.count_state(BURNING)
+                burnt = grid.count_state(BURNT)
+                ignited, burnt_now = step_fn(grid, rng=rng, step=step)
+                self.assertEqual(ignited, grid.count_state(BURNING), name)
+                self.assertEqual(burnt_now, burning, name)
+                self.assertEqual(grid.count_state(BURNT), burnt + burnt_now, name)
+
+class TestStencilKernel(unittest.TestCase):
+    # Without Numba installed these run the same kernel as plain Python
+
+    def test_single_pass(self):
+        grid = Grid(3, 4)
+        grid.data[1, 1] = BURNING
+        grid.data[0, 3] = BURNT
+        grid.padded[1:-1, 0] = BURNING  # ghost column
+        counts = np.zeros((3, 4), dtype=np.uint8)
+        dst = np.full_like(grid.padded, FUEL)
+        self.assertEqual(tuple(stencil_kernel(grid.padded, dst, counts, IGNITION_LUT, False)), (0, 1))
+        self.assertEqual(dst[2, 2], BURNT)
+        self.assertEqual(dst[1, 4], BURNT)
+        np.testing.assert_array_equal(counts, [[1, 1, 0, 0], [2, 0, 1, 0], [1, 1, 0, 0]])
+
+    def test_matches_fused_under_counter_rng(self):
+        rng = CounterRNG(5)
+        fused = run_strips([0, 7, 16], 13, 6, update_grid_fused, rng=rng)
+        jit = run_strips([0, 7, 16], 13, 6, update_grid_numba, rng=rng)
+        np.testing.assert_array_equal(jit, fused)
+        blocks = run_blocks([0, 9, 16], [0, 5, 13], 6, update_grid_numba, rng=rng)
+        np.testing.assert_array_equal(blocks, fused)
+
+    def test_legacy_rng_spreads(self):
+        np.random.seed(0)
+        grid = Grid(20, 20)
+        grid.set_fire(10, 10)
+        for _ in range(5):
+            update_grid_numba(grid, rng=None)
+        self.assertGreater(grid.count_state(BURNT), 0)
+
+    def test_legacy_rng_reproducible(self):
+        runs = []
+        for _ in range(2):
+            np.random.seed(7)
+            grid = Grid(20, 20)
+            grid.set_fire(10, 10)
+            for _ in range(5):
+                update_grid_numba(grid, rng=None)
+            runs.append(grid.data.copy())
+        np.testing.assert_array_equal(runs[0], runs[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+from src.ensemble import Ensemble, EnsembleStats
+from src.grid import Grid
+from src.rng import CounterRNG
+from src.wildfire import update_grid_fused
+from src.config import FUEL, BURNING, BURNT
+
+ROWS, COLS, STEPS = 24, 18, 15
+
+def run(members, first_member, rng, steps=STEPS):
+    ensemble = Ensemble(members, ROWS, COLS, first_member=first_member)
+    ensemble.set_fire(ROWS // 2, COLS // 2)
+    for step in range(steps):
+        ensemble.step(rng=rng, step=step)
+    return ensemble
+
+class TestEnsemble(unittest.TestCase):
+
+    def test_member_zero_matches_single_run(self):
+        rng = CounterRNG(9)
+        grid = Grid(ROWS, COLS)
+        grid.set_fire(ROWS // 2, COLS // 2)
+        for step in range(STEPS):
+            update_grid_fused(grid, rng=rng, step=step)
+        np.testing.assert_array_equal(run(3, 0, rng).data[0], grid.data)
+
+    def test_member_seeds(self):
+        # Member m is the single run with seed + (m << 32)
+        grid = Grid(ROWS, COLS)
+        grid.set_fire(ROWS // 2, COLS // 2)
+        rng = CounterRNG(9 + (2 << 32))
+        for step in range(STEPS):
+            update_grid_fused(grid, rng=rng, step=step)
+        np.testing.assert_array_equal(run(1, 2, CounterRNG(9)).data[0], grid.data)
+
+    def test_split_across_ranks(self):
+        rng = CounterRNG(4)
+        whole = run(5, 0, rng).data
+        parts = np.concatenate([run(2, 0, rng).data, run(3, 2, rng).data])
+        np.testing.assert_array_equal(parts, whole)
+        self.assertFalse(np.array_equal(whole[0], whole[1]))
+
+    def test_legacy_rng(self):
+        np.random.seed(1)
+        ensemble = run(4, 0, None)
+        self.assertGreater(ensemble.count_state(BURNT), 4)
+        self.assertTrue(np.all(np.isin(ensemble.data, [FUEL, BURNING, BURNT])))
+
+    def test_arrival_histogram(self):
+        rng = CounterRNG(2)
+        ensemble = Ensemble(6, ROWS, COLS)
+        ensemble.set_fire(ROWS // 2, COLS // 2)
+        stats = EnsembleStats(ROWS, COLS, STEPS, 4)
+        stats.record(ensemble, 0)
+        for step in range(STEPS):
+            ensemble.step(rng=rng, step=step)
+            stats.record(ensemble, step + 1)
+        hist = stats.histogram()
+        self.assertEqual(hist.shape, (4, ROWS, COLS))
+        # Every member's initial fire lands in the first bin
+        self.assertEqual(hist[0, ROWS // 2, COLS // 2], 6)
+        # Each ignition is counted once: at the end, burnt + burning cells
+        burned = np.count_nonzero(ensemble.data != FUEL, axis=0)
+        np.testing.assert_array_equal(hist.sum(axis=0), burned)
+        np.testing.assert_array_equal(stats.bin_edges(), [0, 4, 8, 12, 16])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from unittest import mock
+import numpy as np
+from src.grid import Grid
+from src.wildfire import update_grid
+from src.frontier import FrontierEngine, sample_sparse
+from src.config import BURNING, BURNT
+
+class TestFrontier(unittest.TestCase):
+
+    def setUp(self):
+        self.grid = Grid(10, 10)
+        self.engine = FrontierEngine()
+
+    def test_burning_to_burnt(self):
+        self.grid.set_fire(5, 5)
+        self.engine.step(self.grid)
+        self.assertEqual(self.grid.data[5, 5], BURNT)
+        self.assertEqual(self.grid.data_with_ghost[6, 5], BURNT)
+
+    def test_propagation(self):
+        engine = FrontierEngine(p_spread=1.0, p_ignite=0.0)
+        self.grid.set_fire(5, 5)
+        engine.step(self.grid)
+        for r, c in [(4, 5), (6, 5), (5, 4), (5, 6)]:
+            self.assertEqual(self.grid.data[r, c], BURNING)
+        self.assertEqual(np.sum(self.grid.data == BURNING), 4)
+
+    def test_ghost_row_spreads(self):
+        engine = FrontierEngine(p_spread=1.0, p_ignite=0.0)
+        self.grid.data_with_ghost[0, 3] = BURNING
+        self.grid.data_with_ghost[-1, 7] = BURNING
+        engine.step(self.grid)
+        self.assertEqual(self.grid.data[0, 3], BURNING)
+        self.assertEqual(self.grid.data[-1, 7], BURNING)
+
+    def test_matches_dense_kernel(self):
+        engine = FrontierEngine(p_spread=1.0, p_ignite=0.0)
+        dense = Grid(10, 10)
+        for g in (self.grid, dense):
+            g.set_fire(2, 3)
+            g.data[6, 6] = BURNT
+            g.update_from_ghost()
+        with mock.patch('src.wildfire.P_SPREAD', 1.0), mock.patch('src.wildfire.P_IGNITE', 0.0):
+            for _ in range(6):
+                engine.step(self.grid)
+                dense.commit_updates(update_grid(dense))
+                np.testing.assert_array_equal(self.grid.data, dense.data)
+
+    def test_rebuilds_after_data_replaced(self):
+        engine = FrontierEngine(p_spread=1.0, p_ignite=0.0)
+        engine.step(self.grid)
+        data = self.grid.data.copy()
+        data[0, 0] = BURNING
+        self.grid.commit_updates(data)
+        engine.step(self.grid)
+        self.assertEqual(self.grid.data[0, 0], BURNT)
+        self.assertEqual(self.grid.data[1, 0], BURNING)
+
+    def test_sample_sparse(self):
+        picks = sample_sparse(100000, 0.01)
+        self.assertTrue(np.all(np.diff(picks) > 0))
+        self.assertTrue(0 <= picks.min() and picks.max() < 100000)
+        self.assertTrue(800 < len(picks) < 1200)
+        self.assertEqual(len(sample_sparse(100, 0.0)), 0)
+
+if __name__ == '__main__':
+    unittest.main()
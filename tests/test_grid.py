@@ -28,5 +28,60 @@ class TestGrid(unittest.TestCase):
         self.grid.commit_updates(new_data)
         self.assertTrue(np.all(self.grid.data == BURNT))
 
+    def test_column_migration(self):
+        grid = Grid(4, 6, offset=2, col_offset=10)
+        grid.data[:] = np.arange(6) % 3
+        taken = grid.take_cols(2, left=True)
+        self.assertEqual((grid.cols, grid.col_offset), (4, 12))
+        np.testing.assert_array_equal(taken, np.tile([FUEL, BURNING], (4, 1)))
+        grid.add_cols(taken, left=True)
+        self.assertEqual((grid.cols, grid.col_offset), (6, 10))
+        np.testing.assert_array_equal(grid.data, np.tile(np.arange(6) % 3, (4, 1)))
+        self.assertEqual(grid.take_cols(1, left=False).shape, (4, 1))
+        self.assertEqual(grid.data_with_ghost.shape, (6, 5))
+
+    def test_row_migration_moves_window(self):
+        grid = Grid(6, 4, offset=10)
+        grid.data[:] = np.arange(6)[:, None] % 3
+        grid.back_buffer()
+        store = grid._store
+        taken = grid.take_rows(2, top=True)
+        np.testing.assert_array_equal(taken, [[0] * 4, [1] * 4])
+        self.assertEqual((grid.rows, grid.offset), (4, 12))
+        grid.add_rows(np.full((3, 4), BURNT, dtype=np.int8), top=False)
+        grid.add_rows(taken, top=True)
+        self.assertEqual((grid.rows, grid.offset), (9, 10))
+        # Same storage, and fresh ghost rows and columns around the moved rows
+        self.assertIs(grid._store, store)
+        np.testing.assert_array_equal(grid.data[:, 0], [0, 1, 2, 0, 1, 2, 2, 2, 2])
+        self.assertTrue(np.all(grid.padded[[0, -1]] == FUEL))
+        self.assertTrue(np.all(grid.padded[:, [0, -1]] == FUEL))
+        self.assertEqual(grid.back_buffer().shape, grid.padded.shape)
+        grid.swap()
+        self.assertIs(grid._back_store, store)
+
+    def test_row_migration_reallocates_without_headroom(self):
+        grid = Grid(4, 3, offset=50)
+        grid.data[:] = BURNING
+        spare = grid._top
+        grid.add_rows(np.full((spare + 1, 3), BURNT, dtype=np.int8), top=True)
+        self.assertEqual((grid.rows, grid.offset), (spare + 5, 50 - spare - 1))
+        self.assertTrue(np.all(grid.data[:spare + 1] == BURNT))
+        self.assertTrue(np.all(grid.data[spare + 1:] == BURNING))
+        self.assertGreater(grid._top, 0)
+
+    def test_halo_columns(self):
+        self.grid.data[:, 0] = BURNING
+        self.grid.data[:, -1] = BURNT
+        stride = self.cols + 2
+        send_left, send_right, recv_left, recv_right = self.grid.halo_columns()
+        np.testing.assert_array_equal(send_left[::stride][:self.rows], BURNING)
+        np.testing.assert_array_equal(send_right[::stride][:self.rows], BURNT)
+        recv_left[::stride][:self.rows] = BURNT
+        recv_right[::stride][:self.rows] = BURNING
+        np.testing.assert_array_equal(self.grid.padded[1:-1, 0], BURNT)
+        np.testing.assert_array_equal(self.grid.padded[1:-1, -1], BURNING)
+        self.assertTrue(np.all(self.grid.padded[[0, -1], 0] == FUEL))
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from src.grid import Grid
-from src.load_balancer import LoadBalancer
+import numpy as np
+from src.load_balancer import LoadBalancer, LoadMeter, partition_rows
 from tests.mocks import MockComm, MPI
 
 class MockCommunicatorWrapper:
@@ -27,5 +28,86 @@ class TestLoadBalancer(unittest.TestCase):
         changed = self.balancer.redistribute(self.grid)
         self.assertFalse(changed)
 
+    def test_redistribute_global_no_mpi(self):
+        balancer = LoadBalancer(self.comm, mode='global')
+        self.assertFalse(balancer.redistribute(self.grid))
+
+    def test_row_costs(self):
+        self.grid.set_fire(2, 1)
+        self.grid.set_fire(2, 7)
+        costs = self.balancer.row_costs(self.grid)
+        self.assertEqual(costs[2], 3)
+        self.assertEqual(costs.sum(), 12)
+
+    def test_balance_records_stats(self):
+        self.assertFalse(self.balancer.balance(self.grid))
+        self.assertEqual(self.balancer.stats['checks'], 1)
+        self.assertEqual(self.balancer.stats['fired'], 1)
+
+    def test_trigger_without_check_does_nothing(self):
+        balancer = LoadBalancer(self.comm, trigger=1.5)
+        balancer.post_check(self.grid)
+        self.assertFalse(balancer.balance(self.grid))
+        self.assertEqual(balancer.stats['fired'], 0)
+
+class TestLoadMeter(unittest.TestCase):
+
+    def setUp(self):
+        self.grid = Grid(4, 10, offset=20)
+        self.meter = LoadMeter(window=1)
+
+    def test_bands_and_steps(self):
+        for _ in range(2):
+            self.meter.record(self.grid, 0.2, 0, 2)
+            self.meter.record(self.grid, 0.4, 2, 4)
+        self.meter.update(self.grid)
+        np.testing.assert_allclose(self.meter.row_costs(self.grid), [0.1, 0.1, 0.2, 0.2])
+
+    def test_smoothing(self):
+        meter = LoadMeter(window=3)
+        meter.record(self.grid, 0.4)
+        meter.update(self.grid)
+        meter.record(self.grid, 0.8)
+        meter.update(self.grid)
+        np.testing.assert_allclose(meter.row_costs(self.grid), [0.15] * 4)
+
+    def test_rows_follow_migration(self):
+        self.meter.record(self.grid, 0.3, 0, 1)
+        self.meter.record(self.grid, 0.0, 1, 4)
+        self.meter.update(self.grid)
+        self.grid.take_rows(1, top=True)
+        self.grid.add_rows(self.grid.empty_rows(1), top=False)
+        np.testing.assert_allclose(self.meter.row_costs(self.grid), [0, 0, 0, 0.3 / 4])
+
+    def test_time_metric(self):
+        balancer = LoadBalancer(MockCommunicatorWrapper(), meter=self.meter)
+        self.assertEqual(balancer.check_imbalance(self.grid), 0)
+        self.meter.record(self.grid, 2e-6)
+        self.meter.update(self.grid)
+        self.assertAlmostEqual(balancer.check_imbalance(self.grid), 2e-6)
+        np.testing.assert_array_equal(balancer.row_costs(self.grid), [500] * 4)
+        self.assertTrue(balancer._exceeds(1.2, 1.0))
+        self.assertFalse(balancer._exceeds(1.05, 1.0))
+
+class TestPartitionRows(unittest.TestCase):
+
+    def test_uniform_costs(self):
+        np.testing.assert_array_equal(partition_rows(np.ones(12, dtype=int), 4), [0, 3, 6, 9, 12])
+
+    def test_hot_spot_is_split(self):
+        costs = np.ones(40, dtype=int)
+        costs[:5] = 30
+        bounds = partition_rows(costs, 4)
+        loads = [costs[a:b].sum() for a, b in zip(bounds[:-1], bounds[1:])]
+        self.assertLessEqual(max(loads) - costs.sum() / 4, costs.max())
+        self.assertEqual(bounds[0], 0)
+        self.assertEqual(bounds[-1], 40)
+
+    def test_min_rows(self):
+        costs = np.zeros(10, dtype=int)
+        costs[-1] = 1000
+        bounds = partition_rows(costs, 4, min_rows=2)
+        self.assertTrue(np.all(np.diff(bounds) >= 2))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import numpy as np
+from src.grid import Grid
+from src.packed import PackedGrid, update_packed, pack_rows, unpack_rows, bernoulli_words, popcount
+from src.frontier import FrontierEngine
+from src.config import FUEL, BURNING, BURNT
+
+class TestPacked(unittest.TestCase):
+
+    def setUp(self):
+        self.grid = PackedGrid(10, 70)
+
+    def test_pack_roundtrip(self):
+        states = np.random.randint(0, 3, size=(5, 130)).astype(np.int8)
+        words = pack_rows(states, 3)
+        self.assertEqual(words.shape, (5, 2, 3))
+        np.testing.assert_array_equal(unpack_rows(words, 130), states)
+
+    def test_wire_rows_are_smaller(self):
+        grid = Grid(4, 1024)
+        packed = PackedGrid(4, 1024)
+        self.assertEqual(grid.empty_rows(1).nbytes, 4 * packed.empty_rows(1).nbytes)
+
+    def test_set_fire_and_count(self):
+        self.grid.set_fire(5, 65)
+        self.assertEqual(self.grid.data[5, 65], BURNING)
+        self.assertEqual(self.grid.count_state(BURNING), 1)
+        self.assertEqual(self.grid.count_state(FUEL), 10 * 70 - 1)
+
+    def test_burning_to_burnt(self):
+        self.grid.set_fire(5, 5)
+        update_packed(self.grid)
+        self.assertEqual(self.grid.data[5, 5], BURNT)
+
+    def test_propagation_across_words(self):
+        self.grid.set_fire(5, 63)
+        update_packed(self.grid, p_spread=1.0, p_ignite=0.0)
+        data = self.grid.data
+        for r, c in [(4, 63), (6, 63), (5, 62), (5, 64)]:
+            self.assertEqual(data[r, c], BURNING)
+        self.assertEqual(self.grid.count_state(BURNING), 4)
+
+    def test_no_spread_past_last_column(self):
+        self.grid.set_fire(0, 69)
+        update_packed(self.grid, p_spread=1.0, p_ignite=0.0)
+        self.assertEqual(self.grid.count_state(BURNING), 2)
+        self.assertEqual(popcount(self.grid.words[:, :, -1] & ~self.grid.col_mask[-1]), 0)
+
+    def test_matches_frontier_engine(self):
+        grid = Grid(10, 70)
+        engine = FrontierEngine(p_spread=1.0, p_ignite=0.0)
+        for g in (self.grid, grid):
+            g.set_fire(2, 3)
+            g.set_fire(8, 64)
+        grid.set_ghost_rows(top=np.full(70, BURNING, dtype=np.int8))
+        self.grid.set_ghost_rows(top=pack_rows(np.full((1, 70), BURNING, dtype=np.int8), 2)[0])
+        for _ in range(5):
+            update_packed(self.grid, p_spread=1.0, p_ignite=0.0)
+            engine.step(grid)
+            np.testing.assert_array_equal(self.grid.data, grid.data)
+
+    def test_take_and_add_rows(self):
+        self.grid.set_fire(0, 1)
+        self.grid.set_fire(9, 2)
+        top = self.grid.take_rows(1, top=True)
+        bottom = self.grid.take_rows(1, top=False)
+        self.assertEqual(self.grid.rows, 8)
+        self.assertEqual(self.grid.count_state(BURNING), 0)
+        self.grid.add_rows(bottom, top=True)
+        self.grid.add_rows(top, top=False)
+        self.assertEqual(self.grid.data[0, 2], BURNING)
+        self.assertEqual(self.grid.data[-1, 1], BURNING)
+
+    def test_row_migration_moves_window(self):
+        store = self.grid._store
+        self.grid.set_fire(3, 65)
+        taken = self.grid.take_rows(2, top=True)
+        self.grid.add_rows(self.grid.empty_rows(3), top=False)
+        self.grid.add_rows(taken, top=True)
+        self.assertEqual((self.grid.rows, self.grid.offset), (13, 0))
+        self.assertIs(self.grid._store, store)
+        self.assertEqual(self.grid.data[3, 65], BURNING)
+        self.assertEqual(popcount(self.grid.words[[0, -1]]), 0)
+        # Past the headroom the store is reallocated, keeping the rows
+        self.grid.add_rows(self.grid.empty_rows(self.grid._top + 1), top=True)
+        self.assertIsNot(self.grid._store, store)
+        self.assertEqual(self.grid.offset, -self.grid.rows + 13)
+        self.assertEqual(self.grid.count_state(BURNING), 1)
+
+    def test_bernoulli_words(self):
+        ones = popcount(bernoulli_words(0.25, 1000))
+        self.assertTrue(0.22 < ones / 64000 < 0.28)
+        self.assertEqual(popcount(bernoulli_words(0.0, 10)), 0)
+        self.assertEqual(popcount(bernoulli_words(1.0, 10)), 640)
+
+class TestGridWireFormat(unittest.TestCase):
+
+    def test_take_and_add_rows(self):
+        grid = Grid(6, 4)
+        grid.set_fire(5, 1)
+        rows = grid.take_rows(2, top=False)
+        self.assertEqual(grid.rows, 4)
+        self.assertEqual(grid.data_with_ghost.shape, (6, 4))
+        grid.add_rows(rows, top=True)
+        self.assertEqual(grid.data[1, 1], BURNING)
+        self.assertEqual(grid.data_with_ghost[2, 1], BURNING)
+
+if __name__ == '__main__':
+    unittest.main()
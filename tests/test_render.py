@@ -0,0 +1,71 @@
+import unittest
+import os
+import sys
+import struct
+import tempfile
+import zlib
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.render import PALETTE, scale_for, downsample, to_rgb, write_png
+from src.config import FUEL, BURNING, BURNT, COLOR_MAP
+
+def read_png(path):
+    # Minimal decoder for the unfiltered truecolour files write_png produces
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    pos, chunks = 8, {}
+    while pos < len(data):
+        length, = struct.unpack('>I', data[pos:pos + 4])
+        chunks[data[pos + 4:pos + 8]] = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+    width, height = struct.unpack('>II', chunks[b'IHDR'][:8])
+    raw = np.frombuffer(zlib.decompress(chunks[b'IDAT']), dtype=np.uint8).reshape(height, -1)
+    return raw[:, 1:].reshape(height, width, 3)
+
+class TestRender(unittest.TestCase):
+
+    def test_palette_matches_color_map(self):
+        for state, rgb in COLOR_MAP.items():
+            np.testing.assert_array_equal(PALETTE[state], np.array(rgb) * 255)
+
+    def test_scale_for(self):
+        self.assertEqual(scale_for((100, 100), 1000), 10)
+        self.assertEqual(scale_for((2000, 300), 1000), -2)
+        self.assertEqual(scale_for((2001, 300), 1000), -3)
+
+    def test_downsample_keeps_burning_cells(self):
+        frame = np.full((7, 5), FUEL, dtype=np.int8)
+        frame[0, 0] = BURNT
+        frame[1, 1] = BURNING
+        frame[6, 4] = BURNT
+        small = downsample(frame, 2)
+        self.assertEqual(small.shape, (4, 3))
+        self.assertEqual(small[0, 0], BURNING)
+        self.assertEqual(small[3, 2], BURNT)
+        self.assertEqual((small == FUEL).sum(), 10)
+
+    def test_downsample_in_bands(self):
+        from src import render
+        frame = np.random.default_rng(0).integers(0, 3, (50, 9)).astype(np.int8)
+        expected = downsample(frame, 3)
+        old, render.BAND_ROWS = render.BAND_ROWS, 7
+        try:
+            np.testing.assert_array_equal(downsample(frame, 3), expected)
+        finally:
+            render.BAND_ROWS = old
+
+    def test_png_round_trip(self):
+        frame = np.array([[FUEL, BURNING, BURNT], [BURNT, FUEL, BURNING]], dtype=np.int8)
+        rgb = to_rgb(frame, 2)
+        self.assertEqual(rgb.shape, (4, 6, 3))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'frame.png')
+            write_png(path, rgb)
+            np.testing.assert_array_equal(read_png(path), rgb)
+        np.testing.assert_array_equal(rgb[1, 3], [255, 0, 0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import numpy as np
+from src.grid import Grid
+from src.rng import CounterRNG, philox4x32, spread_table
+from src.wildfire import update_grid, update_grid_fused
+from src.frontier import FrontierEngine
+from src.packed import PackedGrid, update_packed
+from src.config import BURNING
+
+def run_strips(bounds, cols, steps, step_fn, grid_cls=Grid, rng=None):
+    # Advance a grid split into strips at the given row bounds, exchanging ghost
+    # rows in-process, and return the assembled global state
+    strips = [grid_cls(b - a, cols, offset=a) for a, b in zip(bounds[:-1], bounds[1:])]
+    for g in strips:
+        g.set_fire(bounds[-1] // 2 - g.offset, cols // 2)
+    for step in range(steps):
+        for i, g in enumerate(strips):
+            g.set_ghost_rows(
+                top=strips[i - 1].export_rows(strips[i - 1].rows - 1, strips[i - 1].rows)[0] if i > 0 else None,
+                bottom=strips[i + 1].export_rows(0, 1)[0] if i + 1 < len(strips) else None)
+        for g in strips:
+            step_fn(g, rng=rng, step=step)
+    return np.vstack([g.data for g in strips])
+
+def run_blocks(row_bounds, col_bounds, steps, step_fn, rng=None):
+    # Same as run_strips for a 2D block partition, exchanging ghost rows and
+    # ghost columns in-process
+    rows, cols = row_bounds[-1], col_bounds[-1]
+    blocks = [[Grid(r1 - r0, c1 - c0, offset=r0, col_offset=c0) for c0, c1 in zip(col_bounds[:-1], col_bounds[1:])]
+              for r0, r1 in zip(row_bounds[:-1], row_bounds[1:])]
+    for g in (g for band in blocks for g in band):
+        g.set_fire(rows // 2 - g.offset, cols // 2 - g.col_offset)
+    for step in range(steps):
+        state = np.zeros((rows + 2, cols + 2), dtype=np.int8)
+        for g in (g for band in blocks for g in band):
+            state[g.offset + 1:g.offset + 1 + g.rows, g.col_offset + 1:g.col_offset + 1 + g.cols] = g.data
+        for g in (g for band in blocks for g in band):
+            r, c = g.offset, g.col_offset
+            g.padded[[0, -1], 1:-1] = state[[r, r + g.rows + 1], c + 1:c + 1 + g.cols]
+            g.padded[1:-1, [0, -1]] = state[r + 1:r + 1 + g.rows, [c, c + g.cols + 1]]
+        for g in (g for band in blocks for g in band):
+            step_fn(g, rng=rng, step=step)
+    return np.vstack([np.hstack([g.data for g in band]) for band in blocks])
+
+def dense_step(grid, rng=None, step=0):
+    grid.commit_updates(update_grid(grid, rng=rng, step=step))
+
+class TestPhilox(unittest.TestCase):
+
+    def test_known_answers(self):
+        # Random123 philox4x32_10 known-answer vectors
+        out = philox4x32(0, 0, 0, 0, 0, 0)
+        self.assertEqual([int(x) for x in out], [0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8])
+        out = philox4x32(0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344, 0xa4093822, 0x299f31d0)
+        self.assertEqual([int(x) for x in out], [0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1])
+
+    def test_spread_table(self):
+        np.testing.assert_allclose(spread_table(0.5), [0, 0.5, 0.75, 0.875, 0.9375])
+
+class TestCounterRNG(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = CounterRNG(seed=42)
+
+    def test_uniform_depends_only_on_coordinates(self):
+        rows, cols = np.meshgrid(np.arange(20), np.arange(30), indexing='ij')
+        full = self.rng.uniform(3, rows, cols)
+        self.assertEqual(self.rng.uniform(3, 7, 11), full[7, 11])
+        self.assertTrue(np.all((full >= 0) & (full < 1)))
+        self.assertFalse(np.array_equal(full, self.rng.uniform(4, rows, cols)))
+        self.assertFalse(np.array_equal(full, CounterRNG(seed=43).uniform(3, rows, cols)))
+
+    def test_spontaneous_independent_of_row_split(self):
+        rows, cols = self.rng.spontaneous(5, 0, 400, 500)
+        self.assertTrue(np.all((cols >= 0) & (cols < 500)))
+        self.assertTrue(0.008 < len(rows) / (400 * 500) < 0.012)
+        full = set(zip(rows.tolist(), cols.tolist()))
+        parts = set()
+        for a, b in [(0, 13), (13, 250), (250, 400)]:
+            r, c = self.rng.spontaneous(5, a, b, 500)
+            parts |= set(zip(r.tolist(), c.tolist()))
+        self.assertEqual(full, parts)
+
+    def test_spontaneous_independent_of_col_split(self):
+        rows, cols = self.rng.spontaneous(5, 0, 50, 500)
+        full = set(zip(rows.tolist(), cols.tolist()))
+        parts = set()
+        for a, b in [(0, 7), (7, 333), (333, 500)]:
+            r, c = self.rng.spontaneous(5, 0, 50, b, col_start=a)
+            self.assertTrue(np.all((c >= a) & (c < b)))
+            parts |= set(zip(r.tolist(), c.tolist()))
+        self.assertEqual(full, parts)
+
+    def test_engines_match_on_blocks(self):
+        expected = run_strips([0, 30], 40, 12, dense_step, rng=self.rng)
+        for step_fn in (dense_step, update_grid_fused, FrontierEngine().step):
+            np.testing.assert_array_equal(run_blocks([0, 11, 30], [0, 19, 23, 40], 12, step_fn, rng=self.rng), expected)
+
+    def test_engines_match_across_decompositions(self):
+        expected = run_strips([0, 30], 40, 12, dense_step, rng=self.rng)
+        self.assertGreater(np.count_nonzero(expected == BURNING), 0)
+        for bounds in ([0, 11, 30], [0, 5, 17, 30]):
+            np.testing.assert_array_equal(run_strips(bounds, 40, 12, dense_step, rng=self.rng), expected)
+            np.testing.assert_array_equal(run_strips(bounds, 40, 12, update_grid_fused, rng=self.rng), expected)
+            np.testing.assert_array_equal(run_strips(bounds, 40, 12, FrontierEngine().step, rng=self.rng), expected)
+            np.testing.assert_array_equal(run_strips(bounds, 40, 12, update_packed, grid_cls=PackedGrid, rng=self.rng), expected)
+
+if __name__ == '__main__':
+    unittest.main()
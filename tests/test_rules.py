@@ -0,0 +1,93 @@
+import unittest
+import numpy as np
+from src import wildfire
+from src.rules import Rule, RuleEngine, make_rule
+from src.grid import Grid
+from src.rng import CounterRNG
+from src.wildfire import update_grid_fused
+from src.config import FUEL, BURNING, BURNT, SMOULDERING, VON_NEUMANN
+from tests.test_rng import run_strips, run_blocks
+
+def lut_step(name):
+    return RuleEngine(make_rule(name)).step
+
+class TestRule(unittest.TestCase):
+
+    def test_derived_neighbourhood(self):
+        wildfire_rule, moore = make_rule('wildfire'), make_rule('moore')
+        self.assertEqual((wildfire_rule.radius, wildfire_rule.diagonal, wildfire_rule.base), (1, False, 5))
+        self.assertEqual((moore.radius, moore.diagonal, moore.base), (1, True, 9))
+        self.assertEqual(make_rule('smoulder').burning_states, (BURNING, SMOULDERING))
+
+    def test_tables(self):
+        rule = make_rule('wildfire')
+        # Codes are state * 5 + burning neighbours
+        np.testing.assert_array_equal(rule.next, [FUEL] * 5 + [BURNT] * 5 + [BURNT] * 5)
+        np.testing.assert_array_equal(rule.prob[:5], wildfire.IGNITION_LUT)
+        self.assertTrue(np.all(rule.prob[5:] == 0))
+        np.testing.assert_array_equal(rule.burns_out[5:10], 1)
+        np.testing.assert_array_equal(rule.alt_ignites[:5], 1)
+
+    def test_invalid_rules(self):
+        with self.assertRaises(ValueError):
+            make_rule('nonexistent')
+        with self.assertRaises(ValueError):
+            # State 1 has no transition
+            Rule('gap', VON_NEUMANN, [2], {0: {'next': 0}, 2: {'next': 0}})
+
+class TestRuleEngine(unittest.TestCase):
+
+    def test_wildfire_matches_fixed_kernel(self):
+        rng = CounterRNG(8)
+        expected = run_strips([0, 40], 31, 15, update_grid_fused, rng=rng)
+        np.testing.assert_array_equal(run_strips([0, 40], 31, 15, lut_step('wildfire'), rng=rng), expected)
+        # Same draws as the fused kernel under the legacy RNG too
+        states = []
+        for step_fn in (update_grid_fused, lut_step('wildfire')):
+            np.random.seed(4)
+            wildfire.reset_kernel_rng()
+            grid = Grid(30, 30)
+            grid.set_fire(15, 15)
+            counts = [step_fn(grid) for _ in range(10)]
+            states.append((grid.data.copy(), counts))
+        np.testing.assert_array_equal(states[0][0], states[1][0])
+        self.assertEqual(states[0][1], states[1][1])
+
+    def test_independent_of_decomposition(self):
+        rng = CounterRNG(3)
+        for name in ('moore', 'smoulder'):
+            expected = run_strips([0, 40], 31, 12, lut_step(name), rng=rng)
+            np.testing.assert_array_equal(run_strips([0, 9, 25, 40], 31, 12, lut_step(name), rng=rng), expected, name)
+        expected = run_strips([0, 40], 31, 12, lut_step('smoulder'), rng=rng)
+        np.testing.assert_array_equal(run_blocks([0, 17, 40], [0, 12, 31], 12, lut_step('smoulder'), rng=rng), expected)
+
+    def test_counts_track_burning_over_several_steps(self):
+        rule = make_rule('smoulder')
+        step_fn = RuleEngine(rule).step
+        rng = CounterRNG(1)
+        grid = Grid(40, 40)
+        grid.set_fire(20, 20)
+        burning, burnt = 1, 0
+        for step in range(15):
+            ignited, burnt_now = step_fn(grid, rng=rng, step=step)
+            burning, burnt = burning + ignited - burnt_now, burnt + burnt_now
+            self.assertEqual(burning, rule.count_burning(grid.data))
+            self.assertEqual(burnt, grid.count_state(BURNT))
+        self.assertGreater(grid.count_state(SMOULDERING), 0)
+
+    def test_distant_neighbours(self):
+        # Fire jumps two rows up and down, never sideways
+        rule = Rule('jump', [(-2, 0), (2, 0)], [BURNING], {
+            FUEL: {'next': FUEL, 'ignite': BURNING, 'spread': 1.0},
+            BURNING: {'next': BURNT},
+            BURNT: {'next': BURNT},
+        })
+        self.assertEqual((rule.radius, rule.diagonal), (2, False))
+        grid = Grid(7, 5)
+        grid.set_fire(3, 2)
+        RuleEngine(rule).step(grid, rng=CounterRNG(0))
+        self.assertEqual(set(zip(*np.nonzero(grid.data == BURNING))), {(1, 2), (5, 2)})
+        self.assertEqual(grid.data[3, 2], BURNT)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import multiprocessing as mp
+import numpy as np
+from src.grid import Grid
+from src.rng import CounterRNG
+from src.shm_comm import SharedWorld
+from src.load_balancer import SharedLoadBalancer
+from src.wildfire import update_grid_fused
+from src.config import BURNING
+
+ROWS, COLS, STEPS = 30, 20, 12
+
+def worker(world, rank, results):
+    comm_obj = world.communicator(rank)
+    comm = comm_obj.comm
+    # Collectives, and point-to-point messages received out of order
+    sums = comm.allreduce(rank + 1)
+    gathered = comm.allgather(rank)
+    if rank == 1:
+        comm.send('first', dest=0, tag=5)
+        comm.send('second', dest=0, tag=6)
+    if rank == 0:
+        out_of_order = (comm.recv(source=1, tag=6), comm.recv(source=1, tag=5))
+
+    # All the fire starts in rank 0's strip, so the balancer has work to do
+    bounds = np.linspace(0, ROWS, world.size + 1).astype(int)
+    grid = comm_obj.make_grid(bounds[rank + 1] - bounds[rank], COLS, offset=bounds[rank])
+    grid.set_fire(2 - grid.offset, COLS // 2)
+    balancer = SharedLoadBalancer(comm_obj)
+    rng = CounterRNG(3)
+    moved = False
+    for step in range(STEPS):
+        comm_obj.end_ghost_exchange(grid, comm_obj.start_ghost_exchange(grid))
+        update_grid_fused(grid, rng=rng, step=step)
+        if step % 2 == 0:
+            moved |= balancer.redistribute(grid)
+    full = comm_obj.gather_grid(grid)
+    strips = comm.gather((grid.offset, grid.rows))
+    moved = comm.allreduce(moved, op=max)
+    if rank == 0:
+        results.put((sums, gathered, out_of_order, strips, moved, full))
+
+class TestSharedMemoryBackend(unittest.TestCase):
+
+    def test_matches_single_grid(self):
+        ctx = mp.get_context('spawn')
+        world = SharedWorld(3, ROWS, COLS, ctx=ctx)
+        results = ctx.Queue()
+        workers = [ctx.Process(target=worker, args=(world, r, results)) for r in range(3)]
+        try:
+            for w in workers:
+                w.start()
+            sums, gathered, out_of_order, strips, moved, full = results.get(timeout=60)
+            for w in workers:
+                w.join()
+        finally:
+            world.close()
+        self.assertEqual(sums, 6)
+        self.assertEqual(gathered, [0, 1, 2])
+        self.assertEqual(out_of_order, ('second', 'first'))
+        self.assertTrue(moved)
+        self.assertEqual([o for o, _ in strips], [0, strips[0][1], strips[0][1] + strips[1][1]])
+        self.assertEqual(sum(r for _, r in strips), ROWS)
+
+        grid = Grid(ROWS, COLS)
+        grid.set_fire(2, COLS // 2)
+        rng = CounterRNG(3)
+        for step in range(STEPS):
+            update_grid_fused(grid, rng=rng, step=step)
+        np.testing.assert_array_equal(full, grid.data)
+        self.assertGreater(np.count_nonzero(full == BURNING), 0)
+
+if __name__ == '__main__':
+    unittest.main()
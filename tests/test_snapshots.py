@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.grid import Grid
+from src.packed import PackedGrid
+from src.snapshots import SnapshotWriter, load_snapshots, npy_header, DeltaSnapshotWriter, DeltaSnapshotReader
+from src.mpi_comm import MPI
+from src.config import BURNING, BURNT
+
+class TestSnapshotWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "snapshots.npy")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_header_is_aligned(self):
+        self.assertEqual(len(npy_header((3, 7, 5))) % 64, 0)
+
+    def test_frames_round_trip(self):
+        grid = Grid(6, 9)
+        writer = SnapshotWriter(MPI.COMM_SELF, self.path, 3, 6, 9, interval=5)
+        frames = []
+        for i in range(2):
+            grid.set_fire(i, 2 * i)
+            grid.data[5, i] = BURNT
+            writer.write(5 * i, grid)
+            frames.append(grid.data.copy())
+        writer.close()
+
+        snapshots = load_snapshots(self.path)
+        self.assertIsInstance(snapshots, np.memmap)
+        self.assertEqual(snapshots.shape, (3, 6, 9))
+        np.testing.assert_array_equal(snapshots[:2], frames)
+        # Frames that were never written read back as FUEL
+        self.assertFalse(snapshots[2].any())
+
+    def test_overwrites_earlier_run(self):
+        grid = Grid(6, 9)
+        grid.data[:] = BURNT
+        writer = SnapshotWriter(MPI.COMM_SELF, self.path, 4, 6, 9)
+        for i in range(4):
+            writer.write(i, grid)
+        writer.close()
+        # Same frame count on a smaller grid, with a frame never written
+        writer = SnapshotWriter(MPI.COMM_SELF, self.path, 4, 3, 9)
+        writer.write(0, Grid(3, 9))
+        writer.close()
+        snapshots = load_snapshots(self.path)
+        self.assertEqual(snapshots.shape, (4, 3, 9))
+        self.assertFalse(snapshots.any())
+
+    def test_truncate(self):
+        grid = Grid(4, 5)
+        grid.set_fire(1, 1)
+        writer = SnapshotWriter(MPI.COMM_SELF, self.path, 120, 4, 5)
+        writer.write(0, grid)
+        writer.truncate(1)
+        writer.close()
+        snapshots = load_snapshots(self.path)
+        self.assertEqual(snapshots.shape, (1, 4, 5))
+        np.testing.assert_array_equal(snapshots[0], grid.data)
+
+    def test_block_lands_at_global_position(self):
+        writer = SnapshotWriter(MPI.COMM_SELF, self.path, 1, 10, 12)
+        block = Grid(3, 4, offset=5, col_offset=6)
+        block.data[:] = BURNING
+        writer.write(0, block)
+        writer.close()
+        frame = load_snapshots(self.path)[0]
+        self.assertEqual(np.count_nonzero(frame), 12)
+        self.assertTrue(np.all(frame[5:8, 6:10] == BURNING))
+
+    def test_packed_grid(self):
+        grid = PackedGrid(4, 70, offset=2)
+        grid.set_fire(1, 65)
+        writer = SnapshotWriter(MPI.COMM_SELF, self.path, 1, 8, 70)
+        writer.write(0, grid)
+        writer.close()
+        frame = load_snapshots(self.path)[0]
+        self.assertEqual(frame[3, 65], BURNING)
+        self.assertEqual(np.count_nonzero(frame), 1)
+
+class TestDeltaSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "snapshots.delta")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_random_access_matches_frames(self):
+        rng = np.random.default_rng(1)
+        grid = Grid(8, 11)
+        writer = DeltaSnapshotWriter(MPI.COMM_SELF, self.path, 8, 11, keyframe_every=4)
+        frames = []
+        for step in range(0, 30, 3):
+            r, c = rng.integers(0, 8), rng.integers(0, 11)
+            grid.data[r, c] = (grid.data[r, c] + 1) % 3
+            writer.write(step, grid)
+            frames.append(grid.data.copy())
+        writer.close()
+
+        reader = DeltaSnapshotReader(self.path)
+        self.assertEqual(len(reader), len(frames))
+        np.testing.assert_array_equal(reader.steps, np.arange(0, 30, 3))
+        for i in (9, 2, 5, 0, 1, 2, 3):
+            np.testing.assert_array_equal(reader[i], frames[i])
+        np.testing.assert_array_equal(reader.at_step(21), frames[7])
+        # Deltas hold only the changed cells
+        self.assertLessEqual(reader.index['count'][1], 1)
+
+    def test_rows_moved_between_records(self):
+        grid = Grid(6, 5, offset=4)
+        writer = DeltaSnapshotWriter(MPI.COMM_SELF, self.path, 12, 5, keyframe_every=10)
+        grid.data[:] = BURNT
+        writer.write(0, grid)
+        grid.take_rows(2, top=True)
+        grid.add_rows(np.full((2, 5), BURNING, dtype=np.int8), top=False)
+        writer.write(1, grid)
+        writer.close()
+
+        frame = DeltaSnapshotReader(self.path)[1]
+        # Rows 4-5 are no longer owned (left as written), rows 10-11 arrived
+        np.testing.assert_array_equal(frame[4:10], BURNT)
+        np.testing.assert_array_equal(frame[10:12], BURNING)
+
+if __name__ == '__main__':
+    unittest.main()
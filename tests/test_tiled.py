@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+from src.grid import Grid
+from src.rng import CounterRNG
+from src.tiled import TiledEngine
+from src.wildfire import update_grid_fused
+from src.config import BURNING, BURNT
+from tests.test_rng import run_strips, run_blocks
+
+class TestTiledEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = TiledEngine(3)
+
+    def tearDown(self):
+        self.engine.close()
+
+    def test_matches_fused_under_counter_rng(self):
+        rng = CounterRNG(11)
+        expected = run_strips([0, 20, 31], 17, 8, update_grid_fused, rng=rng)
+        np.testing.assert_array_equal(run_strips([0, 20, 31], 17, 8, self.engine.step, rng=rng), expected)
+        np.testing.assert_array_equal(run_blocks([0, 13, 31], [0, 6, 17], 8, self.engine.step, rng=rng), expected)
+
+    def run_legacy(self, seed, threads):
+        np.random.seed(seed)
+        engine = TiledEngine(threads)
+        grid = Grid(40, 30)
+        grid.set_fire(20, 15)
+        for _ in range(10):
+            engine.step(grid)
+        engine.close()
+        return grid.data.copy()
+
+    def test_legacy_streams_are_reproducible(self):
+        first = self.run_legacy(4, 4)
+        np.testing.assert_array_equal(self.run_legacy(4, 4), first)
+        self.assertGreater(np.count_nonzero(first == BURNING), 0)
+
+    def test_more_threads_than_rows(self):
+        grid = Grid(2, 5)
+        grid.set_fire(0, 2)
+        self.engine.step(grid, rng=CounterRNG(0))
+        self.assertEqual(grid.data[0, 2], BURNT)
+
+    def test_empty_strip(self):
+        grid = Grid(0, 5)
+        for step in range(3):
+            self.assertEqual(self.engine.step(grid, rng=CounterRNG(0), step=step), (0, 0))
+        self.assertEqual(grid.padded.shape, (2, 7))
+
+if __name__ == '__main__':
+    unittest.main()
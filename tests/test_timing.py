@@ -0,0 +1,70 @@
+import unittest
+from src.timing import PhaseTimer, chrome_trace, summarize, permutation_pvalue, compare
+
+class TestPhaseTimer(unittest.TestCase):
+
+    def test_accumulates_per_phase(self):
+        timer = PhaseTimer()
+        for _ in range(3):
+            with timer.phase('compute'):
+                pass
+        timer.add('halo', 0.5)
+        timer.add('halo', 0.25)
+        self.assertEqual(set(timer.totals), {'compute', 'halo'})
+        self.assertEqual(timer.totals['halo'], 0.75)
+        self.assertGreaterEqual(timer.totals['compute'], 0.0)
+    def test_events_only_when_tracing(self):
+        self.assertIsNone(PhaseTimer().events)
+        timer = PhaseTimer(trace=True)
+        for step in range(2):
+            timer.step = step
+            with timer.phase('halo'):
+                pass
+            with timer.phase('compute'):
+                pass
+        self.assertEqual([(name, step) for name, step, _, _ in timer.events],
+                         [('halo', 0), ('compute', 0), ('halo', 1), ('compute', 1)])
+        self.assertTrue(all(0 <= start <= end for _, _, start, end in timer.events))
+
+class TestChromeTrace(unittest.TestCase):
+
+    def test_phases_nested_in_step_spans(self):
+        events = [[('halo', 0, 0.0, 0.001), ('compute', 0, 0.001, 0.004)], [('halo', 0, 0.0, 0.003)]]
+        trace = chrome_trace(events, {'ranks': 2})['traceEvents']
+        spans = [e for e in trace if e.get('cat') == 'step']
+        self.assertEqual([(e['pid'], e['ts'], e['dur']) for e in spans], [(0, 0, 4000), (1, 0, 3000)])
+        compute = [e for e in trace if e['name'] == 'compute']
+        self.assertEqual((compute[0]['ph'], compute[0]['ts'], compute[0]['dur']), ('X', 1000, 3000))
+        names = [e['args']['name'] for e in trace if e['name'] == 'process_name']
+        self.assertEqual(names, ['rank 0', 'rank 1'])
+
+class TestBenchmarkStats(unittest.TestCase):
+
+    def test_summarize_takes_slowest_rank(self):
+        trials = [[{'elapsed': 1.0, 'phases': {'compute': 0.5}}, {'elapsed': 2.0, 'phases': {'compute': 0.25, 'halo': 1.0}}],
+                  [{'elapsed': 3.0, 'phases': {'compute': 1.0}}, {'elapsed': 1.0, 'phases': {'halo': 0.5}}]]
+        summary = summarize(trials, steps=10)
+        self.assertEqual(summary['step']['samples'], [200.0, 300.0])
+        self.assertEqual(summary['compute']['samples'], [50.0, 100.0])
+        self.assertEqual(summary['halo']['samples'], [100.0, 50.0])
+        self.assertAlmostEqual(summary['step']['mean'], 250.0)
+
+    def test_permutation_pvalue(self):
+        slow = permutation_pvalue([1.0, 1.1, 0.9, 1.0, 1.05], [2.0, 2.1, 1.9, 2.0, 2.05])
+        # Exact: only 1 of the C(6, 3) = 20 splits is as extreme as this one
+        self.assertAlmostEqual(permutation_pvalue([1.0, 1.1, 0.9], [2.0, 2.1, 1.9]), 1 / 20)
+        self.assertAlmostEqual(permutation_pvalue([1.0] * 20, [1.0] * 20, resamples=999), 1.0)
+        same = permutation_pvalue([1.0, 1.1, 0.9, 1.0, 1.05], [1.05, 0.9, 1.0, 1.1, 1.0])
+        self.assertLess(slow, 0.05)
+        self.assertGreater(same, 0.2)
+
+    def test_compare_flags_significant_slowdowns(self):
+        def run(samples):
+            return {'summary': {'step': {'mean': sum(samples) / len(samples), 'samples': samples}}}
+        base = {'a': run([1.0, 1.1, 0.9, 1.0, 1.05]), 'b': run([1.0, 1.1, 0.9, 1.0, 1.05])}
+        now = {'a': run([2.0, 2.1, 1.9, 2.0, 2.05]), 'b': run([1.01, 1.11, 0.91, 1.01, 1.06]), 'c': run([1.0])}
+        flags = {name: regressed for name, _, _, _, _, _, regressed in compare(base, now)}
+        self.assertEqual(flags, {'a': True, 'b': False})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
+from unittest import mock
+import numpy as np
 from src.grid import Grid
-from src.wildfire import update_grid
+from src.wildfire import update_grid, update_grid_fused, update_rows_fused, reset_kernel_rng
+from src.rules import RuleEngine, make_rule
+from src.rng import CounterRNG
 from src.config import FUEL, BURNING, BURNT
 
 class TestWildfire(unittest.TestCase):
@@ -29,5 +33,78 @@ class TestWildfire(unittest.TestCase):
         new_data = update_grid(self.grid)
         self.assertEqual(new_data[5, 5], BURNT)
 
+class TestFusedKernel(unittest.TestCase):
+
+    def setUp(self):
+        self.grid = Grid(10, 10)
+        self.lut = np.array([0, 1, 1, 1, 1], dtype=np.float32)
+
+    def test_burning_to_burnt(self):
+        self.grid.set_fire(5, 5)
+        update_grid_fused(self.grid)
+        self.assertEqual(self.grid.data[5, 5], BURNT)
+
+    def test_swaps_persistent_buffers(self):
+        front = self.grid.padded
+        update_grid_fused(self.grid)
+        back = self.grid.padded
+        update_grid_fused(self.grid)
+        self.assertIsNot(front, back)
+        self.assertIs(self.grid.padded, front)
+
+    def test_matches_dense_kernel(self):
+        dense = Grid(10, 10)
+        for g in (self.grid, dense):
+            g.set_fire(2, 3)
+            g.set_fire(9, 0)
+            g.data[6, 6] = BURNT
+            g.data_with_ghost[0, 7] = BURNING
+            g.update_from_ghost()
+        with mock.patch('src.wildfire.P_SPREAD', 1.0), mock.patch('src.wildfire.P_IGNITE', 0.0):
+            for _ in range(6):
+                update_grid_fused(self.grid, lut=self.lut)
+                dense.commit_updates(update_grid(dense))
+                np.testing.assert_array_equal(self.grid.data, dense.data)
+
+    def test_empty_strip(self):
+        # A rank can own no rows once the grid is split or rebalanced
+        grid = Grid(0, 10)
+        for step in range(3):
+            self.assertEqual(update_grid_fused(grid, rng=CounterRNG(0), step=step), (0, 0))
+        self.assertEqual(grid.padded.shape, (2, 12))
+
+    def test_row_ranges_match_full_update(self):
+        rng = CounterRNG(seed=1)
+        split = Grid(10, 10)
+        for g in (self.grid, split):
+            g.set_fire(0, 4)
+            g.set_fire(5, 5)
+            g.data_with_ghost[-1, 2] = BURNING
+        for step in range(4):
+            update_grid_fused(self.grid, rng=rng, step=step)
+            update_rows_fused(split, 1, 9, rng=rng, step=step)
+            update_rows_fused(split, 0, 1, rng=rng, step=step)
+            update_rows_fused(split, 9, 10, rng=rng, step=step)
+            split.swap()
+            np.testing.assert_array_equal(split.data, self.grid.data)
+
+class TestKernelRng(unittest.TestCase):
+
+    def run_trial(self, step_fn):
+        # What simulate() does at the start of every trial
+        np.random.seed(1)
+        reset_kernel_rng()
+        grid = Grid(30, 30)
+        grid.set_fire(15, 15)
+        for _ in range(8):
+            step_fn(grid)
+        return grid.data.copy()
+
+    def test_trials_with_same_seed_match(self):
+        for step_fn in (update_grid_fused, RuleEngine(make_rule('wildfire')).step):
+            first = self.run_trial(step_fn)
+            np.testing.assert_array_equal(self.run_trial(step_fn), first)
+            self.assertGreater(np.count_nonzero(first == BURNT), 1)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from src.mpi_comm import CartCommunicator, MPI
+from src.load_balancer import BlockLoadBalancer
+from src.grid import Grid
+from src.config import BURNING
+
+def global_pattern(rows, cols):
+    return (np.arange(rows * cols).reshape(rows, cols) % 3).astype(np.int8)
+
+def report(comm_obj, ok, label):
+    all_ok = comm_obj.comm.allreduce(bool(ok), op=MPI.LAND)
+    if comm_obj.rank == 0:
+        print(f"{'SUCCESS' if all_ok else 'FAILURE'}: {label}")
+
+def check_ghosts(comm_obj, grid, label):
+    # Ghost rows/columns must equal the neighbouring cells of the global grid
+    full = comm_obj.comm.allgather((grid.offset, grid.col_offset, grid.data.copy()))
+    total_rows = max(o + d.shape[0] for o, _, d in full)
+    total_cols = max(co + d.shape[1] for _, co, d in full)
+    state = np.zeros((total_rows + 2, total_cols + 2), dtype=np.int8)
+    for o, co, d in full:
+        state[o + 1:o + 1 + d.shape[0], co + 1:co + 1 + d.shape[1]] = d
+    r0, c0 = grid.offset, grid.col_offset
+    expected = state[r0:r0 + grid.rows + 2, c0:c0 + grid.cols + 2]
+    ok = np.array_equal(grid.padded[[0, -1], 1:-1], expected[[0, -1], 1:-1])
+    ok &= np.array_equal(grid.padded[1:-1, [0, -1]], expected[1:-1, [0, -1]])
+    report(comm_obj, ok, label)
+
+def test_blocks(persistent):
+    comm_obj = CartCommunicator(persistent=persistent)
+    rows, cols = 24, 30
+    pattern = global_pattern(rows, cols)
+    (prow, pcol), (i, j) = comm_obj.dims, comm_obj.coords
+    r_bounds = np.linspace(0, rows, prow + 1).astype(int)
+    c_bounds = np.linspace(0, cols, pcol + 1).astype(int)
+    grid = Grid(r_bounds[i + 1] - r_bounds[i], c_bounds[j + 1] - c_bounds[j], offset=r_bounds[i], col_offset=c_bounds[j])
+    grid.data[:] = pattern[r_bounds[i]:r_bounds[i + 1], c_bounds[j]:c_bounds[j + 1]]
+
+    label = "persistent" if persistent else "non-persistent"
+    requests = comm_obj.start_ghost_exchange(grid)
+    comm_obj.end_ghost_exchange(grid, requests)
+    check_ghosts(comm_obj, grid, f"ghost rows and columns ({label})")
+
+    # Pile the load into the first block so cuts move in both dimensions
+    if comm_obj.rank == 0:
+        grid.data[:] = BURNING
+    pattern = comm_obj.gather_grid(grid)
+    balancer = BlockLoadBalancer(comm_obj)
+    for _ in range(3):
+        balancer.redistribute(grid)
+        requests = comm_obj.start_ghost_exchange(grid)
+        comm_obj.end_ghost_exchange(grid, requests)
+    check_ghosts(comm_obj, grid, f"ghosts after rebalancing ({label})")
+
+    # Process rows keep one row range and process columns one column range
+    shapes = comm_obj.comm.allgather((tuple(comm_obj.coords), grid.offset, grid.rows, grid.col_offset, grid.cols))
+    ok = all(a[1:3] == b[1:3] for a in shapes for b in shapes if a[0][0] == b[0][0])
+    ok &= all(a[3:] == b[3:] for a in shapes for b in shapes if a[0][1] == b[0][1])
+    report(comm_obj, ok, f"partition stays rectilinear ({label})")
+
+    full = comm_obj.gather_grid(grid)
+    report(comm_obj, comm_obj.rank != 0 or np.array_equal(full, pattern), f"gather after rebalancing ({label})")
+
+if __name__ == "__main__":
+    test_blocks(persistent=True)
+    test_blocks(persistent=False)
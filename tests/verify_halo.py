@@ -0,0 +1,49 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from src.mpi_comm import Communicator
+from src.grid import Grid
+from src.config import BURNING, BURNT
+
+def check_ghosts(comm_obj, grid, label):
+    # Every rank's ghost rows must equal its neighbours' edge rows
+    edges = comm_obj.comm.allgather((grid.data[0, :].copy(), grid.data[-1, :].copy()))
+    ok = True
+    if comm_obj.rank > 0:
+        ok &= np.array_equal(grid.data_with_ghost[0, :], edges[comm_obj.rank - 1][1])
+    if comm_obj.rank < comm_obj.size - 1:
+        ok &= np.array_equal(grid.data_with_ghost[-1, :], edges[comm_obj.rank + 1][0])
+    all_ok = comm_obj.comm.allreduce(bool(ok))
+    if comm_obj.rank == 0:
+        print(f"{'SUCCESS' if all_ok else 'FAILURE'}: {label}")
+
+def test_persistent_halo():
+    comm_obj = Communicator(persistent=True)
+    rank = comm_obj.rank
+    if comm_obj.size < 2:
+        if rank == 0:
+            print("Skipping halo test (needs > 1 process)")
+        return
+
+    grid = Grid(6, 8)
+    for step in range(4):
+        # Alternate buffers like a double-buffered kernel
+        back = grid.back_buffer()
+        back[1:-1, 1:-1] = (rank + step) % 3
+        grid.swap()
+        grid.data[0, step] = BURNING
+        grid.data[-1, step] = BURNT
+        requests = comm_obj.start_ghost_exchange(grid)
+        comm_obj.end_ghost_exchange(grid, requests)
+        check_ghosts(comm_obj, grid, f"ghost rows after swap {step}")
+
+    # Resizing the strip must rebuild the channel
+    grid.take_rows(1, top=False)
+    requests = comm_obj.start_ghost_exchange(grid)
+    comm_obj.end_ghost_exchange(grid, requests)
+    check_ghosts(comm_obj, grid, "ghost rows after resize")
+
+if __name__ == "__main__":
+    test_persistent_halo()
@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import numpy as np
 from src.mpi_comm import Communicator
 from src.grid import Grid
 from src.load_balancer import LoadBalancer
@@ -64,5 +65,48 @@ def test_load_balancing():
         else:
              print(f"FAILURE: Total rows changed! {sum(all_initial)} -> {sum(all_final)}")
 
+def test_global_balancing():
+    comm_obj = Communicator()
+    rank = comm_obj.rank
+    size = comm_obj.size
+
+    if size < 2:
+        if rank == 0:
+            print("Skipping global balancer test (needs > 1 process)")
+        return
+
+    # Hot spot on rank 0 only; tag each row with its global index
+    rows, cols = 10, 10
+    grid = Grid(rows, cols, offset=rank * rows)
+    grid.data[:] = (np.arange(rank * rows, (rank + 1) * rows) % 2)[:, None]
+    if rank == 0:
+        grid.data[:] = BURNING
+    expected = comm_obj.gather_grid(grid)
+
+    balancer = LoadBalancer(comm_obj, mode='global')
+    changed = balancer.redistribute(grid)
+
+    loads = comm_obj.comm.gather(int(balancer.row_costs(grid).sum()), root=0)
+    offsets = comm_obj.comm.gather((grid.offset, grid.rows), root=0)
+    full = comm_obj.gather_grid(grid)
+    if rank == 0:
+        print(f"Final Rows: {[r for _, r in offsets]}, loads: {loads}")
+        print("SUCCESS: Repartitioned in one call." if changed else "FAILURE: Nothing moved.")
+        # Optimal is within one row's cost (cols + 1) of the mean
+        if max(loads) - sum(loads) / size <= cols + 1:
+            print("SUCCESS: Load balanced after one call.")
+        else:
+            print("FAILURE: Load still imbalanced.")
+        contiguous = all(o == sum(r for _, r in offsets[:i]) for i, (o, _) in enumerate(offsets))
+        if contiguous and np.array_equal(full, expected):
+            print("SUCCESS: Rows and offsets preserved.")
+        else:
+            print("FAILURE: Rows or offsets changed.")
+        if all(type(v) is int for pair in offsets for v in pair):
+            print("SUCCESS: Rows and offsets are plain ints.")
+        else:
+            print("FAILURE: Rows or offsets are NumPy scalars.")
+
 if __name__ == "__main__":
     test_load_balancing()
+    test_global_balancing()